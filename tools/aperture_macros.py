@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Aperture macro (%AM) compiler and flash instantiation.
+
+Each macro body is compiled once into a callable that maps the parameters
+of an ``%ADD`` instance to a list of primitives. Instances are reduced to
+local polygons with an exposure flag, and `flash_contours` places those
+polygons at any number of flash positions with one broadcast.
+"""
+from __future__ import annotations
+
+import math
+import operator
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gerber_geometry import Contours
+
+
+EXPR_TOKEN_RE = re.compile(r"\s*(?:(?P<num>\d+(?:\.\d*)?|\.\d+)|\$(?P<var>\d+)|(?P<op>[-+xX/()]))")
+DEFAULT_TOL_MM = 0.005
+
+Primitive = Tuple[int, List[float]]
+
+
+class _Vars(dict):
+    # Undefined macro variables evaluate to zero.
+    def __missing__(self, key: int) -> float:
+        return 0.0
+
+
+OPS = {"+": operator.add, "-": operator.sub, "x": operator.mul, "/": operator.truediv}
+
+Expr = Callable[[Dict[int, float]], float]
+
+
+def _binary(op: Callable[[float, float], float], left: Expr, right: Expr) -> Expr:
+    return lambda v: op(left(v), right(v))
+
+
+def _tokenize(expr: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos, end = 0, len(expr.rstrip())
+    while pos < end:
+        m = EXPR_TOKEN_RE.match(expr, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Unsupported macro expression: {expr!r}")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind).lower()))
+        pos = m.end()
+    return tokens
+
+
+def _compile_expr(expr: str) -> Expr:
+    """Compile macro arithmetic (``+ - x / ( )``, numbers, ``$n``) to a callable.
+
+    Binary operators bind as usual (``x``/``/`` before ``+``/``-``); a single
+    unary sign may lead a factor. Anything else, e.g. ``2xx10``, is rejected.
+    """
+    tokens = _tokenize(expr)
+    pos = 0
+
+    def peek() -> Tuple[str, str]:
+        return tokens[pos] if pos < len(tokens) else ("end", "")
+
+    def take() -> Tuple[str, str]:
+        nonlocal pos
+        tok = peek()
+        pos += 1
+        return tok
+
+    def primary() -> Expr:
+        kind, text = take()
+        if kind == "num":
+            value = float(text)
+            return lambda v: value
+        if kind == "var":
+            key = int(text)
+            return lambda v: v[key]
+        if text == "(":
+            inner = additive()
+            if take()[1] != ")":
+                raise ValueError(f"Unbalanced parentheses in macro expression: {expr!r}")
+            return inner
+        raise ValueError(f"Unexpected {text or 'end'!r} in macro expression: {expr!r}")
+
+    def factor() -> Expr:
+        if peek()[1] in ("+", "-"):
+            sign = take()[1]
+            operand = primary()
+            return (lambda v: -operand(v)) if sign == "-" else operand
+        return primary()
+
+    def term() -> Expr:
+        left = factor()
+        while peek()[1] in ("x", "/"):
+            op = take()[1]
+            right = factor()
+            left = _binary(OPS[op], left, right)
+        return left
+
+    def additive() -> Expr:
+        left = term()
+        while peek()[1] in ("+", "-"):
+            op = take()[1]
+            right = term()
+            left = _binary(OPS[op], left, right)
+        return left
+
+    if not tokens:
+        return lambda v: 0.0
+    result = additive()
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected {peek()[1]!r} in macro expression: {expr!r}")
+    return result
+
+
+@dataclass
+class Macro:
+    name: str
+    evaluate: Callable[[Sequence[float]], List[Primitive]]
+
+
+def compile_macro(body: str) -> Macro:
+    """Compile an ``%AM`` body (name and statements separated by ``*``)."""
+    parts = [p.strip() for p in body.split("*")]
+    name, statements = parts[0], [p for p in parts[1:] if p]
+    program = []
+    for stmt in statements:
+        if stmt.startswith("0 ") or stmt == "0":
+            continue
+        if stmt.startswith("$"):
+            var, expr = stmt[1:].split("=", 1)
+            program.append(("set", int(var), _compile_expr(expr)))
+            continue
+        fields = stmt.split(",")
+        program.append(("prim", int(fields[0]), [_compile_expr(f) for f in fields[1:]]))
+
+    def evaluate(params: Sequence[float]) -> List[Primitive]:
+        v = _Vars({k + 1: float(p) for k, p in enumerate(params)})
+        prims = []
+        for kind, key, code in program:
+            if kind == "set":
+                v[key] = code(v)
+            else:
+                prims.append((key, [c(v) for c in code]))
+        return prims
+
+    return Macro(name=name, evaluate=evaluate)
+
+
+def _rotate(pts: np.ndarray, degrees: float) -> np.ndarray:
+    if not degrees:
+        return pts
+    a = math.radians(degrees)
+    c, s = math.cos(a), math.sin(a)
+    return pts @ np.array([[c, s], [-s, c]])
+
+
+def _circle(cx: float, cy: float, r: float, tol: float) -> np.ndarray:
+    step = 2 * math.acos(1 - tol / r) if r > tol else math.pi / 2
+    n = max(8, int(math.ceil(2 * math.pi / step)))
+    a = np.arange(n) * (2 * math.pi / n)
+    return np.stack([cx + r * np.cos(a), cy + r * np.sin(a)], axis=1)
+
+
+def _rect(x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+    return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+
+
+def _thermal(cx: float, cy: float, outer: float, inner: float, gap: float, tol: float) -> List[np.ndarray]:
+    ro, ri, g = outer / 2, inner / 2, gap / 2
+    if g >= ro:
+        return []
+    quads = []
+    for q in range(4):
+        base = q * math.pi / 2
+        o0, o1 = math.asin(g / ro), math.pi / 2 - math.asin(g / ro)
+        n = max(2, int(math.ceil((o1 - o0) / (2 * math.acos(1 - tol / ro))))) if ro > tol else 2
+        outer_arc = [(ro * math.cos(base + a), ro * math.sin(base + a)) for a in np.linspace(o0, o1, n + 1)]
+        if g < ri:
+            i0, i1 = math.asin(g / ri), math.pi / 2 - math.asin(g / ri)
+            inner_arc = [(ri * math.cos(base + a), ri * math.sin(base + a)) for a in np.linspace(i1, i0, n + 1)]
+        else:
+            inner_arc = [(g * math.sqrt(2) * math.cos(base + math.pi / 4), g * math.sqrt(2) * math.sin(base + math.pi / 4))]
+        quads.append(np.array(outer_arc + inner_arc) + (cx, cy))
+    return quads
+
+
+@dataclass
+class MacroShape:
+    """A macro instance as local polygons in mm, composited in order."""
+
+    polygons: List[np.ndarray]
+    exposure: List[int]
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        dark = [p for p, e in zip(self.polygons, self.exposure) if e] or self.polygons
+        if not dark:
+            return (0.0, 0.0, 0.0, 0.0)
+        allp = np.vstack(dark)
+        return float(allp[:, 0].min()), float(allp[:, 0].max()), float(allp[:, 1].min()), float(allp[:, 1].max())
+
+
+def instantiate(macro: Macro, params: Sequence[float], scale: float = 1.0, tol: float = DEFAULT_TOL_MM) -> MacroShape:
+    """Evaluate a macro for one aperture definition.
+
+    ``scale`` converts file units to mm; exposure flags, vertex counts and
+    rotations are not scaled. Moire primitives (6) are deprecated and skipped.
+    """
+    polygons: List[np.ndarray] = []
+    exposure: List[int] = []
+
+    def add(pts: np.ndarray, on: float, rot: float) -> None:
+        polygons.append(_rotate(pts, rot))
+        exposure.append(1 if on else 0)
+
+    for code, f in macro.evaluate(params):
+        f = f + [0.0] * 12
+        if code == 1:
+            on, d, cx, cy, rot = f[0], f[1] * scale, f[2] * scale, f[3] * scale, f[4]
+            if d > 0:
+                add(_circle(cx, cy, d / 2, tol), on, rot)
+        elif code in (2, 20):
+            on, w, sx, sy, ex, ey, rot = f[0], f[1] * scale, f[2] * scale, f[3] * scale, f[4] * scale, f[5] * scale, f[6]
+            length = math.hypot(ex - sx, ey - sy)
+            if w > 0 and length > 0:
+                nx, ny = -(ey - sy) / length * w / 2, (ex - sx) / length * w / 2
+                add(np.array([[sx + nx, sy + ny], [sx - nx, sy - ny], [ex - nx, ey - ny], [ex + nx, ey + ny]]), on, rot)
+        elif code == 21:
+            on, w, h, cx, cy, rot = f[0], f[1] * scale, f[2] * scale, f[3] * scale, f[4] * scale, f[5]
+            add(_rect(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), on, rot)
+        elif code == 22:
+            on, w, h, x0, y0, rot = f[0], f[1] * scale, f[2] * scale, f[3] * scale, f[4] * scale, f[5]
+            add(_rect(x0, y0, x0 + w, y0 + h), on, rot)
+        elif code == 4:
+            on, n = f[0], int(f[1])
+            pts = np.array(f[2:2 + 2 * (n + 1)]).reshape(-1, 2) * scale
+            add(pts[:-1] if len(pts) > 1 and np.array_equal(pts[0], pts[-1]) else pts, on, f[2 + 2 * (n + 1)])
+        elif code == 5:
+            on, n, cx, cy, d, rot = f[0], max(3, int(f[1])), f[2] * scale, f[3] * scale, f[4] * scale, f[5]
+            a = np.arange(n) * (2 * math.pi / n)
+            add(np.stack([cx + d / 2 * np.cos(a), cy + d / 2 * np.sin(a)], axis=1), on, rot)
+        elif code == 7:
+            cx, cy, outer, inner, gap, rot = f[0] * scale, f[1] * scale, f[2] * scale, f[3] * scale, f[4] * scale, f[5]
+            for quad in _thermal(cx, cy, outer, inner, gap, tol):
+                add(quad, 1, rot)
+    return MacroShape(polygons=polygons, exposure=exposure)
+
+
+def flash_contours(shape: MacroShape, fx: np.ndarray, fy: np.ndarray) -> Contours:
+    """Place every polygon of ``shape`` at every flash position at once.
+
+    Output contours are ordered flash-major, primitive-minor, with
+    ``polarity`` carrying each primitive's exposure.
+    """
+    if not shape.polygons or not len(fx):
+        return Contours()
+    local = np.vstack(shape.polygons)
+    sizes = np.array([len(p) for p in shape.polygons], dtype=np.int64)
+    x = (local[None, :, 0] + fx[:, None]).ravel()
+    y = (local[None, :, 1] + fy[:, None]).ravel()
+    counts = np.tile(sizes, len(fx))
+    return Contours(
+        x=x,
+        y=y,
+        offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        polarity=np.tile(np.array(shape.exposure, dtype=np.int64), len(fx)),
+        row=np.repeat(np.arange(len(fx), dtype=np.int64), len(sizes)),
+    )
+
+
+def macro_apertures(macros: Dict[str, str], apertures: Dict, scale: float, tol: float = DEFAULT_TOL_MM) -> Dict[int, MacroShape]:
+    """Instantiate every macro-based aperture definition, keyed by D code.
+
+    ``apertures`` maps D codes to `gerber_parser.ApertureDef`. Each macro is
+    compiled once no matter how many apertures use it; a macro that does not
+    compile, or an instance that does not evaluate, is skipped with a warning.
+    """
+    compiled: Dict[str, Optional[Macro]] = {}
+    shapes = {}
+    for code, ad in apertures.items():
+        body = macros.get(ad.shape)
+        if body is None:
+            continue
+        if ad.shape not in compiled:
+            try:
+                compiled[ad.shape] = compile_macro(body)
+            except ValueError as exc:
+                warnings.warn(f"Skipping aperture macro {ad.shape}: {exc}")
+                compiled[ad.shape] = None
+        macro = compiled[ad.shape]
+        if macro is None:
+            continue
+        try:
+            params = [float(p) for p in ad.params.split("X") if p]
+            shapes[int(code)] = instantiate(macro, params, scale, tol)
+        except (ValueError, IndexError, ZeroDivisionError) as exc:
+            warnings.warn(f"Skipping aperture D{code} ({ad.shape}): {exc}")
+    return shapes
@@ -5,40 +5,21 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-import xlrd
+from bom_store import read_bom
+from fab_cache import FabCache
 
 
 def load_json(path: Path) -> Dict:
     return json.loads(path.read_text())
 
 
-def parse_bom(path: Path) -> Dict[str, Dict[str, Any]]:
-    wb = xlrd.open_workbook(path.as_posix())
-    sheet = wb.sheet_by_index(0)
-    headers = {}
-    header_row = None
-    for row_idx in range(min(30, sheet.nrows)):
-        row = [str(sheet.cell_value(row_idx, c)).strip().lower() for c in range(sheet.ncols)]
-        if "designator" in row:
-            header_row = row_idx
-            for c, name in enumerate(row):
-                headers[name] = c
-            break
-    if header_row is None:
-        raise ValueError("Designator header not found in BOM")
+def parse_bom(path: Path, cache: Optional[FabCache] = None) -> Dict[str, Dict[str, Any]]:
+    bom = read_bom(path, cache)
     ref_map: Dict[str, Dict[str, Any]] = {}
-    for row_idx in range(header_row + 1, sheet.nrows):
-        designators = str(sheet.cell_value(row_idx, headers["designator"])).strip()
-        if not designators:
-            continue
-        parts = [p.strip() for p in designators.replace(";", ",").split(",") if p.strip()]
-        value = sheet.cell_value(row_idx, headers.get("value", -1)) if "value" in headers else ""
-        desc = sheet.cell_value(row_idx, headers.get("description", -1)) if "description" in headers else ""
-        part = sheet.cell_value(row_idx, headers.get("partnumber", -1)) if "partnumber" in headers else ""
-        for ref in parts:
-            ref_map[ref] = {"value": value, "description": desc, "part_number": part}
+    for ref, item in bom.refdes_to_item().items():
+        ref_map[ref] = {key: item[key] for key in ("value", "description", "part_number")}
     return ref_map
 
 
@@ -78,8 +59,9 @@ def render_block(block_name: str, block: Dict, bom_map: Dict[str, Dict[str, Any]
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--blocks", type=Path, required=True, help="Schematic blocks JSON")
-    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls")
+    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls, .xlsx or .csv")
     ap.add_argument("--out-dir", type=Path, required=True, help="Output directory")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -89,7 +71,7 @@ def main() -> int:
         return 0
 
     blocks = load_json(args.blocks)
-    bom_map = parse_bom(args.bom)
+    bom_map = parse_bom(args.bom, FabCache.open(args.cache_dir))
     out_dir = args.out_dir
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -1,103 +1,27 @@
 #!/usr/bin/env python3
-"""Parse BOM .xls and correlate with IPC netlist components."""
+"""Parse BOM (.xls, .xlsx or CSV) and correlate with IPC netlist components."""
 from __future__ import annotations
 
 import argparse
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Optional
 
 import csv
-import xlrd
-
-
-HEADER_ALIASES = {
-    "designator": "designator",
-    "refdes": "designator",
-    "quantity": "quantity",
-    "qty": "quantity",
-    "value": "value",
-    "comment": "value",
-    "description": "description",
-    "partnumber": "part_number",
-    "manufacturer": "manufacturer",
-    "packagereference": "package",
-    "alternate partnumber": "alt_part_number",
-    "alternate manufacturer": "alt_manufacturer",
-}
-
-
-def _normalize_header(cell: Any) -> str:
-    return str(cell).strip().lower().replace(" ", "")
-
-
-def _find_header_row(sheet: xlrd.sheet.Sheet) -> Tuple[int, Dict[str, int]]:
-    for row_idx in range(min(sheet.nrows, 30)):
-        headers = {}
-        for col_idx in range(sheet.ncols):
-            key = _normalize_header(sheet.cell_value(row_idx, col_idx))
-            if key in HEADER_ALIASES:
-                headers[HEADER_ALIASES[key]] = col_idx
-        if "designator" in headers:
-            return row_idx, headers
-    raise ValueError("Could not locate BOM header row with Designator column")
-
-
-def _split_designators(cell: Any) -> List[str]:
-    raw = str(cell).replace("\n", " ").strip()
-    if not raw:
-        return []
-    parts = [p.strip() for p in raw.replace(";", ",").split(",")]
-    return [p for p in parts if p]
-
-
-def parse_bom(path: Path) -> Dict[str, Any]:
-    wb = xlrd.open_workbook(path.as_posix())
-    sheet = wb.sheet_by_index(0)
-    header_row, headers = _find_header_row(sheet)
-
-    items = []
-    refdes_to_item = {}
-    dnp_refdes = []
-
-    for row_idx in range(header_row + 1, sheet.nrows):
-        designators = _split_designators(sheet.cell_value(row_idx, headers["designator"]))
-        if not designators:
-            continue
-        row = {
-            "designators": designators,
-            "quantity": sheet.cell_value(row_idx, headers.get("quantity", -1))
-            if "quantity" in headers
-            else None,
-            "value": sheet.cell_value(row_idx, headers.get("value", -1))
-            if "value" in headers
-            else None,
-            "description": sheet.cell_value(row_idx, headers.get("description", -1))
-            if "description" in headers
-            else None,
-            "package": sheet.cell_value(row_idx, headers.get("package", -1))
-            if "package" in headers
-            else None,
-            "part_number": sheet.cell_value(row_idx, headers.get("part_number", -1))
-            if "part_number" in headers
-            else None,
-            "manufacturer": sheet.cell_value(row_idx, headers.get("manufacturer", -1))
-            if "manufacturer" in headers
-            else None,
-        }
-        items.append(row)
-        desc = str(row.get("description", "")).lower()
-        val = str(row.get("value", "")).lower()
-        if "dnp" in desc or "dnp" in val or "not fitted" in desc:
-            dnp_refdes.extend(designators)
-        for ref in designators:
-            refdes_to_item[ref] = row
 
+from bom_store import read_bom
+from fab_cache import FabCache
+from netlist_store import Netlist, load_netlist
+from sheet_reader import Sheet, sheet_arg
+
+
+def parse_bom(path: Path, cache: Optional[FabCache] = None, sheet: Sheet = 0) -> Dict[str, Any]:
+    bom = read_bom(path, cache, sheet)
     return {
-        "headers": headers,
-        "items": items,
-        "refdes_to_item": refdes_to_item,
-        "dnp_refdes": sorted(set(dnp_refdes)),
+        "headers": bom.headers,
+        "items": bom.items(),
+        "refdes_to_item": bom.refdes_to_item(),
+        "dnp_refdes": bom.dnp_refdes(),
     }
 
 
@@ -106,9 +30,9 @@ def _extract_mpn(item: Dict[str, Any]) -> str:
     return pn
 
 
-def correlate(bom: Dict[str, Any], netlist: Dict[str, Any]) -> Dict[str, Any]:
+def correlate(bom: Dict[str, Any], netlist: Netlist) -> Dict[str, Any]:
     bom_components = set(bom["refdes_to_item"].keys())
-    netlist_components = set(netlist["comp_to_pins"].keys())
+    netlist_components = set(netlist.components.tolist())
 
     bom_only = sorted(bom_components - netlist_components)
     netlist_only = sorted(netlist_components - bom_components)
@@ -135,22 +59,25 @@ def correlate(bom: Dict[str, Any], netlist: Dict[str, Any]) -> Dict[str, Any]:
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("bom", type=Path, help="BOM .xls file")
-    ap.add_argument("netlist", type=Path, help="Netlist JSON")
+    ap.add_argument("bom", type=Path, help="BOM .xls, .xlsx or .csv file")
+    ap.add_argument("netlist", type=Path, help="Netlist JSON, .npz or IPC-D-356A file")
+    ap.add_argument("--sheet", type=sheet_arg, default=0, help="BOM sheet index or name (multi-variant workbooks)")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     ap.add_argument("--bom-production", type=Path, help="Output production BOM CSV")
     ap.add_argument("--bom-procurement", type=Path, help="Output procurement BOM CSV")
     ap.add_argument("--cost-out", type=Path, help="Output cost estimate JSON")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     args = ap.parse_args()
 
     if args.dry_run:
-        parse_bom(args.bom)
-        json.loads(args.netlist.read_text())
+        parse_bom(args.bom, sheet=args.sheet)
+        load_netlist(args.netlist)
         return 0
 
-    bom = parse_bom(args.bom)
-    netlist = json.loads(args.netlist.read_text())
+    cache = FabCache.open(args.cache_dir)
+    bom = parse_bom(args.bom, cache, args.sheet)
+    netlist = load_netlist(args.netlist, cache)
     report = {
         "bom_path": str(args.bom),
         "netlist_path": str(args.netlist),
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Shared BOM loader with a normalized columnar table.
+
+The BOM is parsed once into a `BomTable`: one row per reference
+designator pointing at its line item, and per-item columns for the value
+text, typed value (SI base units, from `value_parser`), voltage rating,
+tolerance, dielectric, description, package, MPN, manufacturer, quantity
+and DNP flag. `read_bom` stores the table in `fab_cache.FabCache` keyed by
+the BOM's content hash, so tools after the first one load it without
+touching the spreadsheet. Rows come from `sheet_reader`, so ``.xls``,
+``.xlsx`` and CSV BOMs are streamed.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from fab_cache import FabCache
+from sheet_reader import Sheet, cell, find_header, iter_rows, sheet_arg
+from value_parser import PARSER_VERSION, parse_column, unit_hint
+
+
+BOM_VERSION = 3
+# Cached tables hold parsed values, so value_parser changes must rebuild them too.
+CACHE_VERSION = BOM_VERSION * 100 + PARSER_VERSION
+HEADER_SCAN_ROWS = 30
+HEADER_ALIASES = {
+    "designator": "designator",
+    "refdes": "designator",
+    "quantity": "quantity",
+    "qty": "quantity",
+    "value": "value",
+    "comment": "value",
+    "description": "description",
+    "partnumber": "part_number",
+    "manufacturer": "manufacturer",
+    "packagereference": "package",
+    "alternatepartnumber": "alt_part_number",
+    "alternatemanufacturer": "alt_manufacturer",
+}
+TEXT_COLUMNS = ("value_text", "description", "package", "part_number", "manufacturer")
+ITEM_ARRAYS = ("value", "unit", "voltage", "tolerance_pct", "dielectric", "quantity", "dnp")
+
+
+def _normalize_header(cell: Any) -> str:
+    return str(cell).strip().lower().replace(" ", "")
+
+
+def split_designators(cell: Any) -> List[str]:
+    raw = str(cell).replace("\n", " ").strip()
+    if not raw:
+        return []
+    parts = [p.strip() for p in raw.replace(";", ",").split(",")]
+    return [p for p in parts if p]
+
+
+def _is_header(names: List[str]) -> bool:
+    return any(HEADER_ALIASES.get(name) == "designator" for name in names)
+
+
+def _find_header(rows: Iterator[List[Any]]) -> Dict[str, int]:
+    found = find_header(rows, _is_header, HEADER_SCAN_ROWS, _normalize_header)
+    if found is None:
+        raise ValueError("Could not locate BOM header row with Designator column")
+    headers: Dict[str, int] = {}
+    for name, col in found.items():
+        field = HEADER_ALIASES.get(name)
+        # A header named after the field itself beats any alias ("Value" over
+        # an earlier Altium "Comment"); among aliases the first column wins.
+        if field is not None and (field not in headers or name == field):
+            headers[field] = col
+    return headers
+
+
+def _quantity(cell: Any) -> float:
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _names(values: List[str]) -> np.ndarray:
+    return np.array(values, dtype=str) if len(values) else np.empty(0, dtype="<U1")
+
+
+@dataclass
+class BomTable:
+    """One row per reference designator; ``item[k]`` indexes the per-item columns.
+
+    ``value`` is in F, H or ohm as given by ``unit`` (NaN when neither the
+    value text nor the description parses); ``voltage``, ``tolerance_pct``
+    and ``quantity`` are NaN when absent.
+    """
+
+    headers: Dict[str, int] = field(default_factory=dict)
+    refdes: np.ndarray = field(default_factory=lambda: _names([]))
+    item: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    value_text: np.ndarray = field(default_factory=lambda: _names([]))
+    description: np.ndarray = field(default_factory=lambda: _names([]))
+    package: np.ndarray = field(default_factory=lambda: _names([]))
+    part_number: np.ndarray = field(default_factory=lambda: _names([]))
+    manufacturer: np.ndarray = field(default_factory=lambda: _names([]))
+    value: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    unit: np.ndarray = field(default_factory=lambda: _names([]))
+    voltage: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    tolerance_pct: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    dielectric: np.ndarray = field(default_factory=lambda: _names([]))
+    quantity: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    dnp: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.refdes)
+
+    @property
+    def item_count(self) -> int:
+        return len(self.value)
+
+    @classmethod
+    def from_rows(cls, rows: Iterator[List[Any]]) -> "BomTable":
+        headers = _find_header(rows)
+        cols = {name: headers.get(name) for name in ("value", "description", "package", "part_number", "manufacturer")}
+        text: Dict[str, List[str]] = {name: [] for name in TEXT_COLUMNS}
+        hints: List[str] = []
+        quantities: List[float] = []
+        dnp: List[bool] = []
+        ref_item: Dict[str, int] = {}
+        for row in rows:
+            designators = split_designators(cell(row, headers["designator"]))
+            if not designators:
+                continue
+            k = len(hints)
+            cells = {name: str(cell(row, col)).strip() for name, col in cols.items()}
+            text["value_text"].append(cells["value"])
+            for name in TEXT_COLUMNS[1:]:
+                text[name].append(cells[name])
+            hints.append(unit_hint(designators[0]))
+            quantities.append(_quantity(cell(row, headers.get("quantity"))))
+            desc, val = cells["description"].lower(), cells["value"].lower()
+            dnp.append("dnp" in desc or "dnp" in val or "not fitted" in desc)
+            for ref in designators:
+                ref_item[ref] = k
+        # Value text first; the description fills in whatever it leaves out.
+        parsed = parse_column(text["value_text"], hints)
+        fallback = parse_column(text["description"], hints, bare_numbers=False)
+        missing = np.isnan(parsed.value)
+        return cls(
+            headers=headers,
+            refdes=_names(list(ref_item)),
+            item=np.fromiter(ref_item.values(), dtype=np.int64, count=len(ref_item)),
+            value=np.where(missing, fallback.value, parsed.value),
+            unit=np.where(missing, fallback.unit, parsed.unit),
+            voltage=np.where(np.isnan(parsed.voltage), fallback.voltage, parsed.voltage),
+            tolerance_pct=np.where(np.isnan(parsed.tolerance_pct), fallback.tolerance_pct, parsed.tolerance_pct),
+            dielectric=np.where(parsed.dielectric == "", fallback.dielectric, parsed.dielectric),
+            quantity=np.array(quantities, dtype=np.float64),
+            dnp=np.array(dnp, dtype=bool),
+            **{name: _names(column) for name, column in text.items()},
+        )
+
+    def to_record(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        arrays = {name: getattr(self, name) for name in ("refdes", "item") + TEXT_COLUMNS + ITEM_ARRAYS}
+        return {"format_version": BOM_VERSION, "headers": self.headers}, arrays
+
+    @classmethod
+    def from_record(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "BomTable":
+        data = cls(headers=header.get("headers", {}))
+        for name, array in arrays.items():
+            setattr(data, name, array)
+        return data
+
+    def item_record(self, k: int) -> Dict[str, Any]:
+        """Line item ``k`` as a plain dict (``value`` is the text as written)."""
+        qty = float(self.quantity[k])
+        return {
+            "value": str(self.value_text[k]),
+            "description": str(self.description[k]),
+            "package": str(self.package[k]),
+            "part_number": str(self.part_number[k]),
+            "manufacturer": str(self.manufacturer[k]),
+            "quantity": None if np.isnan(qty) else qty,
+        }
+
+    def items(self) -> List[Dict[str, Any]]:
+        """Line items with their designators, in BOM order."""
+        designators: List[List[str]] = [[] for _ in range(self.item_count)]
+        for ref, k in zip(self.refdes.tolist(), self.item.tolist()):
+            designators[k].append(ref)
+        return [dict(self.item_record(k), designators=refs) for k, refs in enumerate(designators)]
+
+    def refdes_to_item(self) -> Dict[str, Dict[str, Any]]:
+        records = [self.item_record(k) for k in range(self.item_count)]
+        return {ref: records[k] for ref, k in zip(self.refdes.tolist(), self.item.tolist())}
+
+    def dnp_refdes(self) -> List[str]:
+        return sorted(self.refdes[self.dnp[self.item]].tolist())
+
+    def values(self, unit: str) -> Dict[str, float]:
+        """``{refdes: value}`` for parts whose value parsed in ``unit`` (``F``, ``H``, ``ohm``)."""
+        rows = np.flatnonzero(self.unit[self.item] == unit)
+        return dict(zip(self.refdes[rows].tolist(), self.value[self.item[rows]].tolist()))
+
+
+def read_bom(path: Path, cache: Optional[FabCache] = None, sheet: Sheet = 0) -> BomTable:
+    """Parse a BOM (``.xls``, ``.xlsx`` or CSV) into a `BomTable`, through ``cache`` if given."""
+    if cache is not None:
+        # Sheet names may hold characters that are not valid in file names ("Rev A/B").
+        namespace = "bom" if sheet == 0 else f"bom.{hashlib.sha256(repr(sheet).encode()).hexdigest()[:16]}"
+        header, arrays = cache.load(path, namespace, CACHE_VERSION, lambda p: read_bom(p, sheet=sheet).to_record())
+        return BomTable.from_record(header, arrays)
+    return BomTable.from_rows(iter_rows(path, sheet))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("bom", type=Path, help="BOM .xls, .xlsx or .csv")
+    ap.add_argument("--sheet", type=sheet_arg, default=0, help="Sheet index or name (multi-variant workbooks)")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    args = ap.parse_args()
+
+    bom = read_bom(args.bom, FabCache.open(args.cache_dir), args.sheet)
+    args.out.write_text(json.dumps(bom.refdes_to_item(), indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,11 +8,10 @@ import json
 import re
 from pathlib import Path
 
+from value_parser import format_value, parse_column, unit_hint
+
 
 PASSIVE_RE = re.compile(r"^[CRL]\d+", re.IGNORECASE)
-CAP_RE = re.compile(r"(\d+\.?\d*)\s*(pF|nF|uF|µF)", re.IGNORECASE)
-RES_RE = re.compile(r"(\d+\.?\d*)\s*(k?ohm|k?ohms|mohm|mohms|k|m|r)", re.IGNORECASE)
-IND_RE = re.compile(r"(\d+\.?\d*)\s*(pH|nH|uH|µH|mH)", re.IGNORECASE)
 
 
 def main() -> int:
@@ -26,6 +25,7 @@ def main() -> int:
         return 0
 
     values = {}
+    missing = []
     with args.bom.open() as f:
         reader = csv.reader(f)
         headers = next(reader, None)
@@ -46,23 +46,16 @@ def main() -> int:
             desc = row[desc_idx].strip() if len(row) > desc_idx else ""
             if PASSIVE_RE.match(refdes):
                 if not val and desc:
-                    m = CAP_RE.search(desc)
-                    if m:
-                        val = f"{m.group(1)}{m.group(2)}"
-                    m = RES_RE.search(desc)
-                    if m and not val:
-                        suffix = m.group(2).lower()
-                        if suffix in ("k", "kohm", "kohms"):
-                            val = f"{m.group(1)}k"
-                        elif suffix in ("m", "mohm", "mohms"):
-                            val = f"{m.group(1)}M"
-                        elif suffix in ("r", "ohm", "ohms"):
-                            val = f"{m.group(1)}R"
-                    m = IND_RE.search(desc)
-                    if m and not val:
-                        val = f"{m.group(1)}{m.group(2)}"
+                    missing.append((refdes, desc))
                 values[refdes] = val
 
+    # Values missing from the Value column are parsed out of the descriptions in one pass.
+    if missing:
+        refs = [ref for ref, _desc in missing]
+        parsed = parse_column([desc for _ref, desc in missing], [unit_hint(ref) for ref in refs], bare_numbers=False)
+        for ref, value, unit in zip(refs, parsed.value.tolist(), parsed.unit.tolist()):
+            values[ref] = format_value(value, unit)
+
     args.out.write_text(json.dumps(values, indent=2, sort_keys=True))
     return 0
 
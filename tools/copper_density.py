@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Per-layer copper density grids and stack copper-balance report.
+
+Every copper layer is rasterized on one shared grid (the board outline, or
+the union of the layers when no outline is present) and reduced tile by tile
+into square cells: each tile is reshaped to ``(rows, cell, cols, cell)`` and
+summed, so only one tile of pixels is held at a time.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from copper_extractor import COPPER_LAYERS
+from fab_cache import FabCache
+from gerber_geometry import geometry_bounds
+from gerber_parser import Geometry, read_geometry
+from gerber_raster import DEFAULT_TILE_PX, Bounds, LayerRaster, write_png
+
+
+DEFAULT_CELL_MM = 5.0
+DEFAULT_PITCH_UM = 50.0
+OUTLINE_LAYER = "PROC091G.GM1"
+
+
+def outline_bounds(geom: Geometry) -> Optional[Bounds]:
+    raw = geometry_bounds(geom)
+    if raw is None:
+        return None
+    sx, sy = geom.scale_mm()
+    return raw[0] * sx, raw[1] * sx, raw[2] * sy, raw[3] * sy
+
+
+def density_grid(
+    geom: Geometry,
+    bounds_mm: Bounds,
+    cell_mm: float = DEFAULT_CELL_MM,
+    pitch_mm: float = DEFAULT_PITCH_UM / 1000.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Copper and total pixel counts per cell of ``bounds_mm``, row 0 at the bottom edge.
+
+    The pitch is shrunk so a cell is a whole number of pixels, and tiles are
+    a whole number of cells so no cell straddles two tiles.
+    """
+    cell_px = max(1, int(math.ceil(cell_mm / pitch_mm)))
+    pitch = cell_mm / cell_px
+    tile_px = max(1, DEFAULT_TILE_PX // cell_px) * cell_px
+    raster = LayerRaster(geom, pitch, bounds_mm=bounds_mm, tile_px=tile_px)
+    grid_rows = -(-raster.rows // cell_px)
+    grid_cols = -(-raster.cols // cell_px)
+    copper = np.zeros((grid_rows, grid_cols), dtype=np.int64)
+    for row0, col0, tile in raster.tiles():
+        r, c = tile.shape
+        padded = np.zeros((-(-r // cell_px) * cell_px, -(-c // cell_px) * cell_px), dtype=np.int64)
+        padded[:r, :c] = tile
+        cells = padded.reshape(padded.shape[0] // cell_px, cell_px, padded.shape[1] // cell_px, cell_px).sum(axis=(1, 3))
+        gr, gc = row0 // cell_px, col0 // cell_px
+        copper[gr:gr + cells.shape[0], gc:gc + cells.shape[1]] = cells
+    # Cells on the top and right edges are only partly inside the bounds.
+    row_px = np.minimum(cell_px, raster.rows - np.arange(grid_rows) * cell_px)
+    col_px = np.minimum(cell_px, raster.cols - np.arange(grid_cols) * cell_px)
+    return copper, np.outer(row_px, col_px)
+
+
+def _stats(coverage: np.ndarray) -> Dict:
+    return {
+        "min": round(float(coverage.min()), 4),
+        "max": round(float(coverage.max()), 4),
+        "mean": round(float(coverage.mean()), 4),
+        "std": round(float(coverage.std()), 4),
+    }
+
+
+def balance_pairs(layers: List[str]) -> List[Tuple[str, str]]:
+    """Layers mirrored about the stack centre, outermost pair first."""
+    return [(layers[k], layers[-1 - k]) for k in range(len(layers) // 2)]
+
+
+def write_heatmap(coverage: np.ndarray, path: Path, scale: int) -> None:
+    image = np.rint(np.clip(coverage, 0.0, 1.0) * 255).astype(np.uint8)
+    write_png(np.repeat(np.repeat(image, scale, axis=0), scale, axis=1), path)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fab-dir", type=Path, required=True, help="Fabrication package directory")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON summary")
+    ap.add_argument("--cell-mm", type=float, default=DEFAULT_CELL_MM, help="Density cell size")
+    ap.add_argument("--pitch-um", type=float, default=DEFAULT_PITCH_UM, help="Raster pixel pitch")
+    ap.add_argument("--png-dir", type=Path, help="Write a grayscale heatmap PNG per layer here")
+    ap.add_argument("--png-scale", type=int, default=8, help="Heatmap pixels per cell")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
+    args = ap.parse_args()
+
+    if args.dry_run:
+        return 0
+
+    gerber_dir = args.fab_dir / "GerberNCdrills"
+    cache = FabCache.open(args.cache_dir)
+    layers = {fname: read_geometry(gerber_dir / fname, cache=cache) for fname in COPPER_LAYERS if (gerber_dir / fname).exists()}
+    bounds = None
+    if (gerber_dir / OUTLINE_LAYER).exists():
+        bounds = outline_bounds(read_geometry(gerber_dir / OUTLINE_LAYER, cache=cache))
+    if bounds is None:
+        extents = [b for b in (LayerRaster(g, args.cell_mm).extent() for g in layers.values()) if b[1] > b[0]]
+        if extents:
+            box = np.array(extents)
+            bounds = float(box[:, 0].min()), float(box[:, 1].max()), float(box[:, 2].min()), float(box[:, 3].max())
+
+    report = {
+        "bounds_mm": list(bounds) if bounds else None,
+        "cell_mm": args.cell_mm,
+        "layers": {},
+        "balance": [],
+        "notes": [
+            "Cell rows run bottom to top; coverage is copper pixels over all pixels in the outline's "
+            "bounding box, so cells past a non-rectangular outline read low.",
+            "Balance pairs mirror the full stack about its centre (GTL/GBL outermost); "
+            "a pair with a missing layer is skipped.",
+        ],
+    }
+    coverage: Dict[str, np.ndarray] = {}
+    if bounds is not None:
+        if args.png_dir:
+            args.png_dir.mkdir(parents=True, exist_ok=True)
+        for fname, geom in layers.items():
+            copper, board = density_grid(geom, bounds, args.cell_mm, args.pitch_um / 1000.0)
+            coverage[fname] = copper / board
+            total = float(copper.sum()) / float(board.sum())
+            report["layers"][fname] = {
+                "coverage": round(total, 4),
+                "copper_area_mm2": round(total * (bounds[1] - bounds[0]) * (bounds[3] - bounds[2]), 3),
+                "cells": _stats(coverage[fname]),
+                "grid": np.round(coverage[fname], 4).tolist(),
+            }
+            if args.png_dir:
+                write_heatmap(coverage[fname], args.png_dir / f"{fname}.density.png", args.png_scale)
+
+    for a, b in balance_pairs(COPPER_LAYERS):
+        if a not in coverage or b not in coverage:
+            continue
+        diff = coverage[a] - coverage[b]
+        report["balance"].append(
+            {
+                "layers": [a, b],
+                "coverage": [report["layers"][a]["coverage"], report["layers"][b]["coverage"]],
+                "imbalance": round(abs(report["layers"][a]["coverage"] - report["layers"][b]["coverage"]), 4),
+                "max_cell_imbalance": round(float(np.abs(diff).max()), 4),
+                "worst_cell": [int(v) for v in np.unravel_index(int(np.abs(diff).argmax()), diff.shape)],
+            }
+        )
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,20 +4,99 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
+from fnmatch import fnmatchcase
 from pathlib import Path
+from typing import Dict, List, Optional
 
+import numpy as np
 
-APERTURE_RE = re.compile(r"%ADD(\d+)([A-Z]),?([0-9.X]+)\*%")
+from fab_cache import FabCache
+from gerber_geometry import DEFAULT_ARC_TOL_MM, expand_rows, polygon_metrics, region_contours
+from gerber_parser import Geometry, read_geometry
 
 
-def parse_apertures(path: Path) -> dict:
-    apertures = {}
-    for line in path.read_text(errors="ignore").splitlines():
-        m = APERTURE_RE.search(line)
-        if m:
-            apertures[m.group(1)] = {"shape": m.group(2), "params": m.group(3)}
-    return apertures
+CRITICAL_NETS = ["USB_DP", "USB_DM", "AR_LVDS_*"]
+# Copper layers in stack order, top to bottom.
+COPPER_LAYERS = [
+    "PROC091G.GTL",
+    "PROC091G.G1",
+    "PROC091G.G2",
+    "PROC091G.G3",
+    "PROC091G.G4",
+    "PROC091G.G5",
+    "PROC091G.G6",
+    "PROC091G.GBL",
+]
+
+
+def parse_apertures(path: Path, cache: Optional[FabCache] = None) -> dict:
+    geom = read_geometry(path, cache=cache)
+    return aperture_summary(geom)
+
+
+def aperture_summary(geom: Geometry) -> dict:
+    return {code: {"shape": ad.shape, "params": ad.params} for code, ad in geom.apertures.items()}
+
+
+def extract_pours(geom: Geometry, arc_tol_mm: float = DEFAULT_ARC_TOL_MM) -> Dict:
+    """Region contours of one layer in the compact pour encoding.
+
+    Vertices are integer micrometres, delta-encoded over the flat vertex
+    list (decode with a cumulative sum); ``offsets`` delimits contours.
+    """
+    contours = region_contours(geom, arc_tol_mm)
+    metrics = polygon_metrics(contours)
+    x_um = np.rint(contours.x * 1000).astype(np.int64)
+    y_um = np.rint(contours.y * 1000).astype(np.int64)
+    area = np.abs(metrics["area"])
+    dark = contours.polarity == 1
+    return {
+        "count": len(contours),
+        "offsets": contours.offsets.tolist(),
+        "dx_um": np.diff(x_um, prepend=0).tolist(),
+        "dy_um": np.diff(y_um, prepend=0).tolist(),
+        "polarity": contours.polarity.tolist(),
+        "area_mm2": np.round(area, 4).tolist(),
+        "perimeter_mm": np.round(metrics["perimeter"], 4).tolist(),
+        "bbox_mm": np.round(metrics["bbox"], 4).tolist(),
+        "dark_area_mm2": round(float(area[dark].sum()), 4),
+        "clear_area_mm2": round(float(area[~dark].sum()), 4),
+    }
+
+
+def net_copper(geom: Geometry, patterns: List[str], arc_tol_mm: float = DEFAULT_ARC_TOL_MM) -> Dict:
+    """Per-net copper on one layer for nets matching the glob ``patterns``.
+
+    Relies on X2 ``%TO.N`` object attributes; layers exported without them
+    have no nets and return an empty dict.
+    """
+    if not geom.nets:
+        return {}
+    px, py, off = expand_rows(geom, arc_tol_mm)
+    seg = np.hypot(np.diff(px, prepend=px[:1]), np.diff(py, prepend=py[:1]))
+    point_row = np.repeat(np.arange(len(geom)), np.diff(off))
+    # A row's first point continues from the previous point, so its segment counts too.
+    row_length = np.bincount(point_row, weights=seg, minlength=len(geom))
+    track = (geom.op == 1) & (geom.region == 0)
+    pad = geom.op == 3
+    contours = region_contours(geom, arc_tol_mm)
+    area = np.abs(polygon_metrics(contours)["area"])
+    sign = np.where(contours.polarity == 1, 1.0, -1.0)
+    contour_net = geom.net[contours.row]
+    report = {}
+    for net_idx, name in enumerate(geom.nets):
+        if not any(fnmatchcase(name, p) for p in patterns):
+            continue
+        rows = geom.net == net_idx
+        comps = np.unique(geom.component[rows & (geom.component >= 0)])
+        report[name] = {
+            "track_count": int(np.count_nonzero(rows & track)),
+            "track_length_mm": round(float(row_length[rows & track].sum()), 4),
+            "pad_count": int(np.count_nonzero(rows & pad)),
+            "region_area_mm2": round(float((area * sign)[contour_net == net_idx].sum()), 4),
+            "components": sorted(geom.components[c] for c in comps),
+        }
+    return report
 
 
 def main() -> int:
@@ -26,6 +105,8 @@ def main() -> int:
     ap.add_argument("--out-geom", type=Path, required=True, help="Output geometry JSON")
     ap.add_argument("--out-pours", type=Path, required=True, help="Output pours JSON")
     ap.add_argument("--out-routes", type=Path, required=True, help="Output critical routes JSON")
+    ap.add_argument("--arc-tol-um", type=float, default=DEFAULT_ARC_TOL_MM * 1000, help="Max chord error for arcs")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -33,22 +114,38 @@ def main() -> int:
         return 0
 
     gerber_dir = args.fab_dir / "GerberNCdrills"
-    layers = ["PROC091G.GTL", "PROC091G.GBL", "PROC091G.G1", "PROC091G.G2", "PROC091G.G3", "PROC091G.G4"]
+    cache = FabCache.open(args.cache_dir)
     geom = {}
-    for fname in layers:
+    pours = {}
+    routes = {}
+    for fname in COPPER_LAYERS:
         path = gerber_dir / fname
         if not path.exists():
             continue
-        apertures = parse_apertures(path)
-        geom[fname] = {"apertures": apertures}
+        layer = read_geometry(path, cache=cache)
+        geom[fname] = {"apertures": aperture_summary(layer)}
+        pours[fname] = extract_pours(layer, args.arc_tol_um / 1000.0)
+        if layer.nets:
+            routes[fname] = net_copper(layer, CRITICAL_NETS, args.arc_tol_um / 1000.0)
 
     args.out_geom.write_text(json.dumps(geom, indent=2, sort_keys=True))
-    args.out_pours.write_text(json.dumps({"notes": ["Pour extraction not implemented; use CAM tools."]}, indent=2, sort_keys=True))
+    pour_report = {
+        "encoding": "offsets delimit contours; dx_um/dy_um are deltas over the flat vertex list (cumsum to decode)",
+        "arc_tol_um": args.arc_tol_um,
+        "layers": pours,
+        "notes": ["Pours are G36/G37 region contours; clear-polarity contours are cutouts."],
+    }
+    # Vertex arrays dominate this file, so it is written without indentation.
+    args.out_pours.write_text(json.dumps(pour_report, sort_keys=True, separators=(",", ":")))
+    notes = ["Nets come from X2 %TO.N object attributes; track length includes arcs, region area is net of cutouts."]
+    if not routes:
+        notes = ["No copper layer carries X2 net attributes; re-export with X2 enabled to correlate nets."]
     args.out_routes.write_text(
         json.dumps(
             {
-                "critical_nets": ["USB_DP", "USB_DM", "AR_LVDS_*"],
-                "notes": ["Gerber layers lack net names; manual correlation required."],
+                "critical_nets": CRITICAL_NETS,
+                "layers": routes,
+                "notes": notes,
             },
             indent=2,
             sort_keys=True,
@@ -4,20 +4,28 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
 from pathlib import Path
 from typing import Dict
 
+from drill_drc import DEFAULT_MIN_EDGE_MM, DEFAULT_MIN_WEB_MM, edge_clearance, hole_webs, merge_holes
+from excellon_parser import DrillData, read_drill
+from fab_cache import FabCache
+from gerber_parser import read_geometry
 
-def parse_tool_sizes(path: Path) -> Dict[str, float]:
-    tools = {}
-    if not path.exists():
-        return tools
-    for line in path.read_text().splitlines():
-        m = re.match(r"T(\d+).+C([0-9.]+)", line)
-        if m:
-            tools[m.group(1)] = float(m.group(2))
-    return tools
+
+DRILL_FILES = ["PROC091G-RoundHoles.TXT", "PROC091G-SlotHoles.TXT"]
+OUTLINE_LAYER = "PROC091G.GM1"
+
+
+def drill_drc(drills: Dict[str, DrillData], outline_path: Path, min_web: float, min_edge: float, cache=None) -> Dict:
+    holes = merge_holes(drills)
+    outline = read_geometry(outline_path, cache=cache) if outline_path.exists() else None
+    return {
+        "hole_count": len(holes),
+        "hole_to_hole": hole_webs(holes, min_web),
+        "hole_to_edge": edge_clearance(holes, outline, min_edge),
+        "outline": outline_path.name if outline is not None else None,
+    }
 
 
 def main() -> int:
@@ -25,6 +33,9 @@ def main() -> int:
     ap.add_argument("--fab-dir", type=Path, required=True, help="Fabrication package directory")
     ap.add_argument("--stackup", type=Path, required=True, help="Stackup JSON")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--min-web-mm", type=float, default=DEFAULT_MIN_WEB_MM, help="Minimum hole-to-hole web")
+    ap.add_argument("--min-edge-mm", type=float, default=DEFAULT_MIN_EDGE_MM, help="Minimum hole-to-outline clearance")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -34,8 +45,10 @@ def main() -> int:
 
     stackup = json.loads(args.stackup.read_text())
     gerber_dir = args.fab_dir / "GerberNCdrills"
-    round_tools = parse_tool_sizes(gerber_dir / "PROC091G-RoundHoles.TXT")
-    slot_tools = parse_tool_sizes(gerber_dir / "PROC091G-SlotHoles.TXT")
+    cache = FabCache.open(args.cache_dir)
+    drills = {name: read_drill(gerber_dir / name, cache) for name in DRILL_FILES if (gerber_dir / name).exists()}
+    round_tools = drills["PROC091G-RoundHoles.TXT"].tools if "PROC091G-RoundHoles.TXT" in drills else {}
+    slot_tools = drills["PROC091G-SlotHoles.TXT"].tools if "PROC091G-SlotHoles.TXT" in drills else {}
 
     report = {
         "board_thickness_in": stackup.get("board_thickness_in"),
@@ -46,6 +59,7 @@ def main() -> int:
             "round_holes_mm": round_tools,
             "slot_holes_mm": slot_tools,
         },
+        "drill_drc": drill_drc(drills, gerber_dir / OUTLINE_LAYER, args.min_web_mm, args.min_edge_mm, cache),
         "min_trace_width": None,
         "min_spacing": None,
         "notes": [
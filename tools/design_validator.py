@@ -5,32 +5,85 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from copper_extractor import COPPER_LAYERS
+from drill_drc import Holes, merge_holes
+from drill_registration import DEFAULT_MIN_RING_MM, DEFAULT_REGISTRATION_TOL_MM, register_holes
+from excellon_parser import read_drill
+from fab_cache import FabCache
+from gerber_parser import read_geometry
+
+
+PLATED_DRILL_FILES = ["PROC091G-RoundHoles.TXT", "PROC091G-SlotHoles.TXT"]
+
+
+def check_registration(gerber_dir: Path, tol: float, min_ring: float, cache: Optional[FabCache]) -> Tuple[Holes, Dict]:
+    drills = {}
+    for name in PLATED_DRILL_FILES:
+        if (gerber_dir / name).exists():
+            data = read_drill(gerber_dir / name, cache)
+            # Files without a ;TYPE= comment are assumed plated.
+            if data.plated is not False:
+                drills[name] = data
+    holes = merge_holes(drills)
+    copper = {
+        fname: read_geometry(gerber_dir / fname, cache=cache) for fname in COPPER_LAYERS if (gerber_dir / fname).exists()
+    }
+    return holes, register_holes(holes, copper, tol, min_ring)
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
+    ap.add_argument("--fab-dir", type=Path, help="Fabrication package directory for drill registration")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output report JSON")
+    ap.add_argument("--tol-mm", type=float, default=DEFAULT_REGISTRATION_TOL_MM, help="Drill-to-pad centre tolerance")
+    ap.add_argument("--min-ring-mm", type=float, default=DEFAULT_MIN_RING_MM, help="Minimum annular ring")
+    ap.add_argument("--ring-out", type=Path, help="Optional per-hit annular ring JSON (needs --fab-dir)")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
         return 0
 
-    drill = json.loads(Path("data/drill_analysis.json").read_text())
     placement = json.loads(Path("data/component_placement.json").read_text())
     gerber = json.loads(Path("data/gerber_analysis.json").read_text())
 
-    total_holes = drill.get("total_holes", 0)
     xy_ok = all(p["x_mil"] != p["y_mil"] for p in placement[:50])
     layers = gerber.get("layers", {})
     inner_ok = all(k in layers for k in ["inner1", "inner2", "inner3", "inner4", "inner5", "inner6"])
 
     report = {
-        "drill_holes_gt_500": total_holes > 500,
         "pnp_xy_distinct": xy_ok,
         "inner_layers_present": inner_ok,
     }
+    if args.fab_dir:
+        cache = FabCache.open(args.cache_dir)
+        holes, registration = check_registration(args.fab_dir / "GerberNCdrills", args.tol_mm, args.min_ring_mm, cache)
+        ring = registration.pop("ring_mm")
+        report["drill_registration"] = registration
+        report["drill_registration_ok"] = registration["unregistered_count"] == 0 and registration["thin_ring_count"] == 0
+    else:
+        drill = json.loads(Path("data/drill_analysis.json").read_text())
+        report["drill_holes_gt_500"] = drill.get("total_holes", 0) > 500
     args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
+    if args.fab_dir and args.ring_out:
+        args.ring_out.write_text(
+            json.dumps(
+                {
+                    "files": holes.sources,
+                    "source": holes.source.tolist(),
+                    "x_mm": np.round(holes.x, 4).tolist(),
+                    "y_mm": np.round(holes.y, 4).tolist(),
+                    "ring_mm": [None if np.isnan(v) else round(float(v), 4) for v in ring],
+                },
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+        )
     return 0
 
 
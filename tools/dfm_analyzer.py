@@ -5,43 +5,26 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
-import xlrd
+from bom_store import read_bom
+from fab_cache import FabCache
 
 
-def parse_bom(path: Path) -> Dict[str, Dict]:
-    wb = xlrd.open_workbook(path.as_posix())
-    sheet = wb.sheet_by_index(0)
-    header_row = None
-    headers = {}
-    for row_idx in range(min(30, sheet.nrows)):
-        row = [str(sheet.cell_value(row_idx, c)).strip().lower() for c in range(sheet.ncols)]
-        if "designator" in row:
-            header_row = row_idx
-            for c, name in enumerate(row):
-                headers[name] = c
-            break
-    if header_row is None:
-        raise ValueError("Designator header not found")
+def parse_bom(path: Path, cache: Optional[FabCache] = None) -> Dict[str, Dict]:
+    bom = read_bom(path, cache)
     parts = {}
-    for row_idx in range(header_row + 1, sheet.nrows):
-        designators = str(sheet.cell_value(row_idx, headers["designator"])).strip()
-        if not designators:
-            continue
-        desc = str(sheet.cell_value(row_idx, headers.get("description", -1))).strip()
-        pkg = str(sheet.cell_value(row_idx, headers.get("packagereference", -1))).strip()
-        pn = str(sheet.cell_value(row_idx, headers.get("partnumber", -1))).strip()
-        for ref in [p.strip() for p in designators.replace(";", ",").split(",") if p.strip()]:
-            parts[ref] = {"description": desc, "package": pkg, "part_number": pn}
+    for ref, item in bom.refdes_to_item().items():
+        parts[ref] = {key: item[key] for key in ("description", "package", "part_number")}
     return parts
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls")
+    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls, .xlsx or .csv")
     ap.add_argument("--alts", type=Path, required=True, help="Alternative components JSON")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -50,7 +33,7 @@ def main() -> int:
         json.loads(args.alts.read_text())
         return 0
 
-    bom = parse_bom(args.bom)
+    bom = parse_bom(args.bom, FabCache.open(args.cache_dir))
     alts = json.loads(args.alts.read_text())
 
     package_counts = {}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Drill spacing checks: hole-to-hole web and hole-to-board-edge clearance.
+
+Holes from every drill file are merged into one capsule set (a hit is a
+zero-length slot) and indexed with `spatial_index.SegmentGrid`, so only
+pairs within the search radius are ever measured.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from excellon_parser import DrillData
+from gerber_geometry import DEFAULT_ARC_TOL_MM, expand_rows
+from gerber_parser import Geometry
+from spatial_index import SegmentGrid, segment_distance
+
+
+DEFAULT_MIN_WEB_MM = 0.2
+DEFAULT_MIN_EDGE_MM = 0.3
+# Violations listed in full in reports; the count is always exact.
+MAX_LISTED = 200
+
+
+@dataclass
+class Holes:
+    """Flat hole set in mm; ``source`` indexes ``sources`` (one per drill file)."""
+
+    x: np.ndarray
+    y: np.ndarray
+    x2: np.ndarray
+    y2: np.ndarray
+    diameter: np.ndarray
+    tool: np.ndarray
+    source: np.ndarray
+    sources: List[str]
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def describe(self, k: int) -> Dict:
+        return {
+            "file": self.sources[int(self.source[k])],
+            "tool": str(int(self.tool[k])),
+            "diameter_mm": round(float(self.diameter[k]), 4),
+            "xy_mm": [round(float(self.x[k]), 4), round(float(self.y[k]), 4)],
+        }
+
+
+def merge_holes(drills: Dict[str, DrillData]) -> Holes:
+    names = list(drills)
+    parts = [drills[name] for name in names]
+    cat = lambda attr: np.concatenate([getattr(d, attr) for d in parts]) if parts else np.zeros(0)
+    diameter = np.concatenate([d.diameters() for d in parts]) if parts else np.zeros(0)
+    return Holes(
+        x=cat("x"),
+        y=cat("y"),
+        x2=cat("x2"),
+        y2=cat("y2"),
+        diameter=np.nan_to_num(diameter),
+        tool=cat("tool").astype(np.int64),
+        source=np.repeat(np.arange(len(parts)), [len(d) for d in parts]).astype(np.int64),
+        sources=names,
+    )
+
+
+def hole_webs(holes: Holes, min_web: float) -> Dict:
+    """Pairs whose edge-to-edge web is below ``min_web`` (negative = overlap)."""
+    n = len(holes)
+    r = holes.diameter / 2
+    if n < 2:
+        return {"min_web_mm": min_web, "closest_web_mm": None, "violation_count": 0, "violations": []}
+    r_max = float(r.max())
+    grid = SegmentGrid(holes.x, holes.y, holes.x2, holes.y2, cell=min_web + 2 * r_max)
+    i, j = grid.candidates(holes.x, holes.y, holes.x2, holes.y2, r + min_web + r_max)
+    keep = i < j
+    i, j = i[keep], j[keep]
+    web = segment_distance(
+        holes.x[i], holes.y[i], holes.x2[i], holes.y2[i], holes.x[j], holes.y[j], holes.x2[j], holes.y2[j]
+    ) - r[i] - r[j]
+    bad = np.flatnonzero(web < min_web)
+    bad = bad[np.argsort(web[bad], kind="stable")]
+    return {
+        "min_web_mm": min_web,
+        # Only pairs inside the search radius are measured.
+        "closest_web_mm": round(float(web.min()), 4) if len(web) else None,
+        "violation_count": int(len(bad)),
+        "violations": [
+            {"web_mm": round(float(web[k]), 4), "holes": [holes.describe(i[k]), holes.describe(j[k])]}
+            for k in bad[:MAX_LISTED]
+        ],
+    }
+
+
+def outline_segments(outline: Geometry, tol: float = DEFAULT_ARC_TOL_MM) -> np.ndarray:
+    """Every drawn outline segment as an ``N x 4`` array of mm end points."""
+    px, py, off = expand_rows(outline, tol)
+    point_row = np.repeat(np.arange(len(outline)), np.diff(off))
+    end = np.flatnonzero((outline.op == 1)[point_row])
+    end = end[end > 0]
+    return np.stack([px[end - 1], py[end - 1], px[end], py[end]], axis=1)
+
+
+def edge_clearance(holes: Holes, outline: Optional[Geometry], min_edge: float) -> Dict:
+    """Holes whose edge is closer than ``min_edge`` to the board outline.
+
+    Distances are to the centreline of the outline draws.
+    """
+    report = {"min_edge_mm": min_edge, "closest_edge_mm": None, "violation_count": 0, "violations": []}
+    if outline is None or not len(holes):
+        return report
+    seg = outline_segments(outline)
+    if not len(seg):
+        return report
+    r = holes.diameter / 2
+    grid = SegmentGrid(seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3], cell=min_edge + 2 * float(r.max()))
+    h, s = grid.candidates(holes.x, holes.y, holes.x2, holes.y2, r + min_edge)
+    gap = segment_distance(
+        holes.x[h], holes.y[h], holes.x2[h], holes.y2[h], seg[s, 0], seg[s, 1], seg[s, 2], seg[s, 3]
+    ) - r[h]
+    closest = np.full(len(holes), np.inf)
+    np.minimum.at(closest, h, gap)
+    bad = np.flatnonzero(closest < min_edge)
+    bad = bad[np.argsort(closest[bad], kind="stable")]
+    measured = closest[np.isfinite(closest)]
+    report.update(
+        {
+            "closest_edge_mm": round(float(measured.min()), 4) if len(measured) else None,
+            "violation_count": int(len(bad)),
+            "violations": [
+                dict(holes.describe(k), edge_mm=round(float(closest[k]), 4)) for k in bad[:MAX_LISTED]
+            ],
+        }
+    )
+    return report
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Drill-to-pad registration and annular ring per plated hole.
+
+Pad flashes of each copper layer are indexed with
+`spatial_index.SegmentGrid`; every plated hole is matched to the nearest
+pad centre within the registration tolerance in one vectorized query per
+layer, and the annular ring is measured against that pad's shape. Macro
+pads whose copper cannot be bounded from below (exposure-off primitives,
+thermals) still register but are reported as unchecked for ring.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+from aperture_macros import MacroShape, macro_apertures
+from drill_drc import MAX_LISTED, Holes
+from gerber_parser import Geometry
+from gerber_raster import aperture_table
+from spatial_index import SegmentGrid, segment_distance
+
+
+DEFAULT_REGISTRATION_TOL_MM = 0.05
+DEFAULT_MIN_RING_MM = 0.05
+
+
+@dataclass
+class Pads:
+    """Pad flashes of one layer in mm: centre, half extents and shape flags.
+
+    Non-rectangular pads are treated as stadiums (a circle when ``hw == hh``).
+    ``checked`` is False for pads whose ring cannot be measured.
+    """
+
+    x: np.ndarray
+    y: np.ndarray
+    hw: np.ndarray
+    hh: np.ndarray
+    rect: np.ndarray
+    checked: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+
+def _inside(poly: np.ndarray) -> bool:
+    """Whether the origin lies inside ``poly`` (even-odd rule)."""
+    x0, y0 = poly[:, 0], poly[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    crosses = (y0 > 0) != (y1 > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x0 - y0 * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (x_at > 0)) % 2)
+
+
+def macro_radius(shape: MacroShape) -> float:
+    """Radius of a copper disc about the flash centre, or NaN when unknown.
+
+    The disc is the largest one about the origin that fits inside a single
+    dark primitive, so it never exceeds the real copper. Macros with
+    exposure-off primitives may clear copper anywhere, and macros where no
+    dark primitive covers the centre (thermals, split pads) have no such
+    disc; both return NaN.
+    """
+    if not all(shape.exposure):
+        return math.nan
+    best = math.nan
+    for poly in shape.polygons:
+        if len(poly) < 3 or not _inside(poly):
+            continue
+        nxt = np.roll(poly, -1, axis=0)
+        zero = np.zeros(len(poly))
+        r = float(segment_distance(zero, zero, zero, zero, poly[:, 0], poly[:, 1], nxt[:, 0], nxt[:, 1]).min())
+        best = r if math.isnan(best) else max(best, r)
+    return best
+
+
+def layer_pads(geom: Geometry) -> Pads:
+    """Flash positions and half extents in mm for every decodable aperture.
+
+    Polygon pads use their inscribed circle and macro pads the `macro_radius`
+    disc, so the ring is never over-reported; macro pads without one are
+    kept for registration with ``checked`` False.
+    """
+    shapes: Dict[int, Tuple[float, float, bool, bool]] = {}
+    for code, (shape, params) in aperture_table(geom).items():
+        if shape == "C":
+            shapes[code] = (params[0] / 2, params[0] / 2, False, True)
+        elif shape in ("R", "O") and len(params) >= 2:
+            shapes[code] = (params[0] / 2, params[1] / 2, shape == "R", True)
+        elif shape == "P":
+            r = params[0] / 2 * math.cos(math.pi / max(int(params[1]), 3))
+            shapes[code] = (r, r, False, True)
+    for code, macro in macro_apertures(geom.macros, geom.apertures, geom.unit_mm).items():
+        r = macro_radius(macro)
+        checked = not math.isnan(r)
+        shapes[code] = (r if checked else 0.0, r if checked else 0.0, False, checked)
+
+    flash = np.flatnonzero((geom.op == 3) & (geom.region == 0) & np.isin(geom.aperture, list(shapes)))
+    x, y = geom.xy_mm()
+    table = np.array([shapes[int(c)] for c in geom.aperture[flash]], dtype=np.float64).reshape(-1, 4)
+    return Pads(
+        x=x[flash], y=y[flash], hw=table[:, 0], hh=table[:, 1], rect=table[:, 2].astype(bool), checked=table[:, 3].astype(bool)
+    )
+
+
+def annular_ring(pads: Pads, k: np.ndarray, dx: np.ndarray, dy: np.ndarray, r_hole: np.ndarray) -> np.ndarray:
+    """Smallest copper width around a hole offset by ``(dx, dy)`` from pad ``k``."""
+    hw, hh = pads.hw[k], pads.hh[k]
+    adx, ady = np.abs(dx), np.abs(dy)
+    rect = hw - adx
+    rect = np.minimum(rect, hh - ady)
+    # Round and oblong pads: distance to the stadium core, less its radius.
+    radius = np.minimum(hw, hh)
+    core_x = np.maximum(adx - (hw - radius), 0.0)
+    core_y = np.maximum(ady - (hh - radius), 0.0)
+    stadium = radius - np.hypot(core_x, core_y)
+    return np.where(pads.rect[k], rect, stadium) - r_hole
+
+
+def register_holes(holes: Holes, layers: Dict[str, Geometry], tol: float, min_ring: float) -> Dict:
+    """Match every hole to a pad on each layer and report registration and ring.
+
+    Slots are matched by their midpoint. ``ring_mm`` holds the per-hit
+    minimum ring over all layers, in hole order (NaN where no layer has a
+    matching pad whose ring can be checked).
+    """
+    cx = (holes.x + holes.x2) / 2
+    cy = (holes.y + holes.y2) / 2
+    r_hole = holes.diameter / 2
+    ring = np.full(len(holes), np.inf)
+    per_layer = {}
+    matched_on: Dict[str, np.ndarray] = {}
+    unchecked_on: Dict[str, np.ndarray] = {}
+    for name, geom in layers.items():
+        pads = layer_pads(geom)
+        best_dist = np.full(len(holes), np.inf)
+        best_pad = np.full(len(holes), -1, dtype=np.int64)
+        if len(pads) and len(holes):
+            grid = SegmentGrid(pads.x, pads.y, pads.x, pads.y, cell=max(tol, 1e-3))
+            h, p = grid.candidates(cx, cy, cx, cy, tol)
+            dist = np.hypot(cx[h] - pads.x[p], cy[h] - pads.y[p])
+            # Keep the nearest pad per hole: sort by hole then distance, first wins.
+            order = np.lexsort((dist, h))
+            h, p, dist = h[order], p[order], dist[order]
+            first = np.concatenate(([True], h[1:] != h[:-1])) if len(h) else np.zeros(0, dtype=bool)
+            h, p, dist = h[first], p[first], dist[first]
+            within = dist <= tol
+            best_dist[h[within]] = dist[within]
+            best_pad[h[within]] = p[within]
+        matched = best_pad >= 0
+        m = np.flatnonzero(matched)
+        unchecked = m[~pads.checked[best_pad[m]]]
+        c = m[pads.checked[best_pad[m]]]
+        k = best_pad[c]
+        layer_ring = annular_ring(pads, k, cx[c] - pads.x[k], cy[c] - pads.y[k], r_hole[c])
+        ring[c] = np.minimum(ring[c], layer_ring)
+        matched_on[name] = matched
+        unchecked_on[name] = unchecked
+        per_layer[name] = {
+            "pads": len(pads),
+            "unchecked_pads": int(np.count_nonzero(~pads.checked)),
+            "matched": int(len(m)),
+            "ring_unchecked": int(len(unchecked)),
+            "missing": int(len(holes) - len(m)),
+            "max_offset_mm": round(float(best_dist[m].max()), 4) if len(m) else None,
+            "min_ring_mm": round(float(layer_ring.min()), 4) if len(c) else None,
+        }
+
+    ring[~np.isfinite(ring)] = np.nan
+    measured = ~np.isnan(ring)
+    thin = np.flatnonzero(measured & (ring < min_ring))
+    thin = thin[np.argsort(ring[thin], kind="stable")]
+    registered = np.logical_and.reduce(list(matched_on.values())) if matched_on else np.ones(len(holes), dtype=bool)
+    missing = np.flatnonzero(~registered)
+    unchecked = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + list(unchecked_on.values())))
+    return {
+        "tolerance_mm": tol,
+        "min_ring_required_mm": min_ring,
+        "hole_count": len(holes),
+        "fully_registered": int(registered.sum()),
+        "min_ring_mm": round(float(ring[measured].min()), 4) if measured.any() else None,
+        "layers": per_layer,
+        "thin_ring_count": int(len(thin)),
+        "thin_ring": [dict(holes.describe(k), ring_mm=round(float(ring[k]), 4)) for k in thin[:MAX_LISTED]],
+        "ring_unchecked_count": int(len(unchecked)),
+        "ring_unchecked": [
+            dict(holes.describe(k), unchecked_on=[name for name, hits in unchecked_on.items() if k in hits])
+            for k in unchecked[:MAX_LISTED]
+        ],
+        "unregistered_count": int(len(missing)),
+        "unregistered": [
+            dict(holes.describe(k), missing_on=[name for name, hit in matched_on.items() if not hit[k]])
+            for k in missing[:MAX_LISTED]
+        ],
+        "ring_mm": ring,
+    }
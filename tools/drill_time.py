@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Estimate drill machine time from hit order, travel and tool changes.
+
+Hits of each tool are ordered with a nearest-neighbour tour from the
+machine home, then improved with 2-opt moves. Both steps only look at each
+hit's k nearest hits, found once through `spatial_index.SegmentGrid`, so a
+tool's ordering scales with its hit count rather than its square. Tools
+run smallest diameter first. Slots are ordered by their midpoint and add
+their rout length at the rout feed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from excellon_parser import DrillData, read_drill
+from fab_cache import FabCache
+from spatial_index import SegmentGrid
+
+
+DRILL_FILES = ["PROC091G-RoundHoles.TXT", "PROC091G-SlotHoles.TXT"]
+# Both tour steps only consider each hit's this-many nearest hits.
+DEFAULT_NEIGHBORS = 10
+DEFAULT_TWO_OPT_PASSES = 8
+
+
+@dataclass
+class MachineParams:
+    """Drilling machine model; speeds in mm/s, times in s."""
+
+    rapid_mm_s: float = 400.0
+    spindle_rpm: float = 60000.0
+    chipload_mm: float = 0.02
+    plunge_depth_mm: float = 2.6
+    retract_mm_s: float = 250.0
+    rout_mm_s: float = 15.0
+    tool_change_s: float = 12.0
+    hit_overhead_s: float = 0.05
+
+    def z_feed_mm_s(self) -> float:
+        return self.spindle_rpm * self.chipload_mm / 60.0
+
+    def hit_time_s(self) -> float:
+        return self.plunge_depth_mm / self.z_feed_mm_s() + self.plunge_depth_mm / self.retract_mm_s + self.hit_overhead_s
+
+
+def path_length(pts: np.ndarray, order: np.ndarray, home: np.ndarray) -> float:
+    if not len(order):
+        return 0.0
+    path = np.vstack([home[None, :], pts[order]])
+    return float(np.hypot(*np.diff(path, axis=0).T).sum())
+
+
+def neighbor_lists(pts: np.ndarray, k: int = DEFAULT_NEIGHBORS) -> np.ndarray:
+    """The ``k`` nearest other points of every point, nearest first (-1 pads).
+
+    Candidates come from a `spatial_index.SegmentGrid` sized for a few points
+    per cell; points that find fewer than ``k`` within the search radius are
+    queried again with the radius doubled.
+    """
+    n = len(pts)
+    k = min(k, n - 1)
+    nbrs = np.full((n, max(k, 0)), -1, dtype=np.int64)
+    if k <= 0:
+        return nbrs
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    area = max(float(np.prod(np.maximum(hi - lo, 1e-6))), 1e-12)
+    radius = math.sqrt(area * (k + 1) / (math.pi * n))
+    grid = SegmentGrid(pts[:, 0], pts[:, 1], pts[:, 0], pts[:, 1], cell=radius)
+    todo = np.arange(n)
+    while len(todo):
+        q, s = grid.candidates(pts[todo, 0], pts[todo, 1], pts[todo, 0], pts[todo, 1], radius)
+        q_pt = todo[q]
+        keep = s != q_pt
+        q, s, q_pt = q[keep], s[keep], q_pt[keep]
+        dist = np.hypot(pts[s, 0] - pts[q_pt, 0], pts[s, 1] - pts[q_pt, 1])
+        # Box candidates beyond the radius may be missing nearer points in other cells.
+        within = dist <= radius
+        q, s, dist = q[within], s[within], dist[within]
+        order = np.lexsort((dist, q))
+        q, s = q[order], s[order]
+        start = np.searchsorted(q, np.arange(len(todo)))
+        count = np.diff(np.append(start, len(q)))
+        done = (count >= k) | (count == n - 1)
+        rank = np.arange(len(q)) - np.repeat(start, count)
+        take = done[q] & (rank < k)
+        nbrs[todo[q[take]], rank[take]] = s[take]
+        todo = todo[~done]
+        radius *= 2
+    return nbrs
+
+
+def nearest_neighbor_order(pts: np.ndarray, home: np.ndarray, nbrs: Optional[np.ndarray] = None) -> np.ndarray:
+    """Greedy open tour from ``home`` visiting every point once.
+
+    The next point is the nearest unvisited entry of the current point's
+    neighbour list; only when all of them are visited are the remaining
+    points searched.
+    """
+    n = len(pts)
+    if nbrs is None:
+        nbrs = neighbor_lists(pts)
+    visited = np.zeros(n, dtype=bool)
+    remaining = np.arange(n)
+    order = np.empty(n, dtype=np.int64)
+    cur, cur_pt = -1, home
+    for step in range(n):
+        nxt = -1
+        if cur >= 0:
+            for j in nbrs[cur]:
+                if j >= 0 and not visited[j]:
+                    nxt = int(j)
+                    break
+        if nxt < 0:
+            # Drop visited points once they make up half the search set.
+            if 2 * (n - step) < len(remaining):
+                remaining = remaining[~visited[remaining]]
+            cand = remaining[~visited[remaining]]
+            nxt = int(cand[np.hypot(pts[cand, 0] - cur_pt[0], pts[cand, 1] - cur_pt[1]).argmin()])
+        order[step] = nxt
+        visited[nxt] = True
+        cur, cur_pt = nxt, pts[nxt]
+    return order
+
+
+def two_opt(
+    pts: np.ndarray,
+    order: np.ndarray,
+    home: np.ndarray,
+    nbrs: Optional[np.ndarray] = None,
+    passes: int = DEFAULT_TWO_OPT_PASSES,
+) -> np.ndarray:
+    """Improve an open tour that starts at ``home`` (its end is free).
+
+    Only moves that join a point to one of its ``nbrs`` are tried. Points
+    wait in a work queue and are re-queued when a reversal changes one of
+    their tour edges, so the search settles on the crossings that remain;
+    at most ``passes`` times the point count are examined.
+    """
+    if nbrs is None:
+        nbrs = neighbor_lists(pts)
+    n = len(order) + 1
+    # Node 0 is home, node m + 1 is point m; tour[p] is the node at position p.
+    xy = np.vstack([home[None, :], pts]).tolist()
+    tour = np.concatenate(([0], order + 1))
+    pos = np.empty(n, dtype=np.int64)
+    pos[tour] = np.arange(n)
+    nbr = [[]] + (nbrs + 1).tolist()
+
+    def dist(u: int, v: int) -> float:
+        if u < 0 or v < 0:
+            return 0.0
+        return math.hypot(xy[u][0] - xy[v][0], xy[u][1] - xy[v][1])
+
+    def at(p: int) -> int:
+        return int(tour[p]) if 0 <= p < n else -1
+
+    queue = deque(tour[1:].tolist())
+    queued = np.ones(n, dtype=bool)
+    queued[0] = False
+    budget = passes * n
+    while queue and budget > 0:
+        a = queue.popleft()
+        queued[a] = False
+        budget -= 1
+        i = int(pos[a])
+        for c in nbr[a]:
+            if c <= 0:
+                continue
+            j = int(pos[c])
+            # Successor move: edges a-a' and c-c' become a-c and a'-c'.
+            # Predecessor move: edges 'a-a and 'c-c become 'a-'c and a-c.
+            lo, hi = (i, j) if i < j else (j, i)
+            s_lo, s_hi = at(lo + 1), at(hi + 1)
+            p_lo, p_hi = at(lo - 1), at(hi - 1)
+            u, v = at(lo), at(hi)
+            best, seg = 1e-9, None
+            if hi > lo + 1:
+                gain = dist(u, s_lo) + dist(v, s_hi) - dist(u, v) - dist(s_lo, s_hi)
+                if gain > best:
+                    best, seg = gain, (lo + 1, hi)
+                if lo >= 1:
+                    gain = dist(p_lo, u) + dist(p_hi, v) - dist(p_lo, p_hi) - dist(u, v)
+                    if gain > best:
+                        best, seg = gain, (lo, hi - 1)
+            if seg is None:
+                continue
+            r0, r1 = seg
+            ends = [at(r0 - 1), at(r0), at(r1), at(r1 + 1)]
+            tour[r0 : r1 + 1] = tour[r0 : r1 + 1][::-1]
+            pos[tour[r0 : r1 + 1]] = np.arange(r0, r1 + 1)
+            for node in ends:
+                if node > 0 and not queued[node]:
+                    queued[node] = True
+                    queue.append(node)
+            i = int(pos[a])
+    return tour[1:] - 1
+
+
+def tool_path(pts: np.ndarray, home: np.ndarray, neighbors: int, passes: int) -> Dict:
+    nbrs = neighbor_lists(pts, neighbors)
+    nn = nearest_neighbor_order(pts, home, nbrs)
+    order = two_opt(pts, nn, home, nbrs, passes) if len(pts) > 2 else nn
+    return {
+        "order": order,
+        "file_order_travel_mm": path_length(pts, np.arange(len(pts)), home),
+        "nn_travel_mm": path_length(pts, nn, home),
+        "travel_mm": path_length(pts, order, home),
+    }
+
+
+def estimate_drill(
+    data: DrillData,
+    params: MachineParams,
+    home: np.ndarray = np.zeros(2),
+    neighbors: int = DEFAULT_NEIGHBORS,
+    passes: int = DEFAULT_TWO_OPT_PASSES,
+) -> Dict:
+    """Per-tool travel, hits and time for one drill file, plus file totals."""
+    hit_s = params.hit_time_s()
+    tools = {}
+    used = [t for t in sorted(data.tools, key=lambda t: (data.tools[t], int(t))) if (data.tool == int(t)).any()]
+    for t in used:
+        sel = np.flatnonzero(data.tool == int(t))
+        pts = np.stack([(data.x[sel] + data.x2[sel]) / 2, (data.y[sel] + data.y2[sel]) / 2], axis=1)
+        path = tool_path(pts, home, neighbors, passes)
+        slot = data.slot[sel] == 1
+        rout_mm = float(np.hypot(data.x2[sel] - data.x[sel], data.y2[sel] - data.y[sel])[slot].sum())
+        travel_s = path["travel_mm"] / params.rapid_mm_s
+        tools[t] = {
+            "diameter_mm": data.tools[t],
+            "hits": int((~slot).sum()),
+            "slots": int(slot.sum()),
+            "file_order_travel_mm": round(path["file_order_travel_mm"], 2),
+            "nn_travel_mm": round(path["nn_travel_mm"], 2),
+            "travel_mm": round(path["travel_mm"], 2),
+            "rout_mm": round(rout_mm, 2),
+            "time_s": round(travel_s + len(sel) * hit_s + rout_mm / params.rout_mm_s, 2),
+        }
+    hits = sum(t["hits"] + t["slots"] for t in tools.values())
+    travel = sum(t["travel_mm"] for t in tools.values())
+    rout = sum(t["rout_mm"] for t in tools.values())
+    time = {
+        "travel_s": travel / params.rapid_mm_s,
+        "drilling_s": hits * hit_s,
+        "routing_s": rout / params.rout_mm_s,
+        # The first tool load counts as a change.
+        "tool_change_s": len(used) * params.tool_change_s,
+    }
+    return {
+        "tools": tools,
+        "tool_order": used,
+        "hit_count": hits,
+        "tool_changes": len(used),
+        "file_order_travel_mm": round(sum(t["file_order_travel_mm"] for t in tools.values()), 2),
+        "travel_mm": round(travel, 2),
+        "rout_mm": round(rout, 2),
+        "time": {k: round(v, 1) for k, v in time.items()},
+        "time_s": round(sum(time.values()), 1),
+    }
+
+
+def estimate_fab(
+    gerber_dir: Path,
+    params: MachineParams,
+    cache: Optional[FabCache] = None,
+    neighbors: int = DEFAULT_NEIGHBORS,
+    passes: int = DEFAULT_TWO_OPT_PASSES,
+) -> Dict:
+    files = {
+        name: estimate_drill(read_drill(gerber_dir / name, cache), params, neighbors=neighbors, passes=passes)
+        for name in DRILL_FILES
+        if (gerber_dir / name).exists()
+    }
+    total_s = sum(f["time_s"] for f in files.values())
+    return {
+        "machine": asdict(params),
+        "hit_time_s": round(params.hit_time_s(), 3),
+        "files": files,
+        "hit_count": sum(f["hit_count"] for f in files.values()),
+        "tool_changes": sum(f["tool_changes"] for f in files.values()),
+        "travel_mm": round(sum(f["travel_mm"] for f in files.values()), 2),
+        "time_s": round(total_s, 1),
+        "time_min": round(total_s / 60, 2),
+    }
+
+
+def add_machine_arguments(ap: argparse.ArgumentParser) -> None:
+    defaults = MachineParams()
+    ap.add_argument("--rapid-mm-s", type=float, default=defaults.rapid_mm_s, help="XY rapid traverse speed")
+    ap.add_argument("--spindle-rpm", type=float, default=defaults.spindle_rpm, help="Spindle speed")
+    ap.add_argument("--chipload-mm", type=float, default=defaults.chipload_mm, help="Feed per revolution")
+    ap.add_argument("--plunge-depth-mm", type=float, default=defaults.plunge_depth_mm, help="Stack depth drilled per hit")
+    ap.add_argument("--retract-mm-s", type=float, default=defaults.retract_mm_s, help="Z retract speed")
+    ap.add_argument("--rout-mm-s", type=float, default=defaults.rout_mm_s, help="Slot rout feed")
+    ap.add_argument("--tool-change-s", type=float, default=defaults.tool_change_s, help="Time per tool change")
+    ap.add_argument("--hit-overhead-s", type=float, default=defaults.hit_overhead_s, help="Settle time per hit")
+
+
+def machine_params(args: argparse.Namespace) -> MachineParams:
+    return MachineParams(**{name: getattr(args, name) for name in asdict(MachineParams())})
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fab-dir", type=Path, required=True, help="Fabrication package directory")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS, help="Nearest hits considered per hit when ordering")
+    ap.add_argument("--two-opt-passes", type=int, default=DEFAULT_TWO_OPT_PASSES, help="Maximum 2-opt passes")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
+    add_machine_arguments(ap)
+    args = ap.parse_args()
+
+    if args.dry_run:
+        return 0
+
+    report = estimate_fab(
+        args.fab_dir / "GerberNCdrills",
+        machine_params(args),
+        FabCache.open(args.cache_dir),
+        args.neighbors,
+        args.two_opt_passes,
+    )
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
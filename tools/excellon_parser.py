@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Streaming Excellon drill parser shared by the drill tools.
+
+The file is read line by line and every hit and slot is collected into
+columnar NumPy arrays in millimetres, so hole checks can be vectorized the
+same way as `gerber_parser.Geometry`. Supported: METRIC/INCH with LZ/TZ zero
+suppression (and explicit ``000.000`` or Altium ``;FILE_FORMAT=`` formats),
+decimal-point coordinates, absolute and incremental modes, ``G85`` slots,
+``R`` repeat codes and routed slots (``G00``/``M15``/``G01``/``M16``).
+Circular rout moves are recorded as straight slots between their ends.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from fab_cache import FabCache
+
+
+PARSER_VERSION = 1
+FIELD_RE = re.compile(r"([A-Z])([+-]?[0-9.]*)")
+TOOL_DEF_RE = re.compile(r"^T(\d+)(?:[A-BD-Z][+-]?[0-9.]*)*C([0-9.]+)")
+FORMAT_RE = re.compile(r"(0+)\.(0+)")
+FILE_FORMAT_RE = re.compile(r";\s*FILE_FORMAT\s*=\s*(\d+):(\d+)")
+# Default integer/decimal digits when the file does not state a format.
+DEFAULT_FORMAT = {"METRIC": (3, 3), "INCH": (2, 4)}
+DRILL_COLUMNS = ("x", "y", "x2", "y2", "tool", "slot")
+
+
+def normalize_tool(tool_id: str) -> str:
+    return str(int(tool_id))
+
+
+def _empty_f() -> np.ndarray:
+    return np.empty(0, dtype=np.float64)
+
+
+def _empty_i() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+@dataclass
+class DrillData:
+    """Columnar view of every hole in a drill file.
+
+    Row ``k`` is one hole in mm: ``x``/``y`` is the hit (or slot start),
+    ``x2``/``y2`` the slot end (equal to ``x``/``y`` for plain hits),
+    ``tool`` the tool number and ``slot`` 1 for slots. ``tools`` maps
+    normalized tool ids to diameters in mm; ``plated`` is taken from an
+    Altium ``;TYPE=`` comment when present.
+    """
+
+    unit: str = "METRIC"
+    zeros: str = "TZ"
+    fmt: Tuple[int, int] = DEFAULT_FORMAT["METRIC"]
+    plated: Optional[bool] = None
+    tools: Dict[str, float] = field(default_factory=dict)
+    x: np.ndarray = field(default_factory=_empty_f)
+    y: np.ndarray = field(default_factory=_empty_f)
+    x2: np.ndarray = field(default_factory=_empty_f)
+    y2: np.ndarray = field(default_factory=_empty_f)
+    tool: np.ndarray = field(default_factory=_empty_i)
+    slot: np.ndarray = field(default_factory=_empty_i)
+
+    def __len__(self) -> int:
+        return len(self.tool)
+
+    def diameters(self) -> np.ndarray:
+        """Per-row hole diameter in mm (NaN for undefined tools)."""
+        if not len(self):
+            return _empty_f()
+        table = np.full(max(int(self.tool.max()), max(map(int, self.tools), default=0)) + 2, np.nan)
+        for t, diameter in self.tools.items():
+            table[int(t)] = diameter
+        # Rows before any tool selection carry tool -1, the table's NaN tail.
+        return table[self.tool]
+
+    def hits(self, tool: str) -> np.ndarray:
+        """``N x 2`` hit (or slot start) coordinates of one tool."""
+        sel = self.tool == int(tool)
+        return np.stack([self.x[sel], self.y[sel]], axis=1)
+
+    def by_tool(self) -> Dict[str, np.ndarray]:
+        return {t: self.hits(t) for t in self.tools}
+
+    def tool_summary(self) -> Dict[str, Dict]:
+        known = self.tool >= 0
+        counts = np.bincount(self.tool[known], minlength=1)
+        slots = np.bincount(self.tool[known], weights=self.slot[known], minlength=1)
+        summary = {}
+        for t, diameter in self.tools.items():
+            k = int(t)
+            summary[t] = {
+                "diameter_mm": diameter,
+                "count": int(counts[k]) if k < len(counts) else 0,
+                "slot_count": int(slots[k]) if k < len(slots) else 0,
+            }
+        return summary
+
+    def to_record(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        header = {
+            "unit": self.unit,
+            "zeros": self.zeros,
+            "fmt": list(self.fmt),
+            "plated": self.plated,
+            "tools": self.tools,
+        }
+        return header, {name: getattr(self, name) for name in DRILL_COLUMNS}
+
+    @classmethod
+    def from_record(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "DrillData":
+        data = cls(
+            unit=header["unit"],
+            zeros=header["zeros"],
+            fmt=tuple(header["fmt"]),
+            plated=header["plated"],
+            tools=header["tools"],
+        )
+        for name in DRILL_COLUMNS:
+            setattr(data, name, arrays[name])
+        return data
+
+
+class _State:
+    def __init__(self, data: DrillData) -> None:
+        self.data = data
+        self.fmt_explicit = False
+        self.scale = 1.0
+        self.incremental = False
+        self.x = self.y = 0.0
+        self.tool = -1
+        self.rout = False
+        self.plunged = False
+        self.cols = {name: array("d") for name in ("x", "y", "x2", "y2")}
+        self.tools = array("q")
+        self.slots = array("q")
+
+    def set_unit(self, unit: str) -> None:
+        self.data.unit = unit
+        self.scale = 25.4 if unit == "INCH" else 1.0
+        if not self.fmt_explicit:
+            self.data.fmt = DEFAULT_FORMAT[unit]
+
+    def coord(self, raw: str) -> float:
+        if "." in raw:
+            return float(raw) * self.scale
+        sign = -1.0 if raw.startswith("-") else 1.0
+        digits = raw.lstrip("+-")
+        n_int, n_dec = self.data.fmt
+        if self.data.zeros == "LZ":
+            # Leading zeros kept, trailing zeros suppressed: left-aligned.
+            digits = digits.ljust(n_int + n_dec, "0")
+        return sign * int(digits or "0") / 10 ** n_dec * self.scale
+
+    def move(self, fields: Dict[str, str]) -> Tuple[float, float]:
+        x, y = self.x, self.y
+        if "X" in fields:
+            v = self.coord(fields["X"])
+            x = x + v if self.incremental else v
+        if "Y" in fields:
+            v = self.coord(fields["Y"])
+            y = y + v if self.incremental else v
+        return x, y
+
+    def add(self, x: float, y: float, x2: float, y2: float, slot: int) -> None:
+        for name, value in zip(("x", "y", "x2", "y2"), (x, y, x2, y2)):
+            self.cols[name].append(value)
+        self.tools.append(self.tool)
+        self.slots.append(slot)
+
+    def finish(self) -> DrillData:
+        for name, values in self.cols.items():
+            setattr(self.data, name, np.frombuffer(values, dtype=np.float64) if len(values) else _empty_f())
+        self.data.tool = np.frombuffer(self.tools, dtype=np.int64) if len(self.tools) else _empty_i()
+        self.data.slot = np.frombuffer(self.slots, dtype=np.int64) if len(self.slots) else _empty_i()
+        return self.data
+
+
+def _header_line(state: _State, line: str) -> None:
+    data = state.data
+    for unit in ("METRIC", "INCH"):
+        if line.startswith(unit):
+            state.set_unit(unit)
+            parts = line.split(",")[1:]
+            for part in parts:
+                if part in ("LZ", "TZ"):
+                    data.zeros = part
+                else:
+                    m = FORMAT_RE.fullmatch(part)
+                    if m:
+                        data.fmt = (len(m.group(1)), len(m.group(2)))
+                        state.fmt_explicit = True
+            return
+    if line.startswith("ICI"):
+        state.incremental = line.endswith("ON")
+
+
+def _body_line(state: _State, line: str) -> None:
+    data = state.data
+    if line.startswith("T"):
+        m = TOOL_DEF_RE.match(line)
+        if m:
+            data.tools[normalize_tool(m.group(1))] = float(m.group(2)) * state.scale
+            return
+        m = re.match(r"T(\d+)", line)
+        if m:
+            state.tool = int(m.group(1))
+            line = line[m.end():]
+            if not line:
+                return
+    if line in ("M71", "M72"):
+        state.set_unit("METRIC" if line == "M71" else "INCH")
+        return
+    if line in ("G90", "G91"):
+        state.incremental = line == "G91"
+        return
+    if line == "M15":
+        state.plunged = True
+        return
+    if line in ("M16", "M17"):
+        state.plunged = False
+        return
+    if line.startswith("M") or line.startswith("G05"):
+        state.rout = False
+        return
+
+    if "G85" in line:
+        head, tail = line.split("G85", 1)
+        sx, sy = state.move(dict(FIELD_RE.findall(head)))
+        state.x, state.y = sx, sy
+        ex, ey = state.move(dict(FIELD_RE.findall(tail)))
+        state.x, state.y = ex, ey
+        state.add(sx, sy, ex, ey, 1)
+        return
+
+    fields = dict(FIELD_RE.findall(line))
+    if "R" in fields:
+        # Repeat the last hit R times, stepping by X/Y each time.
+        dx = state.coord(fields["X"]) if "X" in fields else 0.0
+        dy = state.coord(fields["Y"]) if "Y" in fields else 0.0
+        for _ in range(int(fields["R"] or "0")):
+            state.x += dx
+            state.y += dy
+            state.add(state.x, state.y, state.x, state.y, 0)
+        return
+    g = fields.get("G")
+    if g is not None:
+        code = int(g or "0")
+        if code == 0:
+            state.rout = True
+            state.plunged = False
+            state.x, state.y = state.move(fields)
+            return
+        if code in (1, 2, 3):
+            state.rout = True
+            ex, ey = state.move(fields)
+            if state.plunged:
+                state.add(state.x, state.y, ex, ey, 1)
+            state.x, state.y = ex, ey
+            return
+        if code in (90, 91):
+            state.incremental = code == 91
+    if "X" in fields or "Y" in fields:
+        state.x, state.y = state.move(fields)
+        if not state.rout:
+            state.add(state.x, state.y, state.x, state.y, 0)
+
+
+def read_drill(path: Path, cache: Optional[FabCache] = None) -> DrillData:
+    """Parse an Excellon file into a `DrillData`, through ``cache`` if given."""
+    if cache is not None:
+        header, arrays = cache.load(path, "excellon", PARSER_VERSION, lambda p: read_drill(p).to_record())
+        return DrillData.from_record(header, arrays)
+    state = _State(DrillData())
+    in_header = False
+    with path.open("r", errors="ignore") as stream:
+        for raw in stream:
+            line = raw.strip()
+            if not line:
+                continue
+            if line.startswith(";"):
+                m = FILE_FORMAT_RE.match(line)
+                if m:
+                    state.data.fmt = (int(m.group(1)), int(m.group(2)))
+                    state.fmt_explicit = True
+                elif line.replace(" ", "").upper().startswith(";TYPE="):
+                    state.data.plated = line.split("=", 1)[1].strip().upper() == "PLATED"
+                continue
+            if line == "M48":
+                in_header = True
+                continue
+            if in_header and line in ("%", "M95"):
+                in_header = False
+                continue
+            if line == "M30" or line == "M00":
+                break
+            if in_header:
+                if line.startswith("T"):
+                    _body_line(state, line)
+                else:
+                    _header_line(state, line)
+                continue
+            _body_line(state, line)
+    return state.finish()
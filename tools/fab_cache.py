@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for parsed fabrication artifacts.
+
+Entries are keyed by the SHA-256 of the input file plus a parser namespace
+and version, and stored as `.npz` archives: parse-result arrays as-is and a
+small JSON header for everything else. The directory is kept under a byte
+budget by evicting least-recently-used entries.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+CACHE_ENV = "OPEN_MMWAVE_CACHE_DIR"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+HEADER_KEY = "__header__"
+
+ParseResult = Tuple[Dict, Dict[str, np.ndarray]]
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class FabCache:
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def open(cls, root: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> Optional["FabCache"]:
+        """Return a cache at ``root`` or ``$OPEN_MMWAVE_CACHE_DIR``; None when neither is set."""
+        if root is None:
+            env = os.environ.get(CACHE_ENV)
+            if not env:
+                return None
+            root = Path(env)
+        return cls(root, max_bytes)
+
+    def entry_path(self, path: Path, namespace: str, version: int) -> Path:
+        return self.root / f"{namespace}-v{version}-{file_digest(path)}.npz"
+
+    def get(self, entry: Path) -> Optional[ParseResult]:
+        try:
+            with np.load(entry, allow_pickle=False) as data:
+                arrays = {key: data[key] for key in data.files}
+            header = json.loads(arrays.pop(HEADER_KEY).tobytes().decode())
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            # Missing, truncated or corrupt entry: treat as a miss and re-parse.
+            return None
+        os.utime(entry)
+        return header, arrays
+
+    def put(self, entry: Path, header: Dict, arrays: Dict[str, np.ndarray]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = dict(arrays)
+        payload[HEADER_KEY] = np.frombuffer(json.dumps(header, sort_keys=True).encode(), dtype=np.uint8)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **payload)
+            os.replace(tmp, entry)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def load(self, path: Path, namespace: str, version: int, parse: Callable[[Path], ParseResult]) -> ParseResult:
+        """Return the cached parse of ``path``, running ``parse`` on a miss."""
+        entry = self.entry_path(path, namespace, version)
+        hit = self.get(entry)
+        if hit is not None:
+            return hit
+        header, arrays = parse(path)
+        self.put(entry, header, arrays)
+        return header, arrays
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits its budget."""
+        entries = []
+        total = 0
+        for item in os.scandir(self.root):
+            if item.is_file() and item.name.endswith(".npz"):
+                st = item.stat()
+                entries.append((st.st_mtime, st.st_size, item.path))
+                total += st.st_size
+        removed = 0
+        for _mtime, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(entry)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cache-dir", type=Path, help=f"Cache directory (default: ${CACHE_ENV})")
+    ap.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="Cache size budget in MiB")
+    ap.add_argument("--clear", action="store_true", help="Remove every cache entry")
+    args = ap.parse_args()
+
+    cache = FabCache.open(args.cache_dir, args.max_mb * 1024 * 1024)
+    if cache is None or not cache.root.exists():
+        return 0
+    if args.clear:
+        cache.max_bytes = 0
+    removed = cache.evict()
+    print(f"Evicted {removed} entries from {cache.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,65 +4,38 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 
-APERTURE_RE = re.compile(r"%ADD(\d+)([A-Z]),?([0-9.X]+)\*%")
-COORD_RE = re.compile(r"X(-?\d+)Y(-?\d+)")
-FORMAT_RE = re.compile(r"%FS[LA]X(\d)(\d)Y(\d)(\d)\*%")
-UNIT_RE = re.compile(r"%MO(IN|MM)\*%")
+from fab_cache import FabCache
+from gerber_geometry import geometry_bounds
+from gerber_parser import read_geometry, to_mm
 
 
-def parse_gerber(path: Path) -> Dict:
-    apertures = {}
-    draw_count = 0
-    flash_count = 0
-    min_x = min_y = None
-    max_x = max_y = None
-    unit = None
+def parse_gerber(path: Path, cache: Optional[FabCache] = None) -> Dict:
+    geom = read_geometry(path, cache=cache)
+    unit = geom.unit
     fmt = None
-    for line in path.read_text(errors="ignore").splitlines():
-        m_unit = UNIT_RE.search(line)
-        if m_unit:
-            unit = m_unit.group(1)
-        m_fmt = FORMAT_RE.search(line)
-        if m_fmt:
-            fmt = {
-                "x_int": int(m_fmt.group(1)),
-                "x_dec": int(m_fmt.group(2)),
-                "y_int": int(m_fmt.group(3)),
-                "y_dec": int(m_fmt.group(4)),
-            }
-        m = APERTURE_RE.search(line)
-        if m:
-            apertures[m.group(1)] = {"shape": m.group(2), "params": m.group(3)}
-        if "D01" in line:
-            draw_count += 1
-        if "D03" in line:
-            flash_count += 1
-        m = COORD_RE.search(line)
-        if m:
-            x = int(m.group(1))
-            y = int(m.group(2))
-            min_x = x if min_x is None else min(min_x, x)
-            max_x = x if max_x is None else max(max_x, x)
-            min_y = y if min_y is None else min(min_y, y)
-            max_y = y if max_y is None else max(max_y, y)
+    if geom.fmt is not None:
+        fmt = {
+            "x_int": geom.fmt.x_int,
+            "x_dec": geom.fmt.x_dec,
+            "y_int": geom.fmt.y_int,
+            "y_dec": geom.fmt.y_dec,
+        }
+    draw_count = int(np.count_nonzero(geom.op == 1))
+    flash_count = int(np.count_nonzero(geom.op == 3))
+    min_x, max_x, min_y, max_y = geometry_bounds(geom) or (None, None, None, None)
     bounds_mm = None
     if fmt and min_x is not None and min_y is not None:
-        scale_x = 10 ** fmt["x_dec"]
-        scale_y = 10 ** fmt["y_dec"]
-        min_x_u = min_x / scale_x
-        max_x_u = max_x / scale_x
-        min_y_u = min_y / scale_y
-        max_y_u = max_y / scale_y
-        if unit == "IN":
-            min_x_u *= 25.4
-            max_x_u *= 25.4
-            min_y_u *= 25.4
-            max_y_u *= 25.4
+        min_x_u = to_mm(min_x, fmt["x_dec"], unit)
+        max_x_u = to_mm(max_x, fmt["x_dec"], unit)
+        min_y_u = to_mm(min_y, fmt["y_dec"], unit)
+        max_y_u = to_mm(max_y, fmt["y_dec"], unit)
         bounds_mm = {
             "min_x_mm": min_x_u,
             "max_x_mm": max_x_u,
@@ -70,7 +43,11 @@ def parse_gerber(path: Path) -> Dict:
             "max_y_mm": max_y_u,
         }
     return {
-        "aperture_count": len(apertures),
+        "aperture_count": len(geom.apertures),
+        "macro_count": len(geom.macros),
+        "file_function": ",".join(geom.file_attributes.get(".FileFunction", [])) or None,
+        "net_count": len(geom.nets),
+        "component_count": len(geom.components),
         "draw_count": draw_count,
         "flash_count": flash_count,
         "unit": unit,
@@ -85,10 +62,25 @@ def parse_gerber(path: Path) -> Dict:
     }
 
 
+def analyze_layers(paths: Dict[str, Path], jobs: int = 1, cache: Optional[FabCache] = None) -> Dict[str, Dict]:
+    """Parse each layer, optionally across a process pool.
+
+    Results are keyed in input order regardless of completion order, so the
+    report is identical to a serial run.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        return {name: parse_gerber(path, cache) for name, path in paths.items()}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        results = pool.map(partial(parse_gerber, cache=cache), paths.values())
+        return dict(zip(paths.keys(), results))
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--fab-dir", type=Path, required=True, help="Fabrication package directory")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--jobs", type=int, default=1, help="Parallel worker processes (default: serial)")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -114,12 +106,14 @@ def main() -> int:
         "outline": "PROC091G.GM1",
     }
     report = {"layers": {}, "missing_layers": []}
+    present = {}
     for name, fname in layers.items():
         path = gerber_dir / fname
         if not path.exists():
             report["missing_layers"].append(fname)
             continue
-        report["layers"][name] = parse_gerber(path)
+        present[name] = path
+    report["layers"] = analyze_layers(present, args.jobs, FabCache.open(args.cache_dir))
 
     args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
     return 0
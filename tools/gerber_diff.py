@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Geometric diff of two revisions of Gerber layers.
+
+Both revisions are rasterized on one shared grid, optionally shifted so
+their board outlines line up, and compared tile by tile. A tile is only
+rendered when the vector content overlapping it differs (see
+`LayerRaster.tile_signature`); rendered tiles are XOR-ed and changed pixels
+are grouped into 8-connected clusters of cells reported as mm bounding
+boxes.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from copper_density import OUTLINE_LAYER, outline_bounds
+from copper_extractor import COPPER_LAYERS
+from fab_cache import FabCache, file_digest
+from gerber_parser import read_geometry
+from gerber_raster import Bounds, LayerRaster
+
+
+DEFAULT_PITCH_UM = 25.0
+DEFAULT_TILE_PX = 512
+# Changed pixels are clustered on a grid of cells this many pixels wide.
+CELL_PX = 16
+
+Cell = Tuple[int, int]
+
+
+def _union(a: Bounds, b: Bounds) -> Bounds:
+    return min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+
+
+def _changed_cells(xor: np.ndarray, row0: int, col0: int, cells: Dict[Cell, List[int]]) -> None:
+    """Accumulate per-cell changed-pixel count and pixel bbox from one tile."""
+    rows, cols = xor.shape
+    pr, pc = -(-rows // CELL_PX) * CELL_PX, -(-cols // CELL_PX) * CELL_PX
+    padded = np.zeros((pr, pc), dtype=bool)
+    padded[:rows, :cols] = xor
+    blocks = padded.reshape(pr // CELL_PX, CELL_PX, pc // CELL_PX, CELL_PX)
+    count = blocks.sum(axis=(1, 3))
+    row_any = blocks.any(axis=3)
+    col_any = blocks.any(axis=1)
+    first_r = row_any.argmax(axis=1)
+    last_r = CELL_PX - 1 - row_any[:, ::-1].argmax(axis=1)
+    first_c = col_any.argmax(axis=2)
+    last_c = CELL_PX - 1 - col_any[:, :, ::-1].argmax(axis=2)
+    for br, bc in zip(*np.nonzero(count)):
+        r = row0 + br * CELL_PX
+        c = col0 + bc * CELL_PX
+        cells[(r // CELL_PX, c // CELL_PX)] = [
+            int(count[br, bc]),
+            r + int(first_r[br, bc]),
+            r + int(last_r[br, bc]),
+            c + int(first_c[br, bc]),
+            c + int(last_c[br, bc]),
+        ]
+
+
+def _clusters(cells: Dict[Cell, List[int]]) -> List[List[int]]:
+    """Group 8-connected changed cells; returns ``[pixels, r0, r1, c0, c1]`` each."""
+    seen = set()
+    out = []
+    for start in sorted(cells):
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [start]
+        acc = list(cells[start])
+        while stack:
+            r, c = stack.pop()
+            for nb in ((r + dr, c + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)):
+                if nb in cells and nb not in seen:
+                    seen.add(nb)
+                    stack.append(nb)
+                    px, r0, r1, c0, c1 = cells[nb]
+                    acc = [acc[0] + px, min(acc[1], r0), max(acc[2], r1), min(acc[3], c0), max(acc[4], c1)]
+        out.append(acc)
+    return out
+
+
+def diff_layers(
+    old_path: Path,
+    new_path: Path,
+    pitch_mm: float = DEFAULT_PITCH_UM / 1000.0,
+    offset_mm: Tuple[float, float] = (0.0, 0.0),
+    tile_px: int = DEFAULT_TILE_PX,
+    cache: Optional[FabCache] = None,
+) -> Dict:
+    """XOR two versions of a layer; ``offset_mm`` is added to old coordinates to reach new ones."""
+    if offset_mm == (0.0, 0.0) and file_digest(old_path) == file_digest(new_path):
+        return {
+            "identical_file": True,
+            "tiles": {"total": 0, "skipped": 0, "rendered": 0},
+            "changed_px": 0,
+            "changed_area_mm2": 0.0,
+            "regions": [],
+        }
+    tile_px = max(CELL_PX, tile_px // CELL_PX * CELL_PX)
+    old_geom = read_geometry(old_path, cache=cache)
+    new_geom = read_geometry(new_path, cache=cache)
+    old = LayerRaster(old_geom, pitch_mm, tile_px=tile_px)
+    new = LayerRaster(new_geom, pitch_mm, tile_px=tile_px)
+    ne = new.extent()
+    bounds = _union(old.extent(), (ne[0] - offset_mm[0], ne[1] - offset_mm[0], ne[2] - offset_mm[1], ne[3] - offset_mm[1]))
+    shifted = (bounds[0] + offset_mm[0], bounds[1] + offset_mm[0], bounds[2] + offset_mm[1], bounds[3] + offset_mm[1])
+    old = LayerRaster(old_geom, pitch_mm, bounds_mm=bounds, tile_px=tile_px)
+    new = LayerRaster(new_geom, pitch_mm, bounds_mm=shifted, tile_px=tile_px)
+
+    cells: Dict[Cell, List[int]] = {}
+    skipped = rendered = 0
+    changed_px = 0
+    for row0 in range(0, old.rows, tile_px):
+        for col0 in range(0, old.cols, tile_px):
+            rows = min(tile_px, old.rows - row0)
+            cols = min(tile_px, old.cols - col0)
+            if old.tile_signature(row0, col0, rows, cols) == new.tile_signature(row0, col0, rows, cols):
+                skipped += 1
+                continue
+            rendered += 1
+            xor = old.render_tile(row0, col0, rows, cols) ^ new.render_tile(row0, col0, rows, cols)
+            if xor.any():
+                changed_px += int(np.count_nonzero(xor))
+                _changed_cells(xor, row0, col0, cells)
+
+    regions = []
+    for px, r0, r1, c0, c1 in sorted(_clusters(cells), key=lambda acc: -acc[0]):
+        regions.append(
+            {
+                "changed_px": px,
+                "bbox_mm": [
+                    round(bounds[0] + c0 * pitch_mm, 4),
+                    round(bounds[0] + (c1 + 1) * pitch_mm, 4),
+                    round(bounds[2] + r0 * pitch_mm, 4),
+                    round(bounds[2] + (r1 + 1) * pitch_mm, 4),
+                ],
+            }
+        )
+    return {
+        "identical_file": False,
+        "tiles": {"total": -(-old.rows // tile_px) * -(-old.cols // tile_px), "skipped": skipped, "rendered": rendered},
+        "changed_px": changed_px,
+        "changed_area_mm2": round(changed_px * pitch_mm ** 2, 4),
+        "regions": regions,
+    }
+
+
+def _diff_job(job: Tuple) -> Dict:
+    return diff_layers(*job)
+
+
+def outline_offset(old_dir: Path, new_dir: Path, cache: Optional[FabCache] = None) -> Tuple[float, float]:
+    """Shift that moves the old outline's lower-left corner onto the new one."""
+    old_outline, new_outline = old_dir / OUTLINE_LAYER, new_dir / OUTLINE_LAYER
+    if not (old_outline.exists() and new_outline.exists()):
+        return 0.0, 0.0
+    a = outline_bounds(read_geometry(old_outline, cache=cache))
+    b = outline_bounds(read_geometry(new_outline, cache=cache))
+    if a is None or b is None:
+        return 0.0, 0.0
+    return b[0] - a[0], b[2] - a[2]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--old-fab-dir", type=Path, required=True, help="Previous revision fabrication package")
+    ap.add_argument("--new-fab-dir", type=Path, required=True, help="New revision fabrication package")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON report")
+    ap.add_argument("--layers", nargs="*", default=COPPER_LAYERS, help="Layer file names to compare")
+    ap.add_argument("--pitch-um", type=float, default=DEFAULT_PITCH_UM, help="Raster pixel pitch")
+    ap.add_argument("--tile-px", type=int, default=DEFAULT_TILE_PX, help="Comparison tile edge in pixels")
+    ap.add_argument("--align", choices=["outline", "none"], default="outline", help="Align revisions by board outline")
+    ap.add_argument("--jobs", type=int, default=1, help="Parallel worker processes (default: serial)")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
+    args = ap.parse_args()
+
+    if args.dry_run:
+        return 0
+
+    old_dir = args.old_fab_dir / "GerberNCdrills"
+    new_dir = args.new_fab_dir / "GerberNCdrills"
+    cache = FabCache.open(args.cache_dir)
+    offset = outline_offset(old_dir, new_dir, cache) if args.align == "outline" else (0.0, 0.0)
+    pitch = args.pitch_um / 1000.0
+
+    report = {"pitch_mm": pitch, "offset_mm": list(offset), "layers": {}, "missing_layers": []}
+    jobs = {}
+    for fname in args.layers:
+        if not ((old_dir / fname).exists() and (new_dir / fname).exists()):
+            report["missing_layers"].append(fname)
+            continue
+        jobs[fname] = (old_dir / fname, new_dir / fname, pitch, offset, args.tile_px, cache)
+    if args.jobs <= 1 or len(jobs) <= 1:
+        report["layers"] = {fname: _diff_job(job) for fname, job in jobs.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            report["layers"] = dict(zip(jobs.keys(), pool.map(_diff_job, jobs.values())))
+    report["changed_layers"] = [fname for fname, layer in report["layers"].items() if layer["changed_px"]]
+
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Derived Gerber geometry: arcs, region contours and polygon metrics.
+
+Everything here works on the columnar `gerber_parser.Geometry` and returns
+millimetre NumPy arrays. Polygon sets are stored flat, as concatenated
+vertex arrays plus an ``offsets`` array (contour ``k`` is
+``x[offsets[k]:offsets[k + 1]]``), so per-polygon metrics reduce to
+``np.add.reduceat`` calls.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from gerber_parser import Geometry
+
+
+DEFAULT_ARC_TOL_MM = 0.005
+
+
+def _empty_f() -> np.ndarray:
+    return np.empty(0, dtype=np.float64)
+
+
+def _no_offsets() -> np.ndarray:
+    return np.zeros(1, dtype=np.int64)
+
+
+@dataclass
+class Contours:
+    """Flat polygon set with per-contour polarity and starting geometry row."""
+
+    x: np.ndarray = field(default_factory=_empty_f)
+    y: np.ndarray = field(default_factory=_empty_f)
+    offsets: np.ndarray = field(default_factory=_no_offsets)
+    polarity: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    row: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for k in range(len(self)):
+            lo, hi = self.offsets[k], self.offsets[k + 1]
+            yield np.stack([self.x[lo:hi], self.y[lo:hi]], axis=1)
+
+
+@dataclass
+class Arcs:
+    """Circular segments of a layer, one entry per G02/G03 draw.
+
+    ``sweep`` is signed: positive counter-clockwise, negative clockwise.
+    """
+
+    rows: np.ndarray
+    sx: np.ndarray
+    sy: np.ndarray
+    ex: np.ndarray
+    ey: np.ndarray
+    cx: np.ndarray
+    cy: np.ndarray
+    r: np.ndarray
+    a0: np.ndarray
+    sweep: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def _unsigned_sweep(a0: np.ndarray, a1: np.ndarray, clockwise: np.ndarray) -> np.ndarray:
+    return np.where(clockwise, a0 - a1, a1 - a0) % (2 * math.pi)
+
+
+def find_arcs(geom: Geometry) -> Arcs:
+    """Resolve centre, radius and sweep of every arc draw in one pass.
+
+    In multi-quadrant mode (G75) I/J are signed offsets and coincident end
+    points mean a full circle. In single-quadrant mode (G74) they are
+    unsigned; of the four sign choices the one with a sweep of at most 90
+    degrees and the best-matching start and end radii is taken.
+    """
+    x, y = geom.xy_mm()
+    scale_x, scale_y = geom.scale_mm()
+    # Zero I/J cannot describe a circle; such draws are treated as lines.
+    rows = np.flatnonzero((geom.op == 1) & (geom.interp != 1) & ((geom.i != 0) | (geom.j != 0)))
+    prev = rows - 1
+    sx = np.where(prev >= 0, x[np.maximum(prev, 0)], 0.0)
+    sy = np.where(prev >= 0, y[np.maximum(prev, 0)], 0.0)
+    ex, ey = x[rows], y[rows]
+    i = geom.i[rows] * scale_x
+    j = geom.j[rows] * scale_y
+    clockwise = geom.interp[rows] == 2
+    single = geom.quadrant[rows] == 74
+
+    cx, cy = sx + i, sy + j
+    if single.any():
+        signs = np.array([(1, 1), (-1, 1), (1, -1), (-1, -1)], dtype=np.float64)
+        ccx = sx[:, None] + np.abs(i)[:, None] * signs[:, 0]
+        ccy = sy[:, None] + np.abs(j)[:, None] * signs[:, 1]
+        sweep = _unsigned_sweep(
+            np.arctan2(sy[:, None] - ccy, sx[:, None] - ccx),
+            np.arctan2(ey[:, None] - ccy, ex[:, None] - ccx),
+            clockwise[:, None],
+        )
+        err = np.abs(np.hypot(sx[:, None] - ccx, sy[:, None] - ccy) - np.hypot(ex[:, None] - ccx, ey[:, None] - ccy))
+        err = np.where(sweep <= math.pi / 2 + 1e-9, err, np.inf)
+        pick = np.argmin(err, axis=1)
+        take = np.arange(len(rows))
+        cx = np.where(single, ccx[take, pick], cx)
+        cy = np.where(single, ccy[take, pick], cy)
+
+    a0 = np.arctan2(sy - cy, sx - cx)
+    sweep = _unsigned_sweep(a0, np.arctan2(ey - cy, ex - cx), clockwise)
+    full = ~single & (sx == ex) & (sy == ey)
+    sweep = np.where(full, 2 * math.pi, sweep)
+    return Arcs(
+        rows=rows,
+        sx=sx,
+        sy=sy,
+        ex=ex,
+        ey=ey,
+        cx=cx,
+        cy=cy,
+        r=np.hypot(sx - cx, sy - cy),
+        a0=a0,
+        sweep=np.where(clockwise, -sweep, sweep),
+    )
+
+
+def linearize_arcs(arcs: Arcs, tol: float = DEFAULT_ARC_TOL_MM) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Chord points for every arc, as flat ``(x, y, offsets)`` arrays.
+
+    Each arc contributes the points after its start, ending exactly on its
+    end point; the chord count keeps every sagitta below ``tol``.
+    """
+    if not len(arcs):
+        return _empty_f(), _empty_f(), _no_offsets()
+    ratio = np.clip(1 - tol / np.maximum(arcs.r, 1e-12), -1.0, 1.0)
+    step = np.where(arcs.r > tol, 2 * np.arccos(ratio), math.pi / 2)
+    n = np.maximum(1, np.ceil(np.abs(arcs.sweep) / step)).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(n)))
+    arc_id = np.repeat(np.arange(len(arcs)), n)
+    t = (np.arange(offsets[-1]) - offsets[arc_id] + 1) / n[arc_id]
+    angle = arcs.a0[arc_id] + arcs.sweep[arc_id] * t
+    px = arcs.cx[arc_id] + arcs.r[arc_id] * np.cos(angle)
+    py = arcs.cy[arc_id] + arcs.r[arc_id] * np.sin(angle)
+    last = offsets[1:] - 1
+    px[last] = arcs.ex
+    py[last] = arcs.ey
+    return px, py, offsets
+
+
+def arc_extents(arcs: Arcs) -> np.ndarray:
+    """Exact ``(min_x, max_x, min_y, max_y)`` of every arc.
+
+    The box spans the end points plus each axis extreme (0, 90, 180 and 270
+    degrees) that the arc actually sweeps through.
+    """
+    box = np.stack(
+        [
+            np.minimum(arcs.sx, arcs.ex),
+            np.maximum(arcs.sx, arcs.ex),
+            np.minimum(arcs.sy, arcs.ey),
+            np.maximum(arcs.sy, arcs.ey),
+        ],
+        axis=1,
+    )
+    for angle, col, coord in ((0.0, 1, "x"), (math.pi / 2, 3, "y"), (math.pi, 0, "x"), (1.5 * math.pi, 2, "y")):
+        along = np.where(arcs.sweep >= 0, angle - arcs.a0, arcs.a0 - angle) % (2 * math.pi)
+        hit = along <= np.abs(arcs.sweep)
+        if coord == "x":
+            extreme = arcs.cx + arcs.r * math.cos(angle)
+        else:
+            extreme = arcs.cy + arcs.r * math.sin(angle)
+        better = np.maximum if col in (1, 3) else np.minimum
+        box[:, col] = np.where(hit, better(box[:, col], extreme), box[:, col])
+    return box
+
+
+def expand_rows(geom: Geometry, tol: float = DEFAULT_ARC_TOL_MM) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Path points for every geometry row, with arcs replaced by chords.
+
+    Returns flat ``(x, y, offsets)`` where row ``k`` owns points
+    ``offsets[k]:offsets[k + 1]``: its end point for linear rows, its chord
+    points for arc rows. Because rows are laid out in file order, the start
+    of the segment ending at flat point ``p`` is always point ``p - 1``.
+    """
+    x, y = geom.xy_mm()
+    arcs = find_arcs(geom)
+    if not len(arcs):
+        return x, y, np.arange(len(geom) + 1, dtype=np.int64)
+    ax, ay, aoff = linearize_arcs(arcs, tol)
+    counts = np.ones(len(geom), dtype=np.int64)
+    counts[arcs.rows] = np.diff(aoff)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    px = np.repeat(x, counts)
+    py = np.repeat(y, counts)
+    arc_pos = np.repeat(offsets[arcs.rows], np.diff(aoff)) + (np.arange(aoff[-1]) - np.repeat(aoff[:-1], np.diff(aoff)))
+    px[arc_pos] = ax
+    py[arc_pos] = ay
+    return px, py, offsets
+
+
+def geometry_bounds(geom: Geometry) -> Optional[Tuple[int, int, int, int]]:
+    """Raw-unit ``(min_x, max_x, min_y, max_y)`` including arc bulges.
+
+    Arc extremes are rounded outwards to the coordinate grid.
+    """
+    bounds = geom.bounds()
+    if bounds is None:
+        return None
+    arcs = find_arcs(geom)
+    if not len(arcs):
+        return bounds
+    box = arc_extents(arcs)
+    scale_x, scale_y = geom.scale_mm()
+    return (
+        min(bounds[0], int(math.floor(box[:, 0].min() / scale_x + 1e-6))),
+        max(bounds[1], int(math.ceil(box[:, 1].max() / scale_x - 1e-6))),
+        min(bounds[2], int(math.floor(box[:, 2].min() / scale_y + 1e-6))),
+        max(bounds[3], int(math.ceil(box[:, 3].max() / scale_y - 1e-6))),
+    )
+
+
+def contour_spans(geom: Geometry) -> Iterator[Tuple[int, int]]:
+    """Yield ``[start, stop)`` row spans of each region contour.
+
+    A contour starts at a D02 inside a region or at the first operation of a
+    region statement, and runs until the next such start or the region end.
+    """
+    inside = geom.region == 1
+    if not inside.any():
+        return
+    prev_inside = np.concatenate(([False], inside[:-1]))
+    starts = np.flatnonzero(inside & ((geom.op == 2) | ~prev_inside))
+    ends = np.flatnonzero(inside & ~np.concatenate((inside[1:], [False]))) + 1
+    for k, start in enumerate(starts):
+        stop = int(ends[np.searchsorted(ends, start, side="right")])
+        if k + 1 < len(starts):
+            stop = min(stop, int(starts[k + 1]))
+        yield int(start), stop
+
+
+def region_contours(geom: Geometry, tol: float = DEFAULT_ARC_TOL_MM) -> Contours:
+    """Collect every G36/G37 contour as a closed polygon in mm.
+
+    Circular segments are replaced by chords within ``tol``. Contours with
+    fewer than three vertices are dropped.
+    """
+    spans = list(contour_spans(geom))
+    if not spans:
+        return Contours()
+    px, py, off = expand_rows(geom, tol)
+    xs: List[np.ndarray] = []
+    ys: List[np.ndarray] = []
+    counts: List[int] = []
+    polarity: List[int] = []
+    rows: List[int] = []
+    for start, stop in spans:
+        lo, hi = int(off[start]), int(off[stop])
+        if geom.op[start] == 1 and lo > 0:
+            lo -= 1
+        cx, cy = px[lo:hi], py[lo:hi]
+        if len(cx) > 1 and cx[0] == cx[-1] and cy[0] == cy[-1]:
+            cx, cy = cx[:-1], cy[:-1]
+        if len(cx) < 3:
+            continue
+        xs.append(cx)
+        ys.append(cy)
+        counts.append(len(cx))
+        polarity.append(int(geom.polarity[start]))
+        rows.append(start)
+    if not counts:
+        return Contours()
+    return Contours(
+        x=np.concatenate(xs),
+        y=np.concatenate(ys),
+        offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        polarity=np.array(polarity, dtype=np.int64),
+        row=np.array(rows, dtype=np.int64),
+    )
+
+
+def polygon_metrics(contours: Contours) -> Dict[str, np.ndarray]:
+    """Signed area, perimeter and bounding box of every contour at once.
+
+    Uses the shoelace formula over the flat vertex arrays: each vertex is
+    paired with its successor inside the same contour, then the per-vertex
+    terms are summed per contour with ``reduceat``.
+    """
+    n = len(contours)
+    if n == 0:
+        return {
+            "area": _empty_f(),
+            "perimeter": _empty_f(),
+            "bbox": np.empty((0, 4)),
+        }
+    x, y, off = contours.x, contours.y, contours.offsets
+    nxt = np.arange(1, len(x) + 1)
+    nxt[off[1:] - 1] = off[:-1]
+    cross = x * y[nxt] - x[nxt] * y
+    seg = np.hypot(x[nxt] - x, y[nxt] - y)
+    starts = off[:-1]
+    return {
+        "area": 0.5 * np.add.reduceat(cross, starts),
+        "perimeter": np.add.reduceat(seg, starts),
+        "bbox": np.stack(
+            [
+                np.minimum.reduceat(x, starts),
+                np.maximum.reduceat(x, starts),
+                np.minimum.reduceat(y, starts),
+                np.maximum.reduceat(y, starts),
+            ],
+            axis=1,
+        ),
+    }
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""Streaming RS-274X tokenizer shared by the Gerber tools.
+
+The file is read in fixed-size chunks and split into blocks on the fly, so
+memory stays flat regardless of layer size. `tokenize` yields typed commands
+with modal coordinates already resolved; `read_geometry` collects every
+operation into int64 NumPy columns for vectorized checks. X2 attributes
+(``%TF``/``%TA``/``%TO``/``%TD``, also in their ``G04 #@!`` comment form)
+are tracked as the file is read and attached to each operation as interned
+net, component and pin IDs.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from fnmatch import fnmatchcase
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+
+from fab_cache import FabCache
+
+
+PARSER_VERSION = 5
+CHUNK_SIZE = 1 << 20
+FIELD_RE = re.compile(r"([GXYIJD])([+-]?\d+)")
+FORMAT_RE = re.compile(r"([LTD]?)([AI])X(\d)(\d)Y(\d)(\d)")
+APERTURE_RE = re.compile(r"D(\d+)([A-Za-z_$][A-Za-z0-9_.$]*),?(.*)")
+# X2 attributes written as comments by exporters in X1-compatible mode.
+X2_COMMENT = "G04 #@! "
+
+
+@dataclass(frozen=True, slots=True)
+class FormatSpec:
+    x_int: int
+    x_dec: int
+    y_int: int
+    y_dec: int
+    zeros: str = "L"
+    notation: str = "A"
+
+
+@dataclass(frozen=True, slots=True)
+class Unit:
+    unit: str
+
+
+@dataclass(frozen=True, slots=True)
+class ApertureDef:
+    code: str
+    shape: str
+    params: str
+
+
+@dataclass(frozen=True, slots=True)
+class SelectAperture:
+    code: str
+
+
+@dataclass(frozen=True, slots=True)
+class GCode:
+    code: int
+
+
+@dataclass(frozen=True, slots=True)
+class Operation:
+    op: int
+    x: int
+    y: int
+    i: Optional[int] = None
+    j: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Extended:
+    name: str
+    body: str
+
+
+Command = Union[FormatSpec, Unit, ApertureDef, SelectAperture, GCode, Operation, Extended]
+
+
+def iter_blocks(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, bool]]:
+    """Yield ``(block, extended)`` pairs from a Gerber text stream.
+
+    Ordinary data blocks are split on ``*``. Extended commands are the
+    ``%...%`` sections; each is yielded whole with the trailing ``*`` removed
+    so that multi-block commands such as ``%AM`` stay together.
+    """
+    buf = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buf += chunk.replace("\r", "").replace("\n", "")
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            if buf[pos] == "%":
+                end = buf.find("%", pos + 1)
+                if end < 0:
+                    break
+                body = buf[pos + 1:end].strip()
+                if body:
+                    yield body.rstrip("*"), True
+            else:
+                end = buf.find("*", pos)
+                if end < 0:
+                    break
+                word = buf[pos:end].strip()
+                if word:
+                    yield word, False
+            pos = end + 1
+        buf = buf[pos:]
+        if not chunk:
+            return
+
+
+def _coord(raw: str, digits: int, fmt: Optional[FormatSpec]) -> int:
+    if fmt is not None and fmt.zeros == "T":
+        sign = ""
+        if raw[0] in "+-":
+            sign, raw = raw[0], raw[1:]
+        raw = sign + raw.ljust(digits, "0")
+    return int(raw)
+
+
+def _split_extended(body: str) -> Iterator[Tuple[str, str]]:
+    if body.startswith("AM"):
+        yield "AM", body[2:]
+        return
+    # Legacy files pack several parameters into one %...% section.
+    for part in body.split("*"):
+        part = part.strip()
+        if part:
+            yield part[:2], part[2:]
+
+
+def tokenize(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Command]:
+    """Stream typed commands from a Gerber file.
+
+    Coordinates are raw integers in file units with modal X/Y resolved
+    against the current point. Coordinate blocks without a D code reuse the
+    previous operation code, as older exporters rely on.
+    """
+    fmt: Optional[FormatSpec] = None
+    x = y = 0
+    last_op = 1
+    with path.open("r", errors="ignore") as stream:
+        for block, extended in iter_blocks(stream, chunk_size):
+            if extended:
+                for name, body in _split_extended(block):
+                    if name == "FS":
+                        m = FORMAT_RE.match(body)
+                        if m:
+                            fmt = FormatSpec(
+                                x_int=int(m.group(3)),
+                                x_dec=int(m.group(4)),
+                                y_int=int(m.group(5)),
+                                y_dec=int(m.group(6)),
+                                zeros=m.group(1) or "L",
+                                notation=m.group(2),
+                            )
+                            yield fmt
+                    elif name == "MO":
+                        yield Unit(body[:2])
+                    elif name == "AD":
+                        m = APERTURE_RE.match(body)
+                        if m:
+                            yield ApertureDef(code=m.group(1), shape=m.group(2), params=m.group(3))
+                    else:
+                        yield Extended(name=name, body=body)
+                continue
+
+            if block.startswith(X2_COMMENT):
+                attr = block[len(X2_COMMENT):].strip()
+                if attr[:2] in ("TF", "TA", "TO", "TD"):
+                    yield Extended(name=attr[:2], body=attr[2:])
+                continue
+            if block.startswith("G04") or block.startswith("G4 "):
+                continue
+            if block[0] == "M":
+                continue
+            op = None
+            has_coord = False
+            i = j = None
+            for letter, value in FIELD_RE.findall(block):
+                if letter == "G":
+                    yield GCode(int(value))
+                elif letter == "D":
+                    code = int(value)
+                    if code >= 10:
+                        yield SelectAperture(str(code))
+                    else:
+                        op = code
+                elif letter == "X":
+                    x = _coord(value, fmt.x_int + fmt.x_dec if fmt else 0, fmt)
+                    has_coord = True
+                elif letter == "Y":
+                    y = _coord(value, fmt.y_int + fmt.y_dec if fmt else 0, fmt)
+                    has_coord = True
+                elif letter == "I":
+                    i = _coord(value, fmt.x_int + fmt.x_dec if fmt else 0, fmt)
+                    has_coord = True
+                else:
+                    j = _coord(value, fmt.y_int + fmt.y_dec if fmt else 0, fmt)
+                    has_coord = True
+            if op is None and has_coord:
+                op = last_op
+            if op is not None:
+                last_op = op
+                yield Operation(op=op, x=x, y=y, i=i, j=j)
+
+
+def to_mm(value: float, decimals: int, unit: Optional[str]) -> float:
+    scaled = value / (10 ** decimals)
+    if unit == "IN":
+        scaled *= 25.4
+    return scaled
+
+
+GEOMETRY_COLUMNS = (
+    "x", "y", "i", "j", "aperture", "op", "interp", "quadrant", "polarity", "region", "net", "component", "pin",
+)
+
+
+def _empty() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+def split_attribute(body: str) -> Tuple[str, List[str]]:
+    """Split an X2 attribute body such as ``.N,USB_DP`` into name and values."""
+    fields = body.split(",")
+    return fields[0].strip(), [f.strip() for f in fields[1:]]
+
+
+class Interner:
+    """Assigns dense integer IDs to names in first-seen order; ``names[id]`` maps back."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def __call__(self, name: str) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+
+@dataclass
+class Geometry:
+    """Columnar view of every D01/D02/D03 operation in a layer.
+
+    Row ``k`` is one operation: resolved ``x``/``y`` and arc centre offsets
+    ``i``/``j`` (0 when absent) in raw file units, the selected ``aperture``
+    code (-1 before any selection), the ``op`` code, the active ``interp``
+    mode (1 linear, 2 clockwise, 3 counter-clockwise), the ``quadrant`` mode
+    (74 single, 75 multi), the load ``polarity`` (1 dark, 0 clear),
+    ``region`` (1 inside a G36/G37 region statement, else 0) and the X2
+    object attributes ``net``, ``component`` and ``pin`` as indices into
+    `nets`, `components` and `pins` (-1 when unset). A pin is named
+    ``"<refdes>,<number>"`` as in ``%TO.P``; an object on several nets
+    (``%TO.N,A,B``) is tagged with the first.
+    """
+
+    unit: Optional[str] = None
+    fmt: Optional[FormatSpec] = None
+    apertures: Dict[str, ApertureDef] = field(default_factory=dict)
+    macros: Dict[str, str] = field(default_factory=dict)
+    file_attributes: Dict[str, List[str]] = field(default_factory=dict)
+    aperture_attributes: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    nets: List[str] = field(default_factory=list)
+    components: List[str] = field(default_factory=list)
+    pins: List[str] = field(default_factory=list)
+    x: np.ndarray = field(default_factory=_empty)
+    y: np.ndarray = field(default_factory=_empty)
+    i: np.ndarray = field(default_factory=_empty)
+    j: np.ndarray = field(default_factory=_empty)
+    aperture: np.ndarray = field(default_factory=_empty)
+    op: np.ndarray = field(default_factory=_empty)
+    interp: np.ndarray = field(default_factory=_empty)
+    quadrant: np.ndarray = field(default_factory=_empty)
+    polarity: np.ndarray = field(default_factory=_empty)
+    region: np.ndarray = field(default_factory=_empty)
+    net: np.ndarray = field(default_factory=_empty)
+    component: np.ndarray = field(default_factory=_empty)
+    pin: np.ndarray = field(default_factory=_empty)
+
+    def __len__(self) -> int:
+        return len(self.op)
+
+    @property
+    def unit_mm(self) -> float:
+        """Millimetres per file unit (25.4 for inch files)."""
+        return 25.4 if self.unit == "IN" else 1.0
+
+    def scale_mm(self) -> Tuple[float, float]:
+        """Millimetres per raw X and Y coordinate step."""
+        x_dec = self.fmt.x_dec if self.fmt else 0
+        y_dec = self.fmt.y_dec if self.fmt else 0
+        return self.unit_mm / 10 ** x_dec, self.unit_mm / 10 ** y_dec
+
+    def xy_mm(self) -> Tuple[np.ndarray, np.ndarray]:
+        sx, sy = self.scale_mm()
+        return self.x * sx, self.y * sy
+
+    def to_record(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        header = {
+            "unit": self.unit,
+            "fmt": asdict(self.fmt) if self.fmt else None,
+            "apertures": {code: [ad.shape, ad.params] for code, ad in self.apertures.items()},
+            "macros": self.macros,
+            "file_attributes": self.file_attributes,
+            "aperture_attributes": self.aperture_attributes,
+            "nets": self.nets,
+            "components": self.components,
+            "pins": self.pins,
+        }
+        return header, {name: getattr(self, name) for name in GEOMETRY_COLUMNS}
+
+    @classmethod
+    def from_record(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "Geometry":
+        geom = cls(
+            unit=header["unit"],
+            fmt=FormatSpec(**header["fmt"]) if header["fmt"] else None,
+            apertures={code: ApertureDef(code, shape, params) for code, (shape, params) in header["apertures"].items()},
+            macros=header["macros"],
+            file_attributes=header["file_attributes"],
+            aperture_attributes=header["aperture_attributes"],
+            nets=header["nets"],
+            components=header["components"],
+            pins=header["pins"],
+        )
+        for name in GEOMETRY_COLUMNS:
+            setattr(geom, name, arrays[name])
+        return geom
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        if not len(self.op):
+            return None
+        return int(self.x.min()), int(self.x.max()), int(self.y.min()), int(self.y.max())
+
+    def aperture_function(self, code: int) -> Optional[str]:
+        """The ``.AperFunction`` of a D code, e.g. ``"SMDPad,CuDef"``."""
+        values = self.aperture_attributes.get(str(code), {}).get(".AperFunction")
+        return ",".join(values) if values else None
+
+    def net_mask(self, *patterns: str) -> np.ndarray:
+        """Rows whose net matches any of the glob ``patterns``."""
+        return np.isin(self.net, _matching(self.nets, patterns))
+
+    def component_mask(self, *patterns: str) -> np.ndarray:
+        """Rows whose component reference matches any of the glob ``patterns``."""
+        return np.isin(self.component, _matching(self.components, patterns))
+
+
+def _matching(names: List[str], patterns: Tuple[str, ...]) -> np.ndarray:
+    return np.array([k for k, name in enumerate(names) if any(fnmatchcase(name, p) for p in patterns)], dtype=np.int64)
+
+
+def _column(values: array) -> np.ndarray:
+    return np.frombuffer(values, dtype=np.int64) if len(values) else _empty()
+
+
+def read_geometry(path: Path, chunk_size: int = CHUNK_SIZE, cache: Optional[FabCache] = None) -> Geometry:
+    if cache is not None:
+        header, arrays = cache.load(path, "gerber", PARSER_VERSION, lambda p: read_geometry(p, chunk_size).to_record())
+        return Geometry.from_record(header, arrays)
+    geom = Geometry()
+    cols = {name: array("q") for name in GEOMETRY_COLUMNS}
+    xs, ys, iis, jjs, aps, ops, interps, quads, pols, regs, nets, comps, pins = (cols[name] for name in GEOMETRY_COLUMNS)
+    net_id, comp_id, pin_id = Interner(), Interner(), Interner()
+    # Current X2 attribute dictionaries; object attributes persist until %TD.
+    aperture_attrs: Dict[str, List[str]] = {}
+    object_attrs: Dict[str, List[str]] = {}
+    net = comp = pin = -1
+    current_ap = -1
+    interp = 1
+    quadrant = 75
+    polarity = 1
+    region = 0
+    for cmd in tokenize(path, chunk_size):
+        if isinstance(cmd, Operation):
+            xs.append(cmd.x)
+            ys.append(cmd.y)
+            iis.append(cmd.i or 0)
+            jjs.append(cmd.j or 0)
+            aps.append(current_ap)
+            ops.append(cmd.op)
+            interps.append(interp)
+            quads.append(quadrant)
+            pols.append(polarity)
+            regs.append(region)
+            nets.append(net)
+            comps.append(comp)
+            pins.append(pin)
+        elif isinstance(cmd, SelectAperture):
+            current_ap = int(cmd.code)
+        elif isinstance(cmd, GCode):
+            if cmd.code in (1, 2, 3):
+                interp = cmd.code
+            elif cmd.code in (74, 75):
+                quadrant = cmd.code
+            elif cmd.code == 36:
+                region = 1
+            elif cmd.code == 37:
+                region = 0
+        elif isinstance(cmd, Extended):
+            if cmd.name == "LP":
+                polarity = 0 if cmd.body.startswith("C") else 1
+            elif cmd.name == "AM":
+                geom.macros[cmd.body.split("*", 1)[0].strip()] = cmd.body
+            elif cmd.name == "TF":
+                name, values = split_attribute(cmd.body)
+                geom.file_attributes[name] = values
+            elif cmd.name == "TA":
+                name, values = split_attribute(cmd.body)
+                aperture_attrs[name] = values
+            elif cmd.name in ("TO", "TD"):
+                name, values = split_attribute(cmd.body)
+                if cmd.name == "TO":
+                    object_attrs[name] = values
+                elif name:
+                    object_attrs.pop(name, None)
+                    aperture_attrs.pop(name, None)
+                else:
+                    object_attrs.clear()
+                    aperture_attrs.clear()
+                values = object_attrs.get(".N")
+                net = net_id(values[0]) if values and values[0] else -1
+                values = object_attrs.get(".C")
+                comp = comp_id(values[0]) if values and values[0] else -1
+                values = object_attrs.get(".P")
+                pin = pin_id(",".join(values[:2])) if values and len(values) >= 2 else -1
+        elif isinstance(cmd, ApertureDef):
+            geom.apertures[cmd.code] = cmd
+            if aperture_attrs:
+                geom.aperture_attributes[cmd.code] = dict(aperture_attrs)
+        elif isinstance(cmd, Unit):
+            geom.unit = cmd.unit
+        elif isinstance(cmd, FormatSpec):
+            geom.fmt = cmd
+    for name, values in cols.items():
+        setattr(geom, name, _column(values))
+    geom.nets, geom.components, geom.pins = net_id.names, comp_id.names, pin_id.names
+    return geom
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""Rasterize Gerber layers into NumPy copper bitmaps.
+
+Pixel ``(r, c)`` covers the square centred on
+``(origin_x + (c + 0.5) * pitch, origin_y + (r + 0.5) * pitch)`` in mm, so row
+0 is the bottom edge of the board. Rendering is done one tile at a time and
+peak memory follows the tile size, not the panel size.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from fab_cache import FabCache
+from aperture_macros import MacroShape, flash_contours, macro_apertures
+from gerber_geometry import expand_rows, region_contours
+from gerber_parser import Geometry, read_geometry
+
+
+DEFAULT_TILE_PX = 2048
+# Upper bound on rows x edges evaluated at once when filling a contour.
+MAX_EDGE_CELLS = 1 << 22
+
+Bounds = Tuple[float, float, float, float]
+
+
+def aperture_table(geom: Geometry) -> Dict[int, Tuple[str, Tuple[float, ...]]]:
+    """Decode standard aperture definitions into mm parameters keyed by D code.
+
+    Polygon vertex counts and rotations are left unscaled. Apertures whose
+    parameters are not plain numbers are skipped.
+    """
+    scale = geom.unit_mm
+    table = {}
+    for code, ad in geom.apertures.items():
+        try:
+            raw = [float(p) for p in ad.params.split("X") if p]
+        except ValueError:
+            continue
+        if ad.shape == "P":
+            params = [v * scale if idx in (0, 3) else v for idx, v in enumerate(raw)]
+        elif ad.shape in ("C", "R", "O"):
+            params = [v * scale for v in raw]
+        else:
+            continue
+        table[int(code)] = (ad.shape, tuple(params))
+    return table
+
+
+def half_extent(shape: str, params: Tuple[float, ...]) -> Tuple[float, float]:
+    """Half width and height of a standard aperture (circles and polygons by diameter)."""
+    if shape in ("R", "O") and len(params) >= 2:
+        return params[0] / 2, params[1] / 2
+    return params[0] / 2, params[0] / 2
+
+
+def _flash_mask(shape: str, params: Tuple[float, ...], dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    if shape == "C":
+        mask = dx * dx + dy * dy <= (params[0] / 2) ** 2
+        hole = params[1] if len(params) > 1 else 0.0
+    elif shape == "R":
+        mask = (np.abs(dx) <= params[0] / 2) & (np.abs(dy) <= params[1] / 2)
+        hole = params[2] if len(params) > 2 else 0.0
+    elif shape == "O":
+        w, h = params[0], params[1]
+        r = min(w, h) / 2
+        qx = np.maximum(np.abs(dx) - (w / 2 - r), 0.0)
+        qy = np.maximum(np.abs(dy) - (h / 2 - r), 0.0)
+        mask = qx * qx + qy * qy <= r * r
+        hole = params[2] if len(params) > 2 else 0.0
+    else:
+        n = max(int(params[1]), 3)
+        rot = math.radians(params[2]) if len(params) > 2 else 0.0
+        sector = 2 * math.pi / n
+        theta = np.mod(np.arctan2(dy, dx) - rot, sector) - sector / 2
+        mask = np.hypot(dx, dy) * np.cos(theta) <= (params[0] / 2) * math.cos(math.pi / n)
+        hole = params[3] if len(params) > 3 else 0.0
+    if hole > 0:
+        mask &= dx * dx + dy * dy > (hole / 2) ** 2
+    return mask
+
+
+def _convex_hull(points: np.ndarray) -> np.ndarray:
+    pts = sorted(set(map(tuple, points.tolist())))
+    if len(pts) < 3:
+        return np.array(pts)
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower: List[Tuple[float, float]] = []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper: List[Tuple[float, float]] = []
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def _convex_mask(hull: np.ndarray, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    mask = np.ones(np.broadcast(px, py).shape, dtype=bool)
+    for k in range(len(hull)):
+        ax, ay = hull[k]
+        bx, by = hull[(k + 1) % len(hull)]
+        mask &= (bx - ax) * (py - ay) - (by - ay) * (px - ax) >= 0
+    return mask
+
+
+def _segment_mask(ax: float, ay: float, bx: float, by: float, r: float, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    vx = bx - ax
+    vy = by - ay
+    l2 = vx * vx + vy * vy
+    if l2 == 0:
+        return (px - ax) ** 2 + (py - ay) ** 2 <= r * r
+    t = np.clip(((px - ax) * vx + (py - ay) * vy) / l2, 0.0, 1.0)
+    return (px - ax - t * vx) ** 2 + (py - ay - t * vy) ** 2 <= r * r
+
+
+class LayerRaster:
+    """Tile renderer for one Gerber layer.
+
+    Objects are split into flashes, stroked draws and region contours with
+    their mm bounding boxes precomputed, so each tile only visits the
+    objects that overlap it. Polarity is honoured by painting consecutive
+    same-polarity objects as one run: dark runs are OR-ed into the tile and
+    clear runs erase it.
+    """
+
+    def __init__(
+        self,
+        geom: Geometry,
+        pitch_mm: float,
+        bounds_mm: Optional[Bounds] = None,
+        tile_px: int = DEFAULT_TILE_PX,
+    ) -> None:
+        self.pitch = pitch_mm
+        self.tile_px = tile_px
+        self.apertures = aperture_table(geom)
+        self.macros = macro_apertures(geom.macros, geom.apertures, geom.unit_mm, pitch_mm / 4)
+        self._aperture_keys: Dict[int, int] = {}
+        self._build_objects(geom)
+        if bounds_mm is None:
+            bounds_mm = self.extent()
+        self.origin = (bounds_mm[0], bounds_mm[2])
+        self.cols = max(1, int(math.ceil((bounds_mm[1] - bounds_mm[0]) / pitch_mm)))
+        self.rows = max(1, int(math.ceil((bounds_mm[3] - bounds_mm[2]) / pitch_mm)))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    def _build_objects(self, geom: Geometry) -> None:
+        x, y = geom.xy_mm()
+        # A new run starts whenever polarity flips; clear runs are erasures.
+        flips = geom.polarity[1:] != geom.polarity[:-1]
+        run = np.concatenate(([0], np.cumsum(flips))) if len(geom) else _int_empty()
+        self.run_dark = geom.polarity[np.concatenate(([0], np.flatnonzero(flips) + 1))] == 1 if len(geom) else _int_empty()
+
+        # Local (min_x, max_x, min_y, max_y) of each row's aperture image.
+        local = np.zeros((len(geom), 4))
+        known = np.zeros(len(geom), dtype=bool)
+        for code, (shape, params) in self.apertures.items():
+            sel = geom.aperture == code
+            hw, hh = half_extent(shape, params)
+            local[sel] = (-hw, hw, -hh, hh)
+            known |= sel
+        flash_only = np.zeros(len(geom), dtype=bool)
+        for code, macro in self.macros.items():
+            sel = geom.aperture == code
+            local[sel] = macro.bounds()
+            flash_only |= sel
+
+        outside = geom.region == 0
+        flash = outside & (geom.op == 3) & (known | flash_only)
+        self.f_x, self.f_y = x[flash], y[flash]
+        self.f_ap, self.f_run = geom.aperture[flash], run[flash]
+        self.f_box = np.stack(
+            [self.f_x + local[flash, 0], self.f_x + local[flash, 1], self.f_y + local[flash, 2], self.f_y + local[flash, 3]],
+            axis=1,
+        )
+
+        # Arc draws become chord segments; every flat path point closes the
+        # segment that starts at the point before it.
+        px, py, off = expand_rows(geom, self.pitch / 4)
+        point_row = np.repeat(np.arange(len(geom)), np.diff(off))
+        draw = (outside & (geom.op == 1) & known)[point_row]
+        end = np.flatnonzero(draw)
+        start = end - 1
+        self.s_ax = np.where(start >= 0, px[np.maximum(start, 0)], 0.0)
+        self.s_ay = np.where(start >= 0, py[np.maximum(start, 0)], 0.0)
+        self.s_bx, self.s_by = px[end], py[end]
+        rows = point_row[end]
+        self.s_ap, self.s_run = geom.aperture[rows], run[rows]
+        pad = np.abs(local[rows]).max(axis=1) if len(rows) else np.zeros(0)
+        self.s_box = np.stack(
+            [
+                np.minimum(self.s_ax, self.s_bx) - pad,
+                np.maximum(self.s_ax, self.s_bx) + pad,
+                np.minimum(self.s_ay, self.s_by) - pad,
+                np.maximum(self.s_ay, self.s_by) + pad,
+            ],
+            axis=1,
+        )
+
+        contours = region_contours(geom, self.pitch / 4)
+        self.contours: List[np.ndarray] = list(contours)
+        self.c_run = run[contours.row]
+        self.c_box = np.array(
+            [[p[:, 0].min(), p[:, 0].max(), p[:, 1].min(), p[:, 1].max()] for p in self.contours]
+        ).reshape(-1, 4)
+
+    def extent(self) -> Bounds:
+        boxes = [b for b in (self.f_box, self.s_box, self.c_box) if len(b)]
+        if not boxes:
+            return (0.0, 0.0, 0.0, 0.0)
+        allb = np.vstack(boxes)
+        return float(allb[:, 0].min()), float(allb[:, 1].max()), float(allb[:, 2].min()), float(allb[:, 3].max())
+
+    def tiles(self, dtype=bool) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Yield ``(row0, col0, tile)`` covering the raster in row-major order."""
+        for row0 in range(0, self.rows, self.tile_px):
+            for col0 in range(0, self.cols, self.tile_px):
+                rows = min(self.tile_px, self.rows - row0)
+                cols = min(self.tile_px, self.cols - col0)
+                tile = self.render_tile(row0, col0, rows, cols)
+                yield row0, col0, tile if dtype is bool else tile.astype(dtype) * np.iinfo(dtype).max
+
+    def render(self, dtype=bool) -> np.ndarray:
+        image = np.zeros(self.shape, dtype=dtype)
+        for row0, col0, tile in self.tiles(dtype):
+            image[row0:row0 + tile.shape[0], col0:col0 + tile.shape[1]] = tile
+        return image
+
+    def render_tile(self, row0: int, col0: int, rows: int, cols: int) -> np.ndarray:
+        ox = self.origin[0] + col0 * self.pitch
+        oy = self.origin[1] + row0 * self.pitch
+        tile_box = (ox, ox + cols * self.pitch, oy, oy + rows * self.pitch)
+        f_sel = _overlapping(self.f_box, tile_box)
+        s_sel = _overlapping(self.s_box, tile_box)
+        c_sel = _overlapping(self.c_box, tile_box)
+        f_runs, s_runs, c_runs = self.f_run[f_sel], self.s_run[s_sel], self.c_run[c_sel]
+
+        tile = np.zeros((rows, cols), dtype=bool)
+        for run in np.unique(np.concatenate([f_runs, s_runs, c_runs])):
+            dark = self.run_dark[int(run)]
+            target = tile if dark else np.zeros_like(tile)
+            for k in f_sel[_run_slice(f_runs, run)]:
+                self._paint_flash(target, ox, oy, k)
+            for k in s_sel[_run_slice(s_runs, run)]:
+                self._paint_stroke(target, ox, oy, k)
+            for k in c_sel[_run_slice(c_runs, run)]:
+                self._paint_contour(target, ox, oy, k)
+            if not dark:
+                tile &= ~target
+        return tile
+
+    def tile_signature(self, row0: int, col0: int, rows: int, cols: int) -> bytes:
+        """Digest of the objects a tile would paint, in tile-local coordinates.
+
+        Two rasters with equal signatures for a tile render it identically,
+        so comparisons can skip rendering. Apertures are keyed by shape and
+        size rather than D code, and runs by order and polarity, so
+        renumbering between exports does not change the digest.
+        """
+        ox = self.origin[0] + col0 * self.pitch
+        oy = self.origin[1] + row0 * self.pitch
+        tile_box = (ox, ox + cols * self.pitch, oy, oy + rows * self.pitch)
+        f_sel = _overlapping(self.f_box, tile_box)
+        s_sel = _overlapping(self.s_box, tile_box)
+        c_sel = _overlapping(self.c_box, tile_box)
+        runs = np.concatenate([self.f_run[f_sel], self.s_run[s_sel], self.c_run[c_sel]])
+        used = np.unique(runs)
+
+        def nm(values: np.ndarray, origin: float) -> bytes:
+            return np.rint((values - origin) * 1e6).astype(np.int64).tobytes()
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.asarray(self.run_dark, dtype=bool)[used.astype(np.int64)].tobytes())
+        h.update(np.searchsorted(used, runs).tobytes())
+        h.update(nm(self.f_x[f_sel], ox) + nm(self.f_y[f_sel], oy))
+        h.update(self._aperture_keys_of(self.f_ap[f_sel]))
+        h.update(nm(self.s_ax[s_sel], ox) + nm(self.s_ay[s_sel], oy) + nm(self.s_bx[s_sel], ox) + nm(self.s_by[s_sel], oy))
+        h.update(self._aperture_keys_of(self.s_ap[s_sel]))
+        for k in c_sel:
+            pts = self.contours[k]
+            h.update(len(pts).to_bytes(8, "little") + nm(pts[:, 0], ox) + nm(pts[:, 1], oy))
+        return h.digest()
+
+    def _aperture_keys_of(self, codes: np.ndarray) -> bytes:
+        unique, inverse = np.unique(codes, return_inverse=True)
+        return np.array([self._aperture_key(int(code)) for code in unique], dtype=np.int64)[inverse].tobytes()
+
+    def _aperture_key(self, code: int) -> int:
+        key = self._aperture_keys.get(code)
+        if key is None:
+            if code in self.macros:
+                macro = self.macros[code]
+                desc = repr([(np.round(p, 6).tolist(), e) for p, e in zip(macro.polygons, macro.exposure)])
+            else:
+                desc = repr(self.apertures[code])
+            digest = hashlib.blake2b(desc.encode(), digest_size=8).digest()
+            key = self._aperture_keys[code] = int.from_bytes(digest, "little", signed=True)
+        return key
+
+    def _window(self, target: np.ndarray, ox: float, oy: float, box: np.ndarray):
+        p = self.pitch
+        c0 = max(0, int(math.ceil((box[0] - ox) / p - 0.5)))
+        c1 = min(target.shape[1], int(math.floor((box[1] - ox) / p - 0.5)) + 1)
+        r0 = max(0, int(math.ceil((box[2] - oy) / p - 0.5)))
+        r1 = min(target.shape[0], int(math.floor((box[3] - oy) / p - 0.5)) + 1)
+        if c0 >= c1 or r0 >= r1:
+            return None
+        px = ox + (np.arange(c0, c1) + 0.5) * p
+        py = oy + (np.arange(r0, r1) + 0.5) * p
+        return (slice(r0, r1), slice(c0, c1)), px[None, :], py[:, None]
+
+    def _paint_flash(self, target: np.ndarray, ox: float, oy: float, k: int) -> None:
+        win = self._window(target, ox, oy, self.f_box[k])
+        if win is None:
+            return
+        sl, px, py = win
+        code = int(self.f_ap[k])
+        if code in self.macros:
+            target[sl] |= self._macro_mask(self.macros[code], k, px, py)
+            return
+        shape, params = self.apertures[code]
+        target[sl] |= _flash_mask(shape, params, px - self.f_x[k], py - self.f_y[k])
+
+    def _macro_mask(self, macro: MacroShape, k: int, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+        # Primitives composite in order inside the macro's own image:
+        # exposure-off shapes only erase earlier primitives of the same flash.
+        left, bottom = px[0, 0] - 0.5 * self.pitch, py[0, 0] - 0.5 * self.pitch
+        rows, cols = py.shape[0], px.shape[1]
+        placed = flash_contours(macro, self.f_x[k:k + 1], self.f_y[k:k + 1])
+        mask = np.zeros((rows, cols), dtype=bool)
+        for pts, on in zip(placed, placed.polarity):
+            fill = fill_polygon(pts, left, bottom, self.pitch, rows, cols)
+            if on:
+                mask |= fill
+            else:
+                mask &= ~fill
+        return mask
+
+    def _paint_stroke(self, target: np.ndarray, ox: float, oy: float, k: int) -> None:
+        win = self._window(target, ox, oy, self.s_box[k])
+        if win is None:
+            return
+        sl, px, py = win
+        shape, params = self.apertures[int(self.s_ap[k])]
+        ax, ay, bx, by = self.s_ax[k], self.s_ay[k], self.s_bx[k], self.s_by[k]
+        if shape == "R":
+            hw, hh = params[0] / 2, params[1] / 2
+            corners = np.array([[dx, dy] for dx in (-hw, hw) for dy in (-hh, hh)])
+            hull = _convex_hull(np.vstack([corners + (ax, ay), corners + (bx, by)]))
+            mask = _convex_mask(hull, px, py) if len(hull) >= 3 else np.zeros((len(py), px.shape[1]), dtype=bool)
+        else:
+            # Gerber only allows circular apertures for draws; other shapes
+            # are approximated by their inscribed circle.
+            r = min(half_extent(shape, params))
+            mask = _segment_mask(ax, ay, bx, by, r, px, py)
+        target[sl] |= mask
+
+    def _paint_contour(self, target: np.ndarray, ox: float, oy: float, k: int) -> None:
+        win = self._window(target, ox, oy, self.c_box[k])
+        if win is None:
+            return
+        (rs, cs), px, py = win
+        left = px[0, 0] - 0.5 * self.pitch
+        bottom = py[0, 0] - 0.5 * self.pitch
+        target[rs, cs] |= fill_polygon(
+            self.contours[k], left, bottom, self.pitch, rs.stop - rs.start, cs.stop - cs.start
+        )
+
+
+def fill_polygon(pts: np.ndarray, ox: float, oy: float, pitch: float, rows: int, cols: int) -> np.ndarray:
+    """Even-odd scanline fill of a closed contour onto a ``rows x cols`` grid.
+
+    Each edge crossing a pixel-row centre toggles every pixel to its right;
+    a cumulative sum along the row turns the toggles into coverage.
+    """
+    x0, y0 = pts[:, 0], pts[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    keep = y0 != y1
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    out = np.zeros((rows, cols), dtype=bool)
+    if not len(x0):
+        return out
+    step = max(1, MAX_EDGE_CELLS // len(x0))
+    for r0 in range(0, rows, step):
+        yc = oy + (np.arange(r0, min(rows, r0 + step)) + 0.5) * pitch
+        cross = (y0[None, :] <= yc[:, None]) != (y1[None, :] <= yc[:, None])
+        ri, ei = np.nonzero(cross)
+        xi = x0[ei] + (yc[ri] - y0[ei]) * (x1[ei] - x0[ei]) / (y1[ei] - y0[ei])
+        ci = np.clip(np.floor((xi - ox) / pitch - 0.5).astype(np.int64) + 1, 0, cols)
+        toggles = np.zeros((len(yc), cols + 1), dtype=np.int32)
+        np.add.at(toggles, (ri, ci), 1)
+        out[r0:r0 + len(yc)] = (np.cumsum(toggles[:, :cols], axis=1) & 1).astype(bool)
+    return out
+
+
+def _int_empty() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+def _overlapping(boxes: np.ndarray, box: Tuple[float, float, float, float]) -> np.ndarray:
+    if not len(boxes):
+        return _int_empty()
+    hit = (boxes[:, 0] <= box[1]) & (boxes[:, 1] >= box[0]) & (boxes[:, 2] <= box[3]) & (boxes[:, 3] >= box[2])
+    return np.flatnonzero(hit)
+
+
+def _run_slice(runs: np.ndarray, run: int) -> slice:
+    # Objects are stored in file order, so their run ids are non-decreasing.
+    return slice(int(np.searchsorted(runs, run, side="left")), int(np.searchsorted(runs, run, side="right")))
+
+
+def write_png(image: np.ndarray, path: Path) -> None:
+    """Write a 2-D bool/uint8 array as an 8-bit grayscale PNG, top row = max y."""
+    data = image.astype(np.uint8) * 255 if image.dtype == bool else image.astype(np.uint8)
+    data = data[::-1]
+    raw = b"".join(b"\x00" + row.tobytes() for row in data)
+
+    def chunk(tag: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + tag + payload + struct.pack(">I", zlib.crc32(tag + payload))
+
+    header = struct.pack(">IIBBBBB", data.shape[1], data.shape[0], 8, 0, 0, 0, 0)
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b""))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gerber", type=Path, required=True, help="Gerber layer")
+    ap.add_argument("--pitch-um", type=float, default=25.0, help="Pixel pitch in micrometres")
+    ap.add_argument("--tile-px", type=int, default=DEFAULT_TILE_PX, help="Tile edge length in pixels")
+    ap.add_argument("--out-png", type=Path, help="Output PNG image")
+    ap.add_argument("--out-npy", type=Path, help="Output NumPy bitmap")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON summary")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
+    args = ap.parse_args()
+
+    if args.dry_run:
+        return 0
+
+    geom = read_geometry(args.gerber, cache=FabCache.open(args.cache_dir))
+    raster = LayerRaster(geom, args.pitch_um / 1000.0, tile_px=args.tile_px)
+    copper_px = 0
+    image = np.zeros(raster.shape, dtype=bool) if (args.out_png or args.out_npy) else None
+    for row0, col0, tile in raster.tiles():
+        copper_px += int(np.count_nonzero(tile))
+        if image is not None:
+            image[row0:row0 + tile.shape[0], col0:col0 + tile.shape[1]] = tile
+    if args.out_npy:
+        np.save(args.out_npy, image)
+    if args.out_png:
+        write_png(image, args.out_png)
+
+    pixel_area = raster.pitch ** 2
+    report = {
+        "gerber": str(args.gerber),
+        "pitch_mm": raster.pitch,
+        "origin_mm": list(raster.origin),
+        "shape_px": list(raster.shape),
+        "copper_area_mm2": copper_px * pixel_area,
+        "coverage": copper_px / (raster.rows * raster.cols),
+        "notes": [
+            "Moire macro primitives are not rendered.",
+        ],
+    }
+    args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
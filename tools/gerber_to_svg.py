@@ -1,61 +1,302 @@
 #!/usr/bin/env python3
-"""Render a simple SVG outline from Gerber GM1 file."""
+"""Render Gerber layers to SVG with strokes, flashes and regions.
+
+Consecutive draws with the same aperture are merged into polylines, and
+polylines and region contours are simplified (collinear points dropped,
+then Douglas-Peucker within a tolerance) before writing. Large layers can
+be split into a grid of tile SVGs or written as a level-of-detail set.
+"""
 from __future__ import annotations
 
 import argparse
-import re
+import json
+import math
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aperture_macros import macro_apertures
+from fab_cache import FabCache
+from gerber_geometry import DEFAULT_ARC_TOL_MM, expand_rows, region_contours
+from gerber_parser import Geometry, read_geometry
+from gerber_raster import aperture_table, half_extent
+
+
+DEFAULT_SIMPLIFY_UM = 2.0
+# Each level of detail quadruples the simplification tolerance.
+LOD_FACTOR = 4.0
+CLEAR_COLOR = "white"
+
+Box = Tuple[float, float, float, float]
+
+
+@dataclass
+class Element:
+    row: int
+    box: Box
+    svg: str
+    size: float
+    # D code referenced through <use>, if any.
+    aperture: Optional[int] = None
+
+
+def _fmt(v: float) -> str:
+    s = f"{v:.4f}".rstrip("0").rstrip(".")
+    return "0" if s in ("-0", "") else s
+
+
+def simplify_polyline(pts: np.ndarray, tol: float) -> np.ndarray:
+    """Drop collinear points, then apply Douglas-Peucker within ``tol``.
+
+    End points are always kept, so closed contours stay closed.
+    """
+    if len(pts) <= 2:
+        return pts
+    d1 = pts[1:-1] - pts[:-2]
+    d2 = pts[2:] - pts[1:-1]
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    dot = (d1 * d2).sum(axis=1)
+    keep = np.ones(len(pts), dtype=bool)
+    keep[1:-1] = ~((np.abs(cross) <= 1e-12) & (dot >= 0))
+    pts = pts[keep]
+    if tol <= 0 or len(pts) <= 2:
+        return pts
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        a, b = pts[lo], pts[hi]
+        seg = b - a
+        inner = pts[lo + 1:hi] - a
+        length = math.hypot(seg[0], seg[1])
+        if length == 0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(seg[0] * inner[:, 1] - seg[1] * inner[:, 0]) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tol:
+            mid = lo + 1 + k
+            keep[mid] = True
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+    return pts[keep]
+
+
+def _path(pts: np.ndarray, closed: bool) -> str:
+    head = f"M{_fmt(pts[0, 0])} {_fmt(pts[0, 1])}"
+    body = "".join(f"L{_fmt(x)} {_fmt(y)}" for x, y in pts[1:])
+    return head + body + ("Z" if closed else "")
+
 
+def _box(pts: np.ndarray, pad: float = 0.0) -> Box:
+    return (
+        float(pts[:, 0].min() - pad),
+        float(pts[:, 0].max() + pad),
+        float(pts[:, 1].min() - pad),
+        float(pts[:, 1].max() + pad),
+    )
 
-COORD_RE = re.compile(r"X(-?\d+)Y(-?\d+)")
-FORMAT_RE = re.compile(r"%FS[LA]X(\d)(\d)Y(\d)(\d)\*%")
-UNIT_RE = re.compile(r"%MO(IN|MM)\*%")
+
+def _aperture_defs(geom: Geometry, tol: float) -> Tuple[Dict[int, str], Dict[int, Box]]:
+    """SVG ``<symbol>``-style shapes per D code, centred on the origin."""
+    defs: Dict[int, str] = {}
+    boxes: Dict[int, Box] = {}
+    for code, (shape, params) in aperture_table(geom).items():
+        hw, hh = half_extent(shape, params)
+        if shape == "C":
+            body = f"<circle r='{_fmt(hw)}'/>"
+        elif shape == "R":
+            body = f"<rect x='{_fmt(-hw)}' y='{_fmt(-hh)}' width='{_fmt(2 * hw)}' height='{_fmt(2 * hh)}'/>"
+        elif shape == "O":
+            r = min(hw, hh)
+            body = f"<rect x='{_fmt(-hw)}' y='{_fmt(-hh)}' width='{_fmt(2 * hw)}' height='{_fmt(2 * hh)}' rx='{_fmt(r)}'/>"
+        else:
+            n = max(int(params[1]), 3)
+            rot = math.radians(params[2]) if len(params) > 2 else 0.0
+            a = rot + np.arange(n) * 2 * math.pi / n
+            body = f"<path d='{_path(np.stack([hw * np.cos(a), hw * np.sin(a)], axis=1), True)}'/>"
+        defs[code] = body
+        boxes[code] = (-hw, hw, -hh, hh)
+    for code, macro in macro_apertures(geom.macros, geom.apertures, geom.unit_mm, tol).items():
+        # Exposure-off primitives are drawn in the background colour.
+        parts = []
+        for pts, on in zip(macro.polygons, macro.exposure):
+            fill = "" if on else f" fill='{CLEAR_COLOR}'"
+            parts.append(f"<path d='{_path(pts, True)}'{fill}/>")
+        defs[code] = "".join(parts)
+        boxes[code] = macro.bounds()
+    return defs, boxes
+
+
+def build_elements(geom: Geometry, arc_tol: float, simplify_tol: float) -> Tuple[List[Element], Dict[int, str]]:
+    """Turn one layer into SVG elements tagged with file row and bounding box."""
+    defs, boxes = _aperture_defs(geom, arc_tol)
+    table = aperture_table(geom)
+    elements: List[Element] = []
+    x, y = geom.xy_mm()
+
+    flashes = np.flatnonzero((geom.op == 3) & (geom.region == 0))
+    for k in flashes:
+        code = int(geom.aperture[k])
+        if code not in defs:
+            continue
+        b = boxes[code]
+        fill = "" if geom.polarity[k] else f" fill='{CLEAR_COLOR}'"
+        elements.append(
+            Element(
+                row=int(k),
+                box=(x[k] + b[0], x[k] + b[1], y[k] + b[2], y[k] + b[3]),
+                svg=f"<use href='#D{code}' x='{_fmt(x[k])}' y='{_fmt(y[k])}'{fill}/>",
+                size=max(b[1] - b[0], b[3] - b[2]),
+                aperture=code,
+            )
+        )
+
+    px, py, off = expand_rows(geom, arc_tol)
+    point_row = np.repeat(np.arange(len(geom)), np.diff(off))
+    row_draw = (geom.op == 1) & (geom.region == 0) & np.isin(geom.aperture, list(table))
+    draw = row_draw[point_row]
+    ap = geom.aperture[point_row]
+    pol = geom.polarity[point_row]
+    prev_draw = np.concatenate(([False], draw[:-1]))
+    prev_ap = np.concatenate(([-1], ap[:-1]))
+    prev_pol = np.concatenate(([-1], pol[:-1]))
+    starts = np.flatnonzero(draw & (~prev_draw | (ap != prev_ap) | (pol != prev_pol)))
+    ends = np.flatnonzero(draw & ~np.concatenate((draw[1:], [False]))) + 1
+    for s in starts:
+        e = min(int(ends[np.searchsorted(ends, s, side="right")]), len(px))
+        nxt = np.flatnonzero((ap[s:e] != ap[s]) | (pol[s:e] != pol[s]))
+        if len(nxt):
+            e = s + int(nxt[0])
+        lo = max(int(s) - 1, 0)
+        pts = simplify_polyline(np.stack([px[lo:e], py[lo:e]], axis=1), simplify_tol)
+        shape, params = table[int(ap[s])]
+        width = 2 * min(half_extent(shape, params))
+        cap = "square" if shape == "R" else "round"
+        color = "currentColor" if pol[s] else CLEAR_COLOR
+        elements.append(
+            Element(
+                row=int(point_row[s]),
+                box=_box(pts, width / 2),
+                svg=f"<path d='{_path(pts, False)}' fill='none' stroke='{color}' stroke-width='{_fmt(width)}' stroke-linecap='{cap}'/>",
+                size=max(float(np.ptp(pts[:, 0])), float(np.ptp(pts[:, 1])), width),
+            )
+        )
+
+    contours = region_contours(geom, arc_tol)
+    for pts, polarity, row in zip(contours, contours.polarity, contours.row):
+        pts = simplify_polyline(pts, simplify_tol)
+        if len(pts) < 3:
+            continue
+        fill = "" if polarity else f" fill='{CLEAR_COLOR}'"
+        box = _box(pts)
+        elements.append(
+            Element(
+                row=int(row),
+                box=box,
+                svg=f"<path d='{_path(pts, True)}'{fill}/>",
+                size=max(box[1] - box[0], box[3] - box[2]),
+            )
+        )
+
+    elements.sort(key=lambda el: el.row)
+    return elements, {code: defs[code] for code in sorted(defs)}
+
+
+def render_svg(elements: List[Element], defs: Dict[int, str], view: Box) -> str:
+    min_x, max_x, min_y, max_y = view
+    w = max(max_x - min_x, 1e-6)
+    h = max(max_y - min_y, 1e-6)
+    used = sorted({el.aperture for el in elements if el.aperture is not None})
+    lines = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{w:.2f}mm' height='{h:.2f}mm' "
+        f"viewBox='{_fmt(min_x)} {_fmt(-max_y)} {_fmt(w)} {_fmt(h)}'>",
+    ]
+    if used:
+        lines.append("<defs>")
+        lines.extend(f"<g id='D{code}'>{defs[code]}</g>" for code in used)
+        lines.append("</defs>")
+    # Gerber Y grows upwards, SVG Y downwards.
+    lines.append("<g transform='scale(1,-1)' fill='currentColor' stroke-linejoin='round'>")
+    lines.extend(el.svg for el in elements)
+    lines.append("</g>")
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def layer_view(elements: List[Element]) -> Optional[Box]:
+    if not elements:
+        return None
+    boxes = np.array([el.box for el in elements])
+    return float(boxes[:, 0].min()), float(boxes[:, 1].max()), float(boxes[:, 2].min()), float(boxes[:, 3].max())
+
+
+def write_tiles(elements: List[Element], defs: Dict[int, str], view: Box, tile_mm: float, out: Path) -> List[Dict]:
+    """Write one SVG per grid cell; each holds the elements overlapping it."""
+    boxes = np.array([el.box for el in elements])
+    cols = max(1, int(math.ceil((view[1] - view[0]) / tile_mm)))
+    rows = max(1, int(math.ceil((view[3] - view[2]) / tile_mm)))
+    index = []
+    for r in range(rows):
+        for c in range(cols):
+            tile = (
+                view[0] + c * tile_mm,
+                min(view[1], view[0] + (c + 1) * tile_mm),
+                view[2] + r * tile_mm,
+                min(view[3], view[2] + (r + 1) * tile_mm),
+            )
+            hit = (boxes[:, 0] <= tile[1]) & (boxes[:, 1] >= tile[0]) & (boxes[:, 2] <= tile[3]) & (boxes[:, 3] >= tile[2])
+            if not hit.any():
+                continue
+            path = out.with_name(f"{out.stem}_r{r}_c{c}{out.suffix}")
+            path.write_text(render_svg([elements[k] for k in np.flatnonzero(hit)], defs, tile))
+            index.append({"file": path.name, "row": r, "col": c, "bounds_mm": list(tile), "elements": int(hit.sum())})
+    return index
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--outline", type=Path, required=True, help="Gerber outline file")
+    ap.add_argument("--outline", "--gerber", dest="gerber", type=Path, required=True, help="Gerber layer file")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output SVG")
+    ap.add_argument("--arc-tol-um", type=float, default=DEFAULT_ARC_TOL_MM * 1000, help="Max chord error for arcs")
+    ap.add_argument("--simplify-um", type=float, default=DEFAULT_SIMPLIFY_UM, help="Polyline simplification tolerance")
+    ap.add_argument("--tile-mm", type=float, help="Split the layer into square tiles of this size")
+    ap.add_argument("--lod", type=int, default=0, help="Also write N coarser level-of-detail SVGs")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
         return 0
 
-    unit = "MM"
-    fmt = {"x_dec": 4, "y_dec": 4}
-    points = []
-    for line in args.outline.read_text(errors="ignore").splitlines():
-        m_unit = UNIT_RE.search(line)
-        if m_unit:
-            unit = m_unit.group(1)
-        m_fmt = FORMAT_RE.search(line)
-        if m_fmt:
-            fmt = {"x_dec": int(m_fmt.group(2)), "y_dec": int(m_fmt.group(4))}
-        m = COORD_RE.search(line)
-        if m:
-            x = int(m.group(1)) / (10 ** fmt["x_dec"])
-            y = int(m.group(2)) / (10 ** fmt["y_dec"])
-            if unit == "IN":
-                x *= 25.4
-                y *= 25.4
-            points.append((x, y))
-
-    if not points:
+    geom = read_geometry(args.gerber, cache=FabCache.open(args.cache_dir))
+    arc_tol = args.arc_tol_um / 1000.0
+    elements, defs = build_elements(geom, arc_tol, args.simplify_um / 1000.0)
+    view = layer_view(elements)
+    if view is None:
         return 0
 
-    xs = [p[0] for p in points]
-    ys = [p[1] for p in points]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
-    w = max_x - min_x
-    h = max_y - min_y
-    svg = [
-        f"<svg xmlns='http://www.w3.org/2000/svg' width='{w:.2f}mm' height='{h:.2f}mm' viewBox='{min_x} {min_y} {w} {h}'>",
-        f"<rect x='{min_x}' y='{min_y}' width='{w}' height='{h}' fill='none' stroke='black' />",
-        "</svg>",
-    ]
-    args.out.write_text("\\n".join(svg))
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    if args.tile_mm:
+        index = write_tiles(elements, defs, view, args.tile_mm, args.out)
+        args.out.with_suffix(".json").write_text(
+            json.dumps({"bounds_mm": list(view), "tile_mm": args.tile_mm, "tiles": index}, indent=2, sort_keys=True)
+        )
+    else:
+        args.out.write_text(render_svg(elements, defs, view))
+
+    for level in range(1, args.lod + 1):
+        tol = args.simplify_um / 1000.0 * LOD_FACTOR ** level
+        coarse, coarse_defs = build_elements(geom, max(arc_tol, tol), tol)
+        # Features smaller than the tolerance vanish at this zoom level.
+        coarse = [el for el in coarse if el.size >= tol]
+        args.out.with_name(f"{args.out.stem}_lod{level}{args.out.suffix}").write_text(render_svg(coarse, coarse_defs, view))
     return 0
 
 
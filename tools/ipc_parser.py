@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 """Parse IPC-D-356A netlist and emit connectivity JSON.
 
+The file is streamed line by line: `iter_records` yields parameter and test
+records (317 through-hole, 327 SMT, 367 non-plated tooling) with
+continuation lines folded in, and `read_ipc` collects every test record
+field into columnar NumPy arrays, so access coordinates, feature sizes and
+access sides are available to downstream tools without a second parse.
+
 Outputs:
 - net_to_pins: {net_name: [(component, pin), ...]}
 - comp_to_pins: {component: {pin: net_name}}
@@ -11,37 +17,250 @@ from __future__ import annotations
 import argparse
 import json
 import re
+from array import array
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple, Union
 
-P_ALIAS_RE = re.compile(r"^P\s+NNAMENET(\d+)\s+(\S+)")
-REC_327_RE = re.compile(r"^(\d{3})([^\s]+)\s+([A-Za-z][A-Za-z0-9]*)\s+-([A-Za-z0-9]+)\s+")
+import numpy as np
 
+from fab_cache import FabCache
+from gerber_parser import Interner
 
-def parse_ipc(path: Path) -> dict:
-    net_aliases = {}
-    net_to_pins = {}
-    comp_to_pins = {}
 
-    for line in path.read_text().splitlines():
-        line = line.rstrip()
-        if not line:
+PARSER_VERSION = 1
+P_ALIAS_RE = re.compile(r"NNAMENET(\d+)")
+# Fallback for records whose reference designator is not at column 21.
+HEAD_RE = re.compile(r"^(\d{3})(\S+)\s+([A-Za-z][A-Za-z0-9_]*)\s*-(\S+)")
+TAIL_RE = re.compile(
+    r"(?:D(\d+)([PU])?)?\s*A(\d\d)\s*X([+-]?\d+)\s*Y([+-]?\d+)"
+    r"(?:\s*X(\d+))?(?:\s*Y(\d+))?(?:\s*R(\d+))?(?:\s*S(\d))?"
+)
+TEST_CODES = ("317", "327", "367")
+# Millimetres per coordinate step for each UNITS setting.
+UNIT_SCALE = {"CUST0": 0.00254, "CUST1": 0.001, "CUST2": 0.00254, "SI": 0.001}
+FLOAT_COLUMNS = ("x", "y", "drill", "width", "height")
+INT_COLUMNS = ("code", "net", "component", "pin", "midpoint", "plated", "access", "rotation", "mask")
+
+
+@dataclass(frozen=True, slots=True)
+class Parameter:
+    name: str
+    value: str
+
+
+@dataclass(frozen=True, slots=True)
+class TestRecord:
+    """One test record; lengths are raw file units, None when absent."""
+
+    code: int
+    net: str
+    component: str
+    pin: str
+    midpoint: bool
+    drill: Optional[int]
+    plated: Optional[bool]
+    access: int
+    x: int
+    y: int
+    width: Optional[int]
+    height: Optional[int]
+    rotation: int
+    mask: int
+
+
+Record = Union[Parameter, TestRecord]
+
+
+def _parse_test(line: str) -> Optional[TestRecord]:
+    if len(line) > 31 and line[26] == "-" and line[20] != " ":
+        net, component = line[3:17].strip(), line[20:26].strip()
+        pin, midpoint, tail = line[27:31].strip(), line[31] == "M", line[32:]
+    else:
+        m = HEAD_RE.match(line)
+        if not m:
+            return None
+        net, component, pin, midpoint, tail = m.group(2), m.group(3), m.group(4), False, line[m.end():]
+    m = TAIL_RE.search(tail)
+    if not m:
+        return None
+    drill, plated, access, x, y, width, height, rotation, mask = m.groups()
+    return TestRecord(
+        code=int(line[:3]),
+        net=net,
+        component=component,
+        pin=pin,
+        midpoint=midpoint,
+        drill=int(drill) if drill else None,
+        plated=None if not plated else plated == "P",
+        access=int(access),
+        x=int(x),
+        y=int(y),
+        width=int(width) if width else None,
+        height=int(height) if height else None,
+        rotation=int(rotation or "0"),
+        mask=int(mask or "0"),
+    )
+
+
+def iter_records(stream: TextIO) -> Iterator[Record]:
+    """Yield parameter and test records in file order.
+
+    A line whose code is ``0`` followed by the pending record's last two
+    digits continues that record and is appended to its field area.
+    """
+    pending: Optional[str] = None
+    for raw in stream:
+        line = raw.rstrip("\r\n")
+        if pending is not None:
+            if line[:3] == "0" + pending[1:3]:
+                pending += " " + line[3:]
+                continue
+            record = _parse_test(pending)
+            pending = None
+            if record is not None:
+                yield record
+        if not line.strip() or line.startswith("C"):
             continue
-        m_alias = P_ALIAS_RE.match(line)
-        if m_alias:
-            net_idx = m_alias.group(1)
-            net_name = m_alias.group(2)
-            net_aliases[f"NET{net_idx}"] = net_name
+        if line.startswith("999"):
+            break
+        if line.startswith("P"):
+            parts = line[1:].split(None, 1)
+            if parts:
+                yield Parameter(parts[0].upper(), parts[1].strip() if len(parts) > 1 else "")
+            continue
+        if line[:3] in TEST_CODES:
+            pending = line
+    if pending is not None:
+        record = _parse_test(pending)
+        if record is not None:
+            yield record
+
+
+def _empty_f() -> np.ndarray:
+    return np.empty(0, dtype=np.float64)
+
+
+def _empty_i() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+@dataclass
+class IpcNetlist:
+    """Columnar view of every test record in an IPC-D-356A file.
+
+    Row ``k`` is one record: ``code`` (317/327/367), ``net``/``component``/
+    ``pin`` as indices into `nets`, `components` and `pins`, ``midpoint``
+    (1 for mid-net points), access point ``x``/``y``, ``drill`` diameter
+    and feature ``width``/``height`` in mm (NaN when absent), ``plated``
+    (1, 0 or -1 when not stated), ``access`` side (0 both, 1 top, higher
+    numbers the layer accessed), ``rotation`` in degrees and the solder
+    ``mask`` code.
+    """
+
+    units: str = "CUST0"
+    aliases: Dict[str, str] = field(default_factory=dict)
+    nets: List[str] = field(default_factory=list)
+    components: List[str] = field(default_factory=list)
+    pins: List[str] = field(default_factory=list)
+    x: np.ndarray = field(default_factory=_empty_f)
+    y: np.ndarray = field(default_factory=_empty_f)
+    drill: np.ndarray = field(default_factory=_empty_f)
+    width: np.ndarray = field(default_factory=_empty_f)
+    height: np.ndarray = field(default_factory=_empty_f)
+    code: np.ndarray = field(default_factory=_empty_i)
+    net: np.ndarray = field(default_factory=_empty_i)
+    component: np.ndarray = field(default_factory=_empty_i)
+    pin: np.ndarray = field(default_factory=_empty_i)
+    midpoint: np.ndarray = field(default_factory=_empty_i)
+    plated: np.ndarray = field(default_factory=_empty_i)
+    access: np.ndarray = field(default_factory=_empty_i)
+    rotation: np.ndarray = field(default_factory=_empty_i)
+    mask: np.ndarray = field(default_factory=_empty_i)
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def pin_rows(self) -> np.ndarray:
+        """Rows that name a component pin (mid-net points and bare vias excluded)."""
+        named = np.array([bool(p) for p in self.pins], dtype=bool)
+        return np.flatnonzero((self.midpoint == 0) & named[self.pin]) if len(self) else _empty_i()
+
+    def to_record(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        header = {
+            "units": self.units,
+            "aliases": self.aliases,
+            "nets": self.nets,
+            "components": self.components,
+            "pins": self.pins,
+        }
+        return header, {name: getattr(self, name) for name in FLOAT_COLUMNS + INT_COLUMNS}
+
+    @classmethod
+    def from_record(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "IpcNetlist":
+        data = cls(**header)
+        for name in FLOAT_COLUMNS + INT_COLUMNS:
+            setattr(data, name, arrays[name])
+        return data
+
+
+def read_ipc(path: Path, cache: Optional[FabCache] = None) -> IpcNetlist:
+    """Parse an IPC-D-356A file into an `IpcNetlist`, through ``cache`` if given."""
+    if cache is not None:
+        header, arrays = cache.load(path, "ipc356", PARSER_VERSION, lambda p: read_ipc(p).to_record())
+        return IpcNetlist.from_record(header, arrays)
+    data = IpcNetlist()
+    floats = {name: array("d") for name in FLOAT_COLUMNS}
+    ints = {name: array("q") for name in INT_COLUMNS}
+    net_id, comp_id, pin_id = Interner(), Interner(), Interner()
+    nan = float("nan")
+    with path.open("r", errors="ignore") as stream:
+        for record in iter_records(stream):
+            if isinstance(record, Parameter):
+                units = record.value.replace(" ", "").upper()
+                if record.name == "UNITS" and units in UNIT_SCALE:
+                    data.units = units
+                m = P_ALIAS_RE.fullmatch(record.name)
+                if m and record.value:
+                    data.aliases[f"NET{m.group(1)}"] = record.value.split()[0]
+                continue
+            for name in FLOAT_COLUMNS:
+                value = getattr(record, name)
+                floats[name].append(nan if value is None else value)
+            ints["code"].append(record.code)
+            ints["net"].append(net_id(record.net))
+            ints["component"].append(comp_id(record.component))
+            ints["pin"].append(pin_id(record.pin))
+            ints["midpoint"].append(int(record.midpoint))
+            ints["plated"].append(-1 if record.plated is None else int(record.plated))
+            ints["access"].append(record.access)
+            ints["rotation"].append(record.rotation)
+            ints["mask"].append(record.mask)
+    # UNITS may be stated after the first records, so lengths are scaled last.
+    scale = UNIT_SCALE[data.units]
+    for name, values in floats.items():
+        setattr(data, name, np.frombuffer(values, dtype=np.float64) * scale if len(values) else _empty_f())
+    for name, values in ints.items():
+        setattr(data, name, np.frombuffer(values, dtype=np.int64) if len(values) else _empty_i())
+    data.nets, data.components, data.pins = net_id.names, comp_id.names, pin_id.names
+    return data
+
+
+def parse_ipc(path: Path, cache: Optional[FabCache] = None) -> dict:
+    data = read_ipc(path, cache)
+    net_to_pins = {}
+    comp_to_pins = {}
+    for k in data.pin_rows():
+        net_name = data.nets[data.net[k]]
+        if not net_name:
             continue
-        m_327 = REC_327_RE.match(line)
-        if m_327:
-            net_name = m_327.group(2)
-            comp = m_327.group(3)
-            pin = m_327.group(4)
-            net_to_pins.setdefault(net_name, []).append((comp, pin))
-            comp_to_pins.setdefault(comp, {})[pin] = net_name
+        comp = data.components[data.component[k]]
+        pin = data.pins[data.pin[k]]
+        net_to_pins.setdefault(net_name, []).append((comp, pin))
+        comp_to_pins.setdefault(comp, {})[pin] = net_name
 
     return {
-        "net_aliases": net_aliases,
+        "net_aliases": data.aliases,
         "net_to_pins": net_to_pins,
         "comp_to_pins": comp_to_pins,
     }
@@ -51,9 +270,10 @@ def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("ipc", type=Path, help="IPC-D-356A netlist")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     args = ap.parse_args()
 
-    data = parse_ipc(args.ipc)
+    data = parse_ipc(args.ipc, FabCache.open(args.cache_dir))
     args.out.write_text(json.dumps(data, indent=2, sort_keys=True))
     return 0
 
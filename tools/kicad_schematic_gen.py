@@ -18,6 +18,9 @@ from typing import Dict, Iterable, List, Tuple
 import csv
 import re
 
+from fab_cache import FabCache
+from netlist_store import load_netlist
+
 
 def _make_uuid() -> str:
     """Generate a new UUID string for KiCad elements."""
@@ -347,7 +350,7 @@ def _infer_sheet_from_nets(ref: str, nets: List[str]) -> str:
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON")
+    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON, .npz or IPC-D-356A file")
     ap.add_argument("--values", type=Path, required=True, help="Component values JSON")
     ap.add_argument("--blocks", type=Path, required=True, help="Blocks JSON")
     ap.add_argument("--out-dir", type=Path, required=True, help="Output KiCad dir")
@@ -358,20 +361,21 @@ def main() -> int:
         default=Path("data/component_placement.json"),
         help="Placement JSON for package hints",
     )
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
-        json.loads(args.netlist.read_text())
+        load_netlist(args.netlist)
         json.loads(args.values.read_text())
         json.loads(args.blocks.read_text())
         return 0
 
-    netlist = json.loads(args.netlist.read_text())
+    netlist = load_netlist(args.netlist, FabCache.open(args.cache_dir))
     values = json.loads(args.values.read_text())
     blocks = json.loads(args.blocks.read_text()).get("blocks", {})
     pkg_map = _load_pkg_map(args.bom, args.placement)
-    comp_to_pins = netlist.get("comp_to_pins", {})
+    comp_to_pins = netlist.comp_to_pins()
 
     out_dir = args.out_dir
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -4,11 +4,12 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
-import xlrd
+from excellon_parser import read_drill
+from fab_cache import FabCache
+from sheet_reader import cell, find_header, iter_rows
 
 
 REQUIRED_GERBERS = [
@@ -23,42 +24,31 @@ REQUIRED_GERBERS = [
 ]
 
 
-def parse_round_holes(path: Path) -> Dict[str, float]:
-    tool_sizes = {}
+def parse_round_holes(path: Path, cache: Optional[FabCache] = None) -> Dict[str, float]:
     if not path.exists():
-        return tool_sizes
-    for line in path.read_text().splitlines():
-        if line.startswith("T") and "C" in line:
-            m = re.match(r"T(\d+).+C([0-9.]+)", line)
-            if m:
-                tool_sizes[m.group(1)] = float(m.group(2))
-    return tool_sizes
+        return {}
+    return read_drill(path, cache).tools
 
 
-def parse_pnp(path: Path) -> List[str]:
-    wb = xlrd.open_workbook(path.as_posix())
-    sheet = wb.sheet_by_index(0)
-    header_row = None
-    for row_idx in range(min(30, sheet.nrows)):
-        row = [str(sheet.cell_value(row_idx, c)).strip().lower() for c in range(sheet.ncols)]
-        if "designator" in row:
-            header_row = row_idx
-            break
-    if header_row is None:
-        return []
-    designator_idx = None
-    for c in range(sheet.ncols):
-        if str(sheet.cell_value(header_row, c)).strip().lower() == "designator":
-            designator_idx = c
-            break
-    if designator_idx is None:
-        return []
-    refs = []
-    for row_idx in range(header_row + 1, sheet.nrows):
-        ref = str(sheet.cell_value(row_idx, designator_idx)).strip()
+def _is_pnp_header(names: List[str]) -> bool:
+    return "designator" in names
+
+
+def iter_pnp_refs(path: Path) -> Iterator[str]:
+    """Designators of a pick-and-place ``.xls``, ``.xlsx`` or CSV, as they are read."""
+    rows = iter_rows(path)
+    headers = find_header(rows, _is_pnp_header, 30, lambda c: str(c).strip().lower())
+    if headers is None:
+        return
+    designator_idx = headers["designator"]
+    for row in rows:
+        ref = str(cell(row, designator_idx)).strip()
         if ref and ref != "!PCB":
-            refs.append(ref)
-    return refs
+            yield ref
+
+
+def parse_pnp(path: Path) -> List[str]:
+    return list(iter_pnp_refs(path))
 
 
 def count_signal_layers(matrix_path: Path) -> int:
@@ -72,26 +62,28 @@ def count_signal_layers(matrix_path: Path) -> int:
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--fab-dir", type=Path, required=True, help="Fabrication package directory")
-    ap.add_argument("--pnp", type=Path, required=True, help="Pick and place .xls")
-    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls")
+    ap.add_argument("--pnp", type=Path, required=True, help="Pick and place .xls, .xlsx or .csv")
+    ap.add_argument("--bom", type=Path, required=True, help="BOM .xls, .xlsx or .csv")
     ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
         json.loads(args.netlist.read_text())
-        parse_pnp(args.pnp)
+        next(iter_pnp_refs(args.pnp), None)
         return 0
 
     gerber_dir = args.fab_dir / "GerberNCdrills"
     existing = {p.name for p in gerber_dir.iterdir()} if gerber_dir.exists() else set()
     missing = [f for f in REQUIRED_GERBERS if f not in existing]
 
-    round_holes = parse_round_holes(gerber_dir / "PROC091G-RoundHoles.TXT")
-    slot_holes = parse_round_holes(gerber_dir / "PROC091G-SlotHoles.TXT")
+    cache = FabCache.open(args.cache_dir)
+    round_holes = parse_round_holes(gerber_dir / "PROC091G-RoundHoles.TXT", cache)
+    slot_holes = parse_round_holes(gerber_dir / "PROC091G-SlotHoles.TXT", cache)
 
-    pnp_refs = set(parse_pnp(args.pnp))
+    pnp_refs = set(iter_pnp_refs(args.pnp))
     netlist = json.loads(args.netlist.read_text())
     netlist_refs = set(netlist.get("comp_to_pins", {}).keys())
 
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Extended nets through two-pin series parts.
+
+Nets are the nodes and every two-pin series part (ferrite ``FL*``,
+inductor ``L*`` and 0-ohm resistors) is an edge between the two nets it
+joins. A union-find over those edges yields "extended nets": a rail split
+by a bead into ``5V_IN`` and ``NetFL1_2`` is one domain. Edges can be
+added and removed for what-if queries; additions are merged in place and
+a removal marks the forest for a rebuild on the next query.
+"""
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from netlist_store import Netlist
+from value_parser import CLASS_RE, parse_value
+
+
+SERIES_CLASSES = ("FL", "L")
+GROUND_RE = re.compile(r"^[ADP]?GND", re.IGNORECASE)
+
+
+def zero_ohm_parts(values: Dict[str, str]) -> List[str]:
+    """Resistors whose value reads as zero ohms (``0``, ``0R``, ``0 Ohm``...)."""
+    zero = []
+    for ref, value in values.items():
+        parsed = parse_value(str(value), "ohm")
+        if ref.startswith("R") and parsed.unit == "ohm" and parsed.value == 0:
+            zero.append(ref)
+    return sorted(zero)
+
+
+def series_parts(netlist: Netlist, zero_ohm: Iterable[str] = ()) -> List[str]:
+    """Components of `SERIES_CLASSES` plus the given 0-ohm resistors."""
+    parts = set(zero_ohm)
+    for comp in netlist.components.tolist():
+        m = CLASS_RE.match(comp)
+        if m and m.group(0) in SERIES_CLASSES:
+            parts.add(comp)
+    return sorted(parts)
+
+
+def load_graph(netlist: Netlist, values: Optional[Path] = None) -> "NetGraph":
+    """Graph over every series part; ``values`` (component values JSON) adds 0-ohm links."""
+    zero_ohm = zero_ohm_parts(json.loads(values.read_text())) if values else []
+    return NetGraph(netlist, series_parts(netlist, zero_ohm))
+
+
+class NetGraph:
+    def __init__(self, netlist: Netlist, parts: Iterable[str] = ()) -> None:
+        self.netlist = netlist
+        self.edges: Dict[str, Tuple[int, int]] = {}
+        self.parent = np.arange(len(netlist.nets), dtype=np.int64)
+        self.size = np.ones(len(netlist.nets), dtype=np.int64)
+        self.pin_count = np.diff(netlist.net_ptr).tolist()
+        self._dirty = False
+        self._roots: Optional[np.ndarray] = None
+        self._parts: Optional[Dict[int, List[str]]] = None
+        for comp in parts:
+            self.add_part(comp)
+
+    def _endpoints(self, comp: str) -> Optional[Tuple[int, int]]:
+        k = self.netlist.comp_id(comp)
+        if k is None:
+            return None
+        nets = np.unique(self.netlist.conn_net[self.netlist.comp_conns(k)])
+        if len(nets) != 2:
+            return None
+        # A strap to ground shorts a rail rather than extending it.
+        if any(GROUND_RE.match(str(self.netlist.nets[n])) for n in nets):
+            return None
+        return int(nets[0]), int(nets[1])
+
+    def _find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = int(parent[x])
+        return x
+
+    def _union(self, a: int, b: int) -> None:
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        self._roots = self._parts = None
+
+    def _rebuild(self) -> None:
+        self.parent = np.arange(len(self.netlist.nets), dtype=np.int64)
+        self.size = np.ones(len(self.netlist.nets), dtype=np.int64)
+        for a, b in self.edges.values():
+            self._union(a, b)
+        self._dirty = False
+
+    def add_part(self, comp: str) -> bool:
+        """Join the two nets of ``comp``; False when it is not a two-net part
+        or one of its nets is a ground."""
+        ends = self._endpoints(comp)
+        if ends is None:
+            return False
+        self.edges[comp] = ends
+        self._parts = None
+        if not self._dirty:
+            self._union(*ends)
+        return True
+
+    def remove_part(self, comp: str) -> bool:
+        """Open ``comp`` (e.g. a DNP bead); the forest is rebuilt lazily."""
+        if self.edges.pop(comp, None) is None:
+            return False
+        self._dirty = True
+        self._roots = self._parts = None
+        return True
+
+    def what_if(self, add: Iterable[str] = (), remove: Iterable[str] = ()) -> "NetGraph":
+        """A copy of this graph with parts added and removed."""
+        other = NetGraph(self.netlist)
+        other.edges = dict(self.edges)
+        other._dirty = True
+        for comp in remove:
+            other.remove_part(comp)
+        for comp in add:
+            other.add_part(comp)
+        return other
+
+    def roots(self) -> np.ndarray:
+        """Domain root of every net ID (cached until the edges change)."""
+        if self._dirty:
+            self._rebuild()
+        if self._roots is None:
+            # Pointer jumping: every pass halves the remaining path lengths.
+            roots = self.parent
+            while True:
+                up = roots[roots]
+                if np.array_equal(up, roots):
+                    break
+                roots = up
+            self._roots = roots
+        return self._roots
+
+    def domains(self) -> Dict[int, List[int]]:
+        """Net IDs grouped by extended net, for domains of more than one net."""
+        roots = self.roots()
+        order = np.argsort(roots, kind="stable")
+        bounds = np.flatnonzero(np.diff(roots[order])) + 1
+        groups = np.split(order, bounds) if len(order) else []
+        return {int(roots[g[0]]): g.tolist() for g in groups if len(g) > 1}
+
+    def extended_net(self, net: str) -> List[str]:
+        """All nets joined to ``net`` through series parts (itself included)."""
+        k = self.netlist.net_id(net)
+        if k is None:
+            return []
+        roots = self.roots()
+        return sorted(self.netlist.nets[roots == roots[k]].tolist())
+
+    def domain_parts(self, net_ids: List[int]) -> List[str]:
+        """Series parts joining the nets of one domain (as returned by `domains`)."""
+        if not net_ids:
+            return []
+        if self._parts is None:
+            roots = self.roots()
+            parts: Dict[int, List[str]] = {}
+            for comp in sorted(self.edges):
+                parts.setdefault(int(roots[self.edges[comp][0]]), []).append(comp)
+            self._parts = parts
+        return list(self._parts.get(int(self.roots()[net_ids[0]]), []))
+
+    def domain_name(self, net_ids: List[int]) -> str:
+        """The member net with the most pins, preferring named nets over ``Net*`` ones."""
+        pins = self.pin_count
+        names = {k: str(self.netlist.nets[k]) for k in net_ids}
+        return names[max(names, key=lambda k: (not names[k].startswith("Net"), pins[k], names[k]))]
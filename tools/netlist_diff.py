@@ -1,76 +1,225 @@
 #!/usr/bin/env python3
-"""Advanced netlist diff with HTML and Markdown reports."""
+"""Advanced netlist diff with HTML and Markdown reports.
+
+Each net's canonical pin set is hashed once per netlist (an order-free sum
+of mixed 64-bit ``(component, pin)`` hashes), so exact renames are a hash
+join instead of a pairwise scan. The optional fuzzy mode finds nets that
+were renamed and slightly rewired: MinHash signatures over the pin sets
+are banded for LSH, and only colliding removed/added pairs have their
+Jaccard similarity measured.
+
+``--history`` diffs N netlists in order, hashing each revision once and
+reusing it for both neighbouring steps, and emits a per-net lineage table
+(added, renamed, rewired, removed by revision).
+"""
 from __future__ import annotations
 
 import argparse
+import html as html_lib
 import json
+from dataclasses import dataclass
+from hashlib import blake2b
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fab_cache import FabCache
+from netlist_store import Netlist, load_netlist
+
+
+DEFAULT_JACCARD = 0.8
+DEFAULT_NUM_PERM = 128
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
 
 
 def load(path: Path) -> Dict:
     return json.loads(path.read_text())
 
 
-def pins_set(netlist: Dict, net: str) -> set[Tuple[str, str]]:
-    return set(tuple(p) for p in netlist["net_to_pins"].get(net, []))
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer, elementwise on uint64."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _string_hashes(names: np.ndarray) -> np.ndarray:
+    return np.array(
+        [int.from_bytes(blake2b(s.encode(), digest_size=8).digest(), "little") for s in names.tolist()],
+        dtype=np.uint64,
+    )
+
+
+@dataclass
+class PinSets:
+    """Canonical pin set of every net: unique pin hashes grouped by net.
+
+    ``pins[ptr[k]:ptr[k + 1]]`` are the sorted pin hashes of net ``k`` and
+    ``hash[k]`` their order-free set hash.
+    """
+
+    netlist: Netlist
+    pins: np.ndarray
+    ptr: np.ndarray
+    hash: np.ndarray
+
+    def members(self, k: int) -> np.ndarray:
+        return self.pins[self.ptr[k] : self.ptr[k + 1]]
+
+
+def pin_sets(netlist: Netlist) -> PinSets:
+    with np.errstate(over="ignore"):
+        comp_h = _string_hashes(netlist.components)
+        pin_h = _string_hashes(netlist.pins)
+        pin = _mix64(comp_h[netlist.conn_comp] * _GOLDEN + pin_h[netlist.conn_pin]) if len(netlist) else np.zeros(0, np.uint64)
+        # One row per (net, pin): duplicate records of a pin collapse.
+        net = netlist.conn_net.astype(np.uint64)
+        order = np.lexsort((pin, net))
+        net, pin = net[order], pin[order]
+        keep = np.ones(len(pin), dtype=bool)
+        keep[1:] = (net[1:] != net[:-1]) | (pin[1:] != pin[:-1])
+        net, pin = net[keep].astype(np.int64), pin[keep]
+        ptr = np.zeros(len(netlist.nets) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(net, minlength=len(netlist.nets)), out=ptr[1:])
+        set_hash = np.zeros(len(netlist.nets), dtype=np.uint64)
+        nonempty = np.flatnonzero(ptr[1:] > ptr[:-1])
+        if len(nonempty):
+            set_hash[nonempty] = np.add.reduceat(_mix64(pin), ptr[nonempty])
+    return PinSets(netlist=netlist, pins=pin, ptr=ptr, hash=set_hash)
+
+
+def pins_set(netlist: Netlist, net: str) -> set[Tuple[str, str]]:
+    return set(netlist.net_pins(net))
 
 
-def detect_renames(net_a: Dict, net_b: Dict) -> List[Dict]:
+def detect_renames(sets_a: PinSets, sets_b: PinSets) -> List[Dict]:
+    """Nets of A whose exact pin set is carried by a differently named net of B."""
+    by_hash = {h: k for k, h in enumerate(sets_b.hash.tolist()) if sets_b.ptr[k + 1] > sets_b.ptr[k]}
     renames = []
     used_b = set()
-    for net in net_a["net_to_pins"]:
-        pins = pins_set(net_a, net)
-        if not pins:
+    for k, h in enumerate(sets_a.hash.tolist()):
+        other = by_hash.get(h)
+        if other is None or other in used_b or sets_a.ptr[k + 1] == sets_a.ptr[k]:
             continue
-        for other in net_b["net_to_pins"]:
-            if other in used_b:
-                continue
-            if pins == pins_set(net_b, other) and net != other:
-                renames.append({"from": net, "to": other})
-                used_b.add(other)
-                break
+        net, other_name = sets_a.netlist.nets[k], sets_b.netlist.nets[other]
+        if net != other_name and np.array_equal(sets_a.members(k), sets_b.members(other)):
+            renames.append({"from": str(net), "to": str(other_name)})
+            used_b.add(other)
     return renames
 
 
-def impact_blocks(changed_nets: List[str], blocks: Dict) -> Dict[str, List[str]]:
-    block_map = {name: set(info.get("nets", [])) for name, info in blocks.items()}
-    impact = {name: [] for name in block_map}
-    for net in changed_nets:
-        for name, nets in block_map.items():
-            if net in nets:
-                impact[name].append(net)
-    return {k: sorted(v) for k, v in impact.items() if v}
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Bands and rows per band whose S-curve midpoint is nearest ``threshold``."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--a", type=Path, required=True, help="Netlist JSON A")
-    ap.add_argument("--b", type=Path, required=True, help="Netlist JSON B")
-    ap.add_argument("--blocks", type=Path, required=True, help="Schematic blocks JSON")
-    ap.add_argument("--out-json", type=Path, required=True, help="Output JSON")
-    ap.add_argument("--out-html", type=Path, required=True, help="Output HTML")
-    ap.add_argument("--out-md", type=Path, required=True, help="Output Markdown")
-    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
-    args = ap.parse_args()
+def minhash(sets: PinSets, nets: np.ndarray, num_perm: int) -> np.ndarray:
+    """``len(nets) x num_perm`` MinHash signatures (all nets must be non-empty)."""
+    seeds = _mix64(np.arange(1, num_perm + 1, dtype=np.uint64) * _GOLDEN)
+    sig = np.empty((len(nets), num_perm), dtype=np.uint64)
+    if not len(nets):
+        return sig
+    counts = sets.ptr[nets + 1] - sets.ptr[nets]
+    rows = np.repeat(sets.ptr[nets], counts) + (np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts))
+    starts = np.cumsum(counts) - counts
+    with np.errstate(over="ignore"):
+        for j in range(num_perm):
+            sig[:, j] = np.minimum.reduceat(_mix64(sets.pins[rows] ^ seeds[j]), starts)
+    return sig
+
+
+def fuzzy_renames(
+    sets_a: PinSets,
+    sets_b: PinSets,
+    nets_a: List[str],
+    nets_b: List[str],
+    threshold: float = DEFAULT_JACCARD,
+    num_perm: int = DEFAULT_NUM_PERM,
+) -> List[Dict]:
+    """Pair nets of ``nets_a`` with nets of ``nets_b`` at Jaccard >= ``threshold``.
+
+    Pairs are taken greedily by descending similarity, each net at most once.
+    """
+    ids_a = np.array([k for k in map(sets_a.netlist.net_id, nets_a) if k is not None], dtype=np.int64)
+    ids_b = np.array([k for k in map(sets_b.netlist.net_id, nets_b) if k is not None], dtype=np.int64)
+    ids_a = ids_a[sets_a.ptr[ids_a + 1] > sets_a.ptr[ids_a]]
+    ids_b = ids_b[sets_b.ptr[ids_b + 1] > sets_b.ptr[ids_b]]
+    if not len(ids_a) or not len(ids_b):
+        return []
+    bands, rows = lsh_bands(num_perm, threshold)
+    sig_a = minhash(sets_a, ids_a, num_perm)
+    sig_b = minhash(sets_b, ids_b, num_perm)
+    candidates = set()
+    for band in range(bands):
+        cols = slice(band * rows, (band + 1) * rows)
+        buckets: Dict[bytes, List[int]] = {}
+        for i, key in enumerate(sig_b[:, cols]):
+            buckets.setdefault(key.tobytes(), []).append(i)
+        for i, key in enumerate(sig_a[:, cols]):
+            candidates.update((i, j) for j in buckets.get(key.tobytes(), ()))
+    scored = []
+    for i, j in candidates:
+        a, b = sets_a.members(int(ids_a[i])), sets_b.members(int(ids_b[j]))
+        inter = len(np.intersect1d(a, b, assume_unique=True))
+        jaccard = inter / (len(a) + len(b) - inter)
+        if jaccard >= threshold:
+            scored.append((-jaccard, i, j))
+    out = []
+    used_a, used_b = set(), set()
+    for neg, i, j in sorted(scored):
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        out.append(
+            {
+                "from": str(sets_a.netlist.nets[ids_a[i]]),
+                "to": str(sets_b.netlist.nets[ids_b[j]]),
+                "jaccard": round(-neg, 4),
+            }
+        )
+    return out
 
-    if args.dry_run:
-        load(args.a)
-        load(args.b)
-        load(args.blocks)
-        return 0
 
-    net_a = load(args.a)
-    net_b = load(args.b)
-    blocks = load(args.blocks).get("blocks", {})
+def block_index(blocks: Dict) -> Dict[str, List[str]]:
+    """Net name -> names of the schematic blocks that contain it."""
+    index: Dict[str, List[str]] = {}
+    for name, info in blocks.items():
+        for net in info.get("nets", []):
+            index.setdefault(net, []).append(name)
+    return index
 
-    nets_a = set(net_a["net_to_pins"].keys())
-    nets_b = set(net_b["net_to_pins"].keys())
+
+def impact_blocks(changed_nets: List[str], net_blocks: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    impact: Dict[str, set] = {}
+    for net in changed_nets:
+        for name in net_blocks.get(net, ()):
+            impact.setdefault(name, set()).add(net)
+    return {k: sorted(v) for k, v in impact.items()}
+
+
+def diff_netlists(
+    net_a: Netlist,
+    net_b: Netlist,
+    fuzzy: bool = False,
+    threshold: float = DEFAULT_JACCARD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    sets: Optional[Tuple[PinSets, PinSets]] = None,
+) -> Dict:
+    sets_a, sets_b = sets or (pin_sets(net_a), pin_sets(net_b))
+    nets_a = set(net_a.nets.tolist())
+    nets_b = set(net_b.nets.tolist())
     added = sorted(nets_b - nets_a)
     removed = sorted(nets_a - nets_b)
 
     changed = {}
     for net in sorted(nets_a & nets_b):
+        if sets_a.hash[net_a.net_id(net)] == sets_b.hash[net_b.net_id(net)]:
+            continue
         a_pins = pins_set(net_a, net)
         b_pins = pins_set(net_b, net)
         if a_pins != b_pins:
@@ -79,16 +228,180 @@ def main() -> int:
                 "removed_pins": sorted(a_pins - b_pins),
             }
 
-    renames = detect_renames(net_a, net_b)
-    impacted = impact_blocks(list(changed.keys()) + added + removed, blocks)
-
     report = {
         "nets_added": added,
         "nets_removed": removed,
         "nets_changed": changed,
-        "renamed_nets": renames,
-        "impact_by_block": impacted,
+        "renamed_nets": detect_renames(sets_a, sets_b),
     }
+    if fuzzy:
+        exact = report["renamed_nets"]
+        taken_a = {r["from"] for r in exact}
+        taken_b = {r["to"] for r in exact}
+        report["fuzzy_renamed_nets"] = fuzzy_renames(
+            sets_a,
+            sets_b,
+            [n for n in removed if n not in taken_a],
+            [n for n in added if n not in taken_b],
+            threshold,
+            num_perm,
+        )
+    return report
+
+
+def net_history(
+    netlists: List[Netlist],
+    labels: List[str],
+    net_blocks: Dict[str, List[str]],
+    fuzzy: bool = False,
+    threshold: float = DEFAULT_JACCARD,
+    num_perm: int = DEFAULT_NUM_PERM,
+) -> Dict:
+    """Consecutive diffs of ``netlists`` and the lineage of every net through them.
+
+    A lineage follows one net across renames (exact, or fuzzy when enabled)
+    where the old name disappears and the new one appears. Lineages with no
+    event after the first revision are only counted.
+    """
+    sets = [pin_sets(n) for n in netlists]
+    lineages: List[Dict] = []
+    current: Dict[str, int] = {}
+    for net in netlists[0].nets.tolist():
+        current[net] = len(lineages)
+        lineages.append({"net": net, "names": [net], "added": labels[0], "removed": None, "renamed": [], "rewired": []})
+
+    steps = []
+    for i in range(1, len(netlists)):
+        rev = labels[i]
+        report = diff_netlists(netlists[i - 1], netlists[i], fuzzy, threshold, num_perm, (sets[i - 1], sets[i]))
+        added, removed = set(report["nets_added"]), set(report["nets_removed"])
+        moves = report["renamed_nets"] + report.get("fuzzy_renamed_nets", [])
+        carried = {m["from"]: m for m in moves if m["from"] in removed and m["to"] in added}
+        nxt = {net: k for net, k in current.items() if net not in removed}
+        for old, move in carried.items():
+            k = current[old]
+            lineage = lineages[k]
+            lineage["net"] = move["to"]
+            lineage["names"].append(move["to"])
+            lineage["renamed"].append({"rev": rev, "from": old, "to": move["to"]})
+            if "jaccard" in move:
+                lineage["rewired"].append(rev)
+            nxt[move["to"]] = k
+        for old in sorted(removed - carried.keys()):
+            lineages[current[old]]["removed"] = rev
+        new_names = {m["to"] for m in carried.values()}
+        for net in sorted(added - new_names):
+            nxt[net] = len(lineages)
+            lineages.append({"net": net, "names": [net], "added": rev, "removed": None, "renamed": [], "rewired": []})
+        for net in report["nets_changed"]:
+            lineages[nxt[net]]["rewired"].append(rev)
+        current = nxt
+        steps.append(
+            {
+                "from": labels[i - 1],
+                "to": rev,
+                "nets_added": len(added),
+                "nets_removed": len(removed),
+                "nets_changed": len(report["nets_changed"]),
+                "renamed_nets": len(report["renamed_nets"]),
+                "fuzzy_renamed_nets": len(report.get("fuzzy_renamed_nets", [])),
+                "impact_by_block": impact_blocks(list(report["nets_changed"]) + sorted(added) + sorted(removed), net_blocks),
+            }
+        )
+
+    eventful = [
+        lin for lin in lineages
+        if lin["added"] != labels[0] or lin["removed"] or lin["renamed"] or lin["rewired"]
+    ]
+    return {
+        "revisions": labels,
+        "steps": steps,
+        "lineage": sorted(eventful, key=lambda lin: lin["names"][0]),
+        "stable_nets": len(lineages) - len(eventful),
+    }
+
+
+def write_history_reports(history: Dict, out_md: Path, out_html: Path) -> None:
+    revs = history["revisions"]
+    lines = ["# Netlist History Report", "", f"Revisions: {' -> '.join(revs)}", ""]
+    lines += ["| Step | Added | Removed | Changed | Renamed |", "|---|---:|---:|---:|---:|"]
+    for step in history["steps"]:
+        renamed = step["renamed_nets"] + step["fuzzy_renamed_nets"]
+        lines.append(
+            f"| {step['from']} -> {step['to']} | {step['nets_added']} | {step['nets_removed']} "
+            f"| {step['nets_changed']} | {renamed} |"
+        )
+    lines += ["", f"Nets unchanged across all revisions: {history['stable_nets']}", "", "See JSON for the lineage table."]
+    out_md.write_text("\n".join(lines) + "\n")
+
+    header = "".join(f"<th>{html_lib.escape(r)}</th>" for r in revs)
+    rows = []
+    for lin in history["lineage"]:
+        cells = []
+        for rev in revs:
+            events = []
+            if lin["added"] == rev and rev != revs[0]:
+                events.append("added")
+            events += [f"renamed from {r['from']}" for r in lin["renamed"] if r["rev"] == rev]
+            if rev in lin["rewired"]:
+                events.append("rewired")
+            if lin["removed"] == rev:
+                events.append("removed")
+            cells.append(f"<td>{html_lib.escape(', '.join(events))}</td>")
+        rows.append(f"<tr><td>{html_lib.escape(lin['net'])}</td>{''.join(cells)}</tr>")
+    html = ["<html><body><h1>Netlist History Report</h1>"]
+    html.append(f"<table><tr><th>Net</th>{header}</tr>")
+    html.extend(rows)
+    html.append("</table></body></html>")
+    out_html.write_text("\n".join(html))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--a", type=Path, help="Netlist A (JSON, .npz or IPC-D-356A)")
+    ap.add_argument("--b", type=Path, help="Netlist B (JSON, .npz or IPC-D-356A)")
+    ap.add_argument("--history", type=Path, nargs="+", help="Netlists of every revision, oldest first (instead of --a/--b)")
+    ap.add_argument("--labels", nargs="+", help="Revision labels for --history (default: file stems)")
+    ap.add_argument("--blocks", type=Path, required=True, help="Schematic blocks JSON")
+    ap.add_argument("--out-json", type=Path, required=True, help="Output JSON")
+    ap.add_argument("--out-html", type=Path, required=True, help="Output HTML")
+    ap.add_argument("--out-md", type=Path, required=True, help="Output Markdown")
+    ap.add_argument("--fuzzy", action="store_true", help="Also match renamed nets with rewired pins (MinHash/LSH)")
+    ap.add_argument("--jaccard", type=float, default=DEFAULT_JACCARD, help="Fuzzy match pin-set similarity threshold")
+    ap.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM, help="MinHash signature length")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
+    ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
+    args = ap.parse_args()
+    paths = args.history or [args.a, args.b]
+    if not args.history and (args.a is None or args.b is None):
+        ap.error("either --a and --b, or --history, is required")
+    if args.history and len(args.history) < 2:
+        ap.error("--history needs at least two netlists")
+    labels = args.labels or [p.stem for p in paths]
+    if len(labels) != len(paths):
+        ap.error("--labels must name every --history netlist")
+
+    if args.dry_run:
+        for path in paths:
+            load_netlist(path)
+        load(args.blocks)
+        return 0
+
+    cache = FabCache.open(args.cache_dir)
+    net_blocks = block_index(load(args.blocks).get("blocks", {}))
+    if args.history:
+        netlists = [load_netlist(path, cache) for path in paths]
+        history = net_history(netlists, labels, net_blocks, args.fuzzy, args.jaccard, args.num_perm)
+        args.out_json.write_text(json.dumps(history, indent=2, sort_keys=True))
+        write_history_reports(history, args.out_md, args.out_html)
+        return 0
+
+    net_a = load_netlist(args.a, cache)
+    net_b = load_netlist(args.b, cache)
+
+    report = diff_netlists(net_a, net_b, args.fuzzy, args.jaccard, args.num_perm)
+    added, removed = report["nets_added"], report["nets_removed"]
+    report["impact_by_block"] = impact_blocks(list(report["nets_changed"].keys()) + added + removed, net_blocks)
     args.out_json.write_text(json.dumps(report, indent=2, sort_keys=True))
 
     args.out_md.write_text(
@@ -97,9 +410,11 @@ def main() -> int:
         "See JSON for full details.\n"
     )
 
+    added_text = html_lib.escape("\n".join(added))
+    removed_text = html_lib.escape("\n".join(removed))
     html = ["<html><body><h1>Netlist Diff Report</h1>"]
-    html.append(f"<h2>Added nets ({len(added)})</h2><pre>{'\\n'.join(added)}</pre>")
-    html.append(f"<h2>Removed nets ({len(removed)})</h2><pre>{'\\n'.join(removed)}</pre>")
+    html.append(f"<h2>Added nets ({len(added)})</h2><pre>{added_text}</pre>")
+    html.append(f"<h2>Removed nets ({len(removed)})</h2><pre>{removed_text}</pre>")
     html.append("</body></html>")
     args.out_html.write_text("\n".join(html))
     return 0
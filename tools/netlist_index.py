@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Query index over a `netlist_store.Netlist`.
+
+Built once per netlist, it answers the lookups the netlist tools used to
+do with nested loops: net and component name prefixes by binary search on
+the stored sort orders, regular-expression net queries cached per
+pattern, components grouped by reference-designator class (``C``, ``R``,
+``TP``, ``U``...) and neighbours through shared nets via the CSR tables.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from netlist_store import Netlist
+from value_parser import CLASS_RE
+
+
+def _prefix_slice(sorted_names: np.ndarray, prefix: str) -> slice:
+    lo = int(np.searchsorted(sorted_names, prefix, side="left"))
+    # Every name starting with ``prefix`` sorts below prefix + U+10FFFF.
+    hi = int(np.searchsorted(sorted_names, prefix + "\U0010ffff", side="left"))
+    return slice(lo, hi)
+
+
+class NetlistIndex:
+    def __init__(self, netlist: Netlist) -> None:
+        self.netlist = netlist
+        self.sorted_nets = netlist.nets[netlist.net_order]
+        self.sorted_components = netlist.components[netlist.comp_order]
+        self._regex_cache: Dict[str, np.ndarray] = {}
+        self._classes: Optional[Dict[str, List[str]]] = None
+
+    def net_ids_with_prefix(self, *prefixes: str) -> np.ndarray:
+        """Sorted unique IDs of nets starting with any of ``prefixes``."""
+        order = self.netlist.net_order
+        parts = [order[_prefix_slice(self.sorted_nets, p)] for p in prefixes]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def nets_with_prefix(self, *prefixes: str) -> List[str]:
+        return sorted(self.netlist.nets[self.net_ids_with_prefix(*prefixes)].tolist())
+
+    def components_with_prefix(self, *prefixes: str) -> List[str]:
+        parts = [self.sorted_components[_prefix_slice(self.sorted_components, p)].tolist() for p in prefixes]
+        return sorted(set().union(*parts))
+
+    def net_ids_matching(self, pattern: str) -> np.ndarray:
+        """IDs of nets where ``pattern`` is found (`re.search`), cached per pattern."""
+        hit = self._regex_cache.get(pattern)
+        if hit is None:
+            search = re.compile(pattern).search
+            hit = np.array([k for k, net in enumerate(self.netlist.nets.tolist()) if search(net)], dtype=np.int64)
+            self._regex_cache[pattern] = hit
+        return hit
+
+    def nets_matching(self, *patterns: str) -> List[str]:
+        ids = [self.net_ids_matching(p) for p in patterns]
+        return sorted(self.netlist.nets[np.unique(np.concatenate(ids))].tolist()) if ids else []
+
+    def components_on_nets(self, net_ids: Iterable[int]) -> List[str]:
+        """Components with at least one pin on any of ``net_ids``."""
+        nl = self.netlist
+        ids = np.asarray(list(net_ids), dtype=np.int64)
+        if not len(ids):
+            return []
+        rows = np.concatenate([nl.net_conns(k) for k in ids.tolist()])
+        return sorted(nl.components[np.unique(nl.conn_comp[rows])].tolist())
+
+    def classes(self) -> Dict[str, List[str]]:
+        """Components grouped by the letters leading their reference designator."""
+        if self._classes is None:
+            groups: Dict[str, List[str]] = {}
+            for comp in self.sorted_components.tolist():
+                m = CLASS_RE.match(comp)
+                groups.setdefault(m.group(0) if m else "", []).append(comp)
+            self._classes = groups
+        return self._classes
+
+    def components_of_class(self, cls: str) -> List[str]:
+        return self.classes().get(cls, [])
+
+    def neighbors(self, comp: str, max_net_pins: Optional[int] = None) -> List[str]:
+        """Components sharing a net with ``comp``.
+
+        Nets with more than ``max_net_pins`` connections (ground, main
+        rails) are skipped when a limit is given.
+        """
+        nl = self.netlist
+        k = nl.comp_id(comp)
+        if k is None:
+            return []
+        nets = np.unique(nl.conn_net[nl.comp_conns(k)])
+        if max_net_pins is not None:
+            nets = nets[(nl.net_ptr[nets + 1] - nl.net_ptr[nets]) <= max_net_pins]
+        return [c for c in self.components_on_nets(nets) if c != comp]
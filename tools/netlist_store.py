@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Compact binary netlist with interned names and CSR adjacency.
+
+A netlist is stored as three string tables (nets, components, pin names)
+and one row per pin connection holding integer IDs into them. Two CSR
+index pairs, ``net_ptr``/``net_rows`` and ``comp_ptr``/``comp_rows``, list
+the connection rows of each net and each component, so any lookup is a
+slice rather than a scan, and names are found by binary search over stored
+sort orders. `load_netlist` memory-maps the (uncompressed) ``.npz`` form, so
+loading costs the same for any design size, and converts ``ipc_parser``
+JSON or raw IPC-D-356A files on the fly (through `fab_cache.FabCache` when
+one is configured).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import zipfile
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fab_cache import HEADER_KEY, FabCache
+from ipc_parser import IpcNetlist, read_ipc
+
+
+FORMAT_VERSION = 1
+IPC_SUFFIXES = (".ipc", ".356", ".d356")
+STRING_TABLES = ("nets", "components", "pins")
+INDEX_ARRAYS = (
+    "conn_net", "conn_comp", "conn_pin", "net_ptr", "net_rows", "comp_ptr", "comp_rows", "net_order", "comp_order",
+)
+
+
+def _empty() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+def _names(values: List[str]) -> np.ndarray:
+    return np.array(values, dtype=str) if len(values) else np.empty(0, dtype="<U1")
+
+
+def _find(names: np.ndarray, order: np.ndarray, name: str) -> Optional[int]:
+    k = bisect_left(order, name, key=lambda i: names[i])
+    return int(order[k]) if k < len(order) and names[order[k]] == name else None
+
+
+def _csr(keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets and stably sorted rows grouping ``keys`` (each in ``[0, n)``)."""
+    rows = np.argsort(keys, kind="stable")
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+    return ptr, rows.astype(np.int64)
+
+
+@dataclass
+class Netlist:
+    """Interned netlist; connection ``k`` joins pin ``pins[conn_pin[k]]`` of
+    ``components[conn_comp[k]]`` to ``nets[conn_net[k]]``.
+
+    String tables are NumPy unicode arrays (possibly memory-mapped);
+    ``net_order``/``comp_order`` sort the net and component tables by name.
+    """
+
+    nets: np.ndarray = field(default_factory=lambda: _names([]))
+    components: np.ndarray = field(default_factory=lambda: _names([]))
+    pins: np.ndarray = field(default_factory=lambda: _names([]))
+    aliases: Dict[str, str] = field(default_factory=dict)
+    conn_net: np.ndarray = field(default_factory=_empty)
+    conn_comp: np.ndarray = field(default_factory=_empty)
+    conn_pin: np.ndarray = field(default_factory=_empty)
+    net_ptr: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    net_rows: np.ndarray = field(default_factory=_empty)
+    comp_ptr: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    comp_rows: np.ndarray = field(default_factory=_empty)
+    net_order: np.ndarray = field(default_factory=_empty)
+    comp_order: np.ndarray = field(default_factory=_empty)
+
+    def __len__(self) -> int:
+        return len(self.conn_net)
+
+    @classmethod
+    def build(
+        cls,
+        nets: List[str],
+        components: List[str],
+        pins: List[str],
+        conn_net: np.ndarray,
+        conn_comp: np.ndarray,
+        conn_pin: np.ndarray,
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> "Netlist":
+        conn_net, conn_comp, conn_pin = (np.asarray(a, dtype=np.int64) for a in (conn_net, conn_comp, conn_pin))
+        nets, components = _names(nets), _names(components)
+        net_ptr, net_rows = _csr(conn_net, len(nets))
+        comp_ptr, comp_rows = _csr(conn_comp, len(components))
+        return cls(
+            nets=nets,
+            components=components,
+            pins=_names(pins),
+            aliases=dict(aliases or {}),
+            conn_net=conn_net,
+            conn_comp=conn_comp,
+            conn_pin=conn_pin,
+            net_ptr=net_ptr,
+            net_rows=net_rows,
+            comp_ptr=comp_ptr,
+            comp_rows=comp_rows,
+            net_order=np.argsort(nets, kind="stable").astype(np.int64),
+            comp_order=np.argsort(components, kind="stable").astype(np.int64),
+        )
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Netlist":
+        """Build from ``ipc_parser`` JSON; component order follows ``comp_to_pins``."""
+        comp_ids = {comp: k for k, comp in enumerate(data.get("comp_to_pins", {}))}
+        net_ids: Dict[str, int] = {}
+        pin_ids: Dict[str, int] = {}
+        rows = [
+            (
+                net_ids.setdefault(net, len(net_ids)),
+                comp_ids.setdefault(comp, len(comp_ids)),
+                pin_ids.setdefault(pin, len(pin_ids)),
+            )
+            for net, pairs in data.get("net_to_pins", {}).items()
+            for comp, pin in pairs
+        ]
+        table = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        return cls.build(
+            list(net_ids), list(comp_ids), list(pin_ids), table[:, 0], table[:, 1], table[:, 2], data.get("net_aliases")
+        )
+
+    @classmethod
+    def from_ipc(cls, ipc: IpcNetlist) -> "Netlist":
+        """Build from the pin rows of a parsed IPC-D-356A file (unnamed nets dropped)."""
+        named = np.array([bool(n) for n in ipc.nets], dtype=bool)
+        rows = ipc.pin_rows()
+        rows = rows[named[ipc.net[rows]]] if len(ipc.nets) else rows
+        return cls.build(ipc.nets, ipc.components, ipc.pins, ipc.net[rows], ipc.component[rows], ipc.pin[rows], ipc.aliases)
+
+    def to_record(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        arrays = {name: getattr(self, name) for name in INDEX_ARRAYS + STRING_TABLES}
+        return {"format_version": FORMAT_VERSION, "aliases": self.aliases}, arrays
+
+    @classmethod
+    def from_record(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "Netlist":
+        data = cls(aliases=header.get("aliases", {}))
+        for name in INDEX_ARRAYS + STRING_TABLES:
+            setattr(data, name, arrays[name])
+        return data
+
+    def save(self, path: Path) -> None:
+        header, arrays = self.to_record()
+        header_bytes = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+        with path.open("wb") as f:
+            np.savez(f, **arrays, **{HEADER_KEY: header_bytes})
+
+    def net_id(self, name: str) -> Optional[int]:
+        return _find(self.nets, self.net_order, name)
+
+    def comp_id(self, name: str) -> Optional[int]:
+        return _find(self.components, self.comp_order, name)
+
+    def net_conns(self, net: int) -> np.ndarray:
+        """Connection rows of net ID ``net``."""
+        return self.net_rows[self.net_ptr[net] : self.net_ptr[net + 1]]
+
+    def comp_conns(self, comp: int) -> np.ndarray:
+        """Connection rows of component ID ``comp``."""
+        return self.comp_rows[self.comp_ptr[comp] : self.comp_ptr[comp + 1]]
+
+    def net_pins(self, net: str) -> List[Tuple[str, str]]:
+        """``(component, pin)`` pairs on ``net`` (empty when unknown)."""
+        k = self.net_id(net)
+        if k is None:
+            return []
+        rows = self.net_conns(k)
+        pairs = zip(self.conn_comp[rows].tolist(), self.conn_pin[rows].tolist())
+        return [(str(self.components[c]), str(self.pins[p])) for c, p in pairs]
+
+    def net_components(self, net: str) -> List[str]:
+        k = self.net_id(net)
+        if k is None:
+            return []
+        return [str(self.components[c]) for c in dict.fromkeys(self.conn_comp[self.net_conns(k)].tolist())]
+
+    def comp_pins(self, comp: str) -> Dict[str, str]:
+        """``{pin: net}`` for ``comp`` (empty when unknown)."""
+        k = self.comp_id(comp)
+        if k is None:
+            return {}
+        rows = self.comp_conns(k)
+        pairs = zip(self.conn_pin[rows].tolist(), self.conn_net[rows].tolist())
+        return {str(self.pins[p]): str(self.nets[n]) for p, n in pairs}
+
+    def comp_nets(self, comp: str) -> List[str]:
+        k = self.comp_id(comp)
+        if k is None:
+            return []
+        return [str(self.nets[n]) for n in dict.fromkeys(self.conn_net[self.comp_conns(k)].tolist())]
+
+    def net_to_pins(self) -> Dict[str, List[Tuple[str, str]]]:
+        comps, pins = self.components.tolist(), self.pins.tolist()
+        cc, cp = self.conn_comp.tolist(), self.conn_pin.tolist()
+        ptr, rows = self.net_ptr.tolist(), self.net_rows.tolist()
+        return {
+            net: [(comps[cc[r]], pins[cp[r]]) for r in rows[ptr[k] : ptr[k + 1]]] for k, net in enumerate(self.nets.tolist())
+        }
+
+    def comp_to_pins(self) -> Dict[str, Dict[str, str]]:
+        nets, pins = self.nets.tolist(), self.pins.tolist()
+        cn, cp = self.conn_net.tolist(), self.conn_pin.tolist()
+        ptr, rows = self.comp_ptr.tolist(), self.comp_rows.tolist()
+        return {
+            comp: {pins[cp[r]]: nets[cn[r]] for r in rows[ptr[k] : ptr[k + 1]]}
+            for k, comp in enumerate(self.components.tolist())
+        }
+
+
+def _netlist_record(path: Path) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    if path.suffix.lower() in IPC_SUFFIXES:
+        return Netlist.from_ipc(read_ipc(path)).to_record()
+    return Netlist.from_json(json.loads(path.read_text())).to_record()
+
+
+def _map_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-map every member of an uncompressed ``.npz`` archive."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, path.open("rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: compressed member {info.filename}")
+            # Local file header: 30 fixed bytes, then name and extra field.
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(f)
+            key = info.filename[: -len(".npy")]
+            if not shape or 0 in shape:
+                arrays[key] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[key] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran else "C")
+    return arrays
+
+
+def load_netlist(path: Path, cache: Optional[FabCache] = None) -> Netlist:
+    """Load a ``.npz`` netlist, or convert ``ipc_parser`` JSON / an IPC-D-356A file."""
+    if path.suffix.lower() == ".npz":
+        arrays = _map_npz(path)
+        header = json.loads(np.asarray(arrays.pop(HEADER_KEY)).tobytes().decode())
+        return Netlist.from_record(header, arrays)
+    if cache is not None:
+        return Netlist.from_record(*cache.load(path, "netlist", FORMAT_VERSION, _netlist_record))
+    return Netlist.from_record(*_netlist_record(path))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("netlist", type=Path, help="Netlist JSON or IPC-D-356A file")
+    ap.add_argument("-o", "--out", type=Path, required=True, help="Output .npz path")
+    args = ap.parse_args()
+
+    load_netlist(args.netlist).save(args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,54 +6,50 @@ import argparse
 import csv
 import json
 from pathlib import Path
-from typing import Dict, List
-
-import xlrd
-
-
-def parse_pnp(path: Path) -> List[Dict]:
-    wb = xlrd.open_workbook(path.as_posix())
-    sh = wb.sheet_by_index(0)
-    header_row = None
-    for row_idx in range(min(40, sh.nrows)):
-        row = [str(sh.cell_value(row_idx, c)).strip().lower() for c in range(sh.ncols)]
-        if "designator" in row and "rotation" in row and "center-x(mil)" in row:
-            header_row = row_idx
-            break
-    if header_row is None:
-        for row_idx in range(min(40, sh.nrows)):
-            row = [str(sh.cell_value(row_idx, c)).strip().lower() for c in range(sh.ncols)]
-            if "designator" in row and "rotation" in row and "mid x" in row:
-                header_row = row_idx
-                break
-    if header_row is None:
-        raise ValueError("PnP header not found")
-    def norm(s: str) -> str:
-        return "".join(ch for ch in s.lower() if ch.isalnum())
+from typing import Any, Dict, Iterator, List
+
+from sheet_reader import Sheet, cell, find_header, iter_rows, sheet_arg
+
+
+HEADER_SCAN_ROWS = 40
+
+
+def _norm(cell: Any) -> str:
+    return "".join(ch for ch in str(cell).lower() if ch.isalnum())
 
-    headers = {norm(str(sh.cell_value(header_row, c)).strip()): c for c in range(sh.ncols)}
-    rows = []
-    for r in range(header_row + 1, sh.nrows):
-        ref = str(sh.cell_value(r, headers.get("designator", -1))).strip()
+
+def _is_header(names: List[str]) -> bool:
+    return "designator" in names and "rotation" in names and ("centerxmil" in names or "midx" in names)
+
+
+def iter_pnp(path: Path, sheet: Sheet = 0) -> Iterator[Dict]:
+    """Placement rows of a pick-and-place ``.xls``, ``.xlsx`` or CSV, as they are read."""
+    rows = iter_rows(path, sheet)
+    headers = find_header(rows, _is_header, HEADER_SCAN_ROWS, _norm)
+    if headers is None:
+        raise ValueError("PnP header not found")
+    for row in rows:
+        ref = str(cell(row, headers.get("designator"))).strip()
         if not ref or ref == "!PCB":
             continue
         try:
-            rotation = float(sh.cell_value(r, headers.get("rotation", -1)) or 0.0)
-            x_mil = float(sh.cell_value(r, headers.get("centerxmil", -1)) or 0.0)
-            y_mil = float(sh.cell_value(r, headers.get("centerymil", -1)) or 0.0)
+            rotation = float(cell(row, headers.get("rotation")) or 0.0)
+            x_mil = float(cell(row, headers.get("centerxmil")) or 0.0)
+            y_mil = float(cell(row, headers.get("centerymil")) or 0.0)
         except ValueError:
             continue
-        rows.append(
-            {
-                "refdes": ref,
-                "package": str(sh.cell_value(r, headers.get("packagereference", -1))).strip(),
-                "side": str(sh.cell_value(r, headers.get("layer", -1))).strip(),
-                "rotation_deg": rotation,
-                "x_mil": x_mil,
-                "y_mil": y_mil,
-            }
-        )
-    return rows
+        yield {
+            "refdes": ref,
+            "package": str(cell(row, headers.get("packagereference"))).strip(),
+            "side": str(cell(row, headers.get("layer"))).strip(),
+            "rotation_deg": rotation,
+            "x_mil": x_mil,
+            "y_mil": y_mil,
+        }
+
+
+def parse_pnp(path: Path, sheet: Sheet = 0) -> List[Dict]:
+    return list(iter_pnp(path, sheet))
 
 
 def write_svg(points: List[Dict], out_path: Path) -> None:
@@ -79,7 +75,8 @@ def write_svg(points: List[Dict], out_path: Path) -> None:
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--pnp", type=Path, required=True, help="Pick and place .xls")
+    ap.add_argument("--pnp", type=Path, required=True, help="Pick and place .xls, .xlsx or .csv")
+    ap.add_argument("--sheet", type=sheet_arg, default=0, help="Pick and place sheet index or name")
     ap.add_argument("-o", "--out-json", type=Path, required=True, help="Output JSON")
     ap.add_argument("--out-csv", type=Path, required=True, help="Output CSV")
     ap.add_argument("--out-svg", type=Path, required=True, help="Output SVG map")
@@ -87,10 +84,10 @@ def main() -> int:
     args = ap.parse_args()
 
     if args.dry_run:
-        parse_pnp(args.pnp)
+        next(iter_pnp(args.pnp, args.sheet), None)
         return 0
 
-    rows = parse_pnp(args.pnp)
+    rows = parse_pnp(args.pnp, args.sheet)
     args.out_json.write_text(json.dumps(rows, indent=2, sort_keys=True))
     with args.out_csv.open("w", newline="") as f:
         writer = csv.writer(f)
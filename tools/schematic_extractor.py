@@ -4,10 +4,15 @@ from __future__ import annotations
 
 import argparse
 import json
-import re
 from pathlib import Path
 from typing import Dict, List, Set
 
+import numpy as np
+
+from fab_cache import FabCache
+from netlist_index import NetlistIndex
+from netlist_store import load_netlist
+
 
 BLOCK_DEFS = {
     "pmic_block": {
@@ -72,53 +77,38 @@ BLOCK_DEFS = {
 }
 
 
-def load_netlist(path: Path) -> Dict:
-    return json.loads(path.read_text())
-
-
-def compile_patterns(patterns: List[str]) -> List[re.Pattern]:
-    return [re.compile(p) for p in patterns]
-
-
-def component_in_block(comp: str, nets: List[str], block_def: Dict) -> bool:
-    if "components" in block_def and comp in block_def["components"]:
-        return True
-    patterns = compile_patterns(block_def.get("nets", []))
-    for net in nets:
-        for pat in patterns:
-            if pat.search(net):
-                return True
-    return False
-
+def block_components(index: NetlistIndex, block_def: Dict) -> List[str]:
+    """Components listed in the block or with a pin on a net matching its patterns."""
+    listed = [c for c in block_def.get("components", []) if index.netlist.comp_id(c) is not None]
+    net_ids = [index.net_ids_matching(p) for p in block_def.get("nets", [])]
+    matched = index.components_on_nets(np.unique(np.concatenate(net_ids))) if net_ids else []
+    return sorted(set(listed).union(matched))
 
-def extract_blocks(netlist: Dict) -> Dict[str, Dict]:
-    comp_to_nets: Dict[str, List[str]] = {}
-    for comp, pins in netlist.get("comp_to_pins", {}).items():
-        comp_to_nets[comp] = list(set(pins.values()))
 
+def extract_blocks(index: NetlistIndex) -> Dict[str, Dict]:
+    netlist = index.netlist
     blocks: Dict[str, Dict] = {}
     assigned: Set[str] = set()
     for block_name, block_def in BLOCK_DEFS.items():
-        comps = []
+        comps = block_components(index, block_def)
         nets: Set[str] = set()
-        for comp, comp_nets in comp_to_nets.items():
-            if component_in_block(comp, comp_nets, block_def):
-                comps.append(comp)
-                nets.update(comp_nets)
-                assigned.add(comp)
+        for comp in comps:
+            nets.update(netlist.comp_nets(comp))
+        assigned.update(comps)
         blocks[block_name] = {
-            "components": sorted(comps),
+            "components": comps,
             "nets": sorted(nets),
             "method": "netlist_fallback",
         }
-    unassigned = sorted(set(comp_to_nets.keys()) - assigned)
+    unassigned = sorted(set(netlist.components.tolist()) - assigned)
     return {"blocks": blocks, "unassigned_components": unassigned}
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON")
+    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON, .npz or IPC-D-356A file")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
@@ -126,8 +116,8 @@ def main() -> int:
         load_netlist(args.netlist)
         return 0
 
-    netlist = load_netlist(args.netlist)
-    blocks = extract_blocks(netlist)
+    index = NetlistIndex(load_netlist(args.netlist, FabCache.open(args.cache_dir)))
+    blocks = extract_blocks(index)
     blocks["source"] = {
         "netlist": str(args.netlist),
         "note": "SchDoc parsing not available; blocks inferred from netlist patterns.",
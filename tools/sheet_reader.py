@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Row-streaming readers for BOM and pick-and-place spreadsheets.
+
+`iter_rows` yields one list of cell values per row from ``.xls``
+(``xlrd``, only the requested sheet is loaded), ``.xlsx``/``.xlsm``
+(``openpyxl`` read-only mode, rows are streamed from the archive) and
+delimited text (``.csv``/``.tsv``/``.txt``). `find_header` consumes rows
+only until the header is found, so callers parse data rows as they
+arrive and never hold the whole sheet.
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import csv
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+
+XLS_SUFFIXES = (".xls",)
+XLSX_SUFFIXES = (".xlsx", ".xlsm")
+TEXT_SUFFIXES = (".csv", ".tsv", ".txt")
+SNIFF_BYTES = 64 * 1024
+
+Sheet = Union[int, str]
+
+
+def sheet_arg(text: str) -> Sheet:
+    """argparse type for ``--sheet``: an index when numeric, else a sheet name."""
+    return int(text) if text.isdigit() else text
+
+
+def _xls_rows(path: Path, sheet: Sheet) -> Iterator[List[Any]]:
+    import xlrd
+
+    wb = xlrd.open_workbook(path.as_posix(), on_demand=True)
+    try:
+        sh = wb.sheet_by_name(sheet) if isinstance(sheet, str) else wb.sheet_by_index(sheet)
+        for row_idx in range(sh.nrows):
+            yield sh.row_values(row_idx)
+    finally:
+        wb.release_resources()
+
+
+def _xlsx_rows(path: Path, sheet: Sheet) -> Iterator[List[Any]]:
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if isinstance(sheet, str) else wb.worksheets[sheet]
+        for row in ws.iter_rows(values_only=True):
+            yield ["" if value is None else value for value in row]
+    finally:
+        wb.close()
+
+
+def _text_encoding(path: Path) -> str:
+    """``utf-8-sig`` when the whole file decodes as UTF-8, else ``cp1252``.
+
+    Altium and CM CSV exports are often Windows-1252 ("4.7\u00b5F" as byte
+    0xB5). The file is checked in chunks so it is never held whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with path.open("rb") as f:
+        try:
+            for chunk in iter(lambda: f.read(SNIFF_BYTES), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return "cp1252"
+    return "utf-8-sig"
+
+
+def _text_rows(path: Path) -> Iterator[List[str]]:
+    with path.open("r", newline="", encoding=_text_encoding(path)) as f:
+        sample = f.read(SNIFF_BYTES)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel_tab if path.suffix.lower() == ".tsv" else csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def iter_rows(path: Path, sheet: Sheet = 0) -> Iterator[List[Any]]:
+    """Rows of ``sheet`` (index or name; ignored for text files) as cell lists."""
+    suffix = path.suffix.lower()
+    if suffix in XLSX_SUFFIXES:
+        return _xlsx_rows(path, sheet)
+    if suffix in TEXT_SUFFIXES:
+        return _text_rows(path)
+    if suffix in XLS_SUFFIXES:
+        return _xls_rows(path, sheet)
+    raise ValueError(f"{path}: unsupported spreadsheet type {path.suffix!r}")
+
+
+def sheet_names(path: Path) -> List[str]:
+    suffix = path.suffix.lower()
+    if suffix in XLSX_SUFFIXES:
+        import openpyxl
+
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+    if suffix in XLS_SUFFIXES:
+        import xlrd
+
+        wb = xlrd.open_workbook(path.as_posix(), on_demand=True)
+        try:
+            return wb.sheet_names()
+        finally:
+            wb.release_resources()
+    return [path.stem]
+
+
+def find_header(
+    rows: Iterator[List[Any]], accept: Callable[[List[str]], bool], scan_rows: int, normalize: Callable[[Any], str]
+) -> Optional[Dict[str, int]]:
+    """``{normalized name: column}`` of the first of ``scan_rows`` rows ``accept`` takes.
+
+    Rows up to and including the header are consumed from ``rows``, which
+    then continues at the first data row. None when no header is found.
+    """
+    for _ in range(scan_rows):
+        row = next(rows, None)
+        if row is None:
+            break
+        names = [normalize(cell) for cell in row]
+        if accept(names):
+            headers: Dict[str, int] = {}
+            for col, name in enumerate(names):
+                headers.setdefault(name, col)
+            return headers
+    return None
+
+
+def cell(row: List[Any], col: Any) -> Any:
+    """``row[col]``, or ``""`` when the column is missing or the row is short."""
+    return row[col] if col is not None and 0 <= col < len(row) else ""
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path", type=Path, help="Spreadsheet (.xls, .xlsx, .csv)")
+    ap.add_argument("--sheet", type=sheet_arg, default=0, help="Sheet index or name")
+    ap.add_argument("--rows", type=int, default=10, help="Number of rows to print")
+    args = ap.parse_args()
+
+    print("Sheets:", ", ".join(sheet_names(args.path)))
+    for k, row in zip(range(args.rows), iter_rows(args.path, args.sheet)):
+        print(k, row)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,27 +7,25 @@ import json
 from pathlib import Path
 from typing import Dict, List
 
+from fab_cache import FabCache
+from netlist_index import NetlistIndex
+from netlist_store import load_netlist
+
 
 def load_json(path: Path) -> Dict:
     return json.loads(path.read_text())
 
 
-def collect_nets(netlist: Dict, prefix_list: List[str]) -> List[str]:
-    nets = []
-    for net in netlist.get("net_to_pins", {}).keys():
-        for prefix in prefix_list:
-            if net.startswith(prefix):
-                nets.append(net)
-                break
-    return sorted(set(nets))
+def collect_nets(index: NetlistIndex, prefix_list: List[str]) -> List[str]:
+    return index.nets_with_prefix(*prefix_list)
 
 
-def build_checklist(netlist: Dict, impedance: Dict) -> Dict:
+def build_checklist(index: NetlistIndex, impedance: Dict) -> Dict:
     usb = ["USB_DP", "USB_DM"]
-    lvds = collect_nets(netlist, ["AR_LVDS"])
-    spi = collect_nets(netlist, ["SPI_", "HD_SPI"])
-    jtag = collect_nets(netlist, ["HD_AR_T", "AR_T"])
-    uart = collect_nets(netlist, ["UART", "RS232", "AR_MSS_LOGGER"])
+    lvds = collect_nets(index, ["AR_LVDS"])
+    spi = collect_nets(index, ["SPI_", "HD_SPI"])
+    jtag = collect_nets(index, ["HD_AR_T", "AR_T"])
+    uart = collect_nets(index, ["UART", "RS232", "AR_MSS_LOGGER"])
 
     return {
         "categories": {
@@ -61,20 +59,21 @@ def build_checklist(netlist: Dict, impedance: Dict) -> Dict:
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON")
+    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON, .npz or IPC-D-356A file")
     ap.add_argument("--impedance", type=Path, required=True, help="Impedance targets JSON")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
-        load_json(args.netlist)
+        load_netlist(args.netlist)
         load_json(args.impedance)
         return 0
 
-    netlist = load_json(args.netlist)
+    index = NetlistIndex(load_netlist(args.netlist, FabCache.open(args.cache_dir)))
     impedance = load_json(args.impedance)
-    data = build_checklist(netlist, impedance)
+    data = build_checklist(index, impedance)
     args.out.write_text(json.dumps(data, indent=2, sort_keys=True))
     return 0
 
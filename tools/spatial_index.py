@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Uniform grid hash over line segments for vectorized proximity queries.
+
+Points are zero-length segments, so drill hits, slots and outline edges
+share one index. Every segment is registered in each grid cell its bounding
+box touches; a query expands its own box by the search radius and collects
+the segments registered in the cells it touches. All bookkeeping is done
+with sorted NumPy key arrays, so there are no per-object Python loops.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+
+# Cells per axis are capped so a tiny cell size cannot blow up the key space.
+MAX_CELLS_PER_AXIS = 1 << 20
+
+
+def _cell_ranges(lo: np.ndarray, hi: np.ndarray, origin: float, cell: float) -> Tuple[np.ndarray, np.ndarray]:
+    c0 = np.floor((lo - origin) / cell).astype(np.int64)
+    c1 = np.floor((hi - origin) / cell).astype(np.int64)
+    return np.clip(c0, 0, MAX_CELLS_PER_AXIS - 1), np.clip(c1, 0, MAX_CELLS_PER_AXIS - 1)
+
+
+def _expand_cells(cx0: np.ndarray, cx1: np.ndarray, cy0: np.ndarray, cy1: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Every (item, cell key) pair for items covering ``[cx0, cx1] x [cy0, cy1]``."""
+    nx = cx1 - cx0 + 1
+    ny = cy1 - cy0 + 1
+    counts = nx * ny
+    item = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    gx = cx0[item] + local % nx[item]
+    gy = cy0[item] + local // nx[item]
+    return item, gy * MAX_CELLS_PER_AXIS + gx
+
+
+class SegmentGrid:
+    """Grid hash of segments ``(ax, ay) -> (bx, by)``, coordinates in mm."""
+
+    def __init__(self, ax: np.ndarray, ay: np.ndarray, bx: np.ndarray, by: np.ndarray, cell: float) -> None:
+        self.ax, self.ay, self.bx, self.by = (np.asarray(v, dtype=np.float64) for v in (ax, ay, bx, by))
+        n = len(self.ax)
+        lo_x = np.minimum(self.ax, self.bx) if n else np.zeros(0)
+        lo_y = np.minimum(self.ay, self.by) if n else np.zeros(0)
+        self.origin = (float(lo_x.min()) if n else 0.0, float(lo_y.min()) if n else 0.0)
+        span = max(
+            float(np.maximum(self.ax, self.bx).max() - self.origin[0]) if n else 0.0,
+            float(np.maximum(self.ay, self.by).max() - self.origin[1]) if n else 0.0,
+        )
+        self.cell = max(cell, span / (MAX_CELLS_PER_AXIS - 1), 1e-9)
+        cx0, cx1 = _cell_ranges(lo_x, np.maximum(self.ax, self.bx), self.origin[0], self.cell)
+        cy0, cy1 = _cell_ranges(lo_y, np.maximum(self.ay, self.by), self.origin[1], self.cell)
+        item, key = _expand_cells(cx0, cx1, cy0, cy1)
+        order = np.argsort(key, kind="stable")
+        self.keys = key[order]
+        self.items = item[order]
+
+    def __len__(self) -> int:
+        return len(self.ax)
+
+    def candidates(
+        self, ax: np.ndarray, ay: np.ndarray, bx: np.ndarray, by: np.ndarray, radius: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique ``(query, segment)`` index pairs whose boxes are within ``radius``.
+
+        This is a superset of the pairs closer than ``radius``; callers
+        filter it with `segment_distance`.
+        """
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), np.shape(ax))
+        if not len(self) or not len(radius):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        cx0, cx1 = _cell_ranges(np.minimum(ax, bx) - radius, np.maximum(ax, bx) + radius, self.origin[0], self.cell)
+        cy0, cy1 = _cell_ranges(np.minimum(ay, by) - radius, np.maximum(ay, by) + radius, self.origin[1], self.cell)
+        query, key = _expand_cells(cx0, cx1, cy0, cy1)
+        lo = np.searchsorted(self.keys, key, side="left")
+        hi = np.searchsorted(self.keys, key, side="right")
+        counts = hi - lo
+        q = np.repeat(query, counts)
+        pos = np.repeat(lo, counts) + (np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts))
+        s = self.items[pos]
+        # A pair sharing several cells is reported once; sort-and-mask is
+        # several times faster than np.unique on these keys.
+        pair = np.sort(q * len(self) + s)
+        pair = pair[np.concatenate(([True], pair[1:] != pair[:-1]))] if len(pair) else pair
+        return pair // len(self), pair % len(self)
+
+
+def segment_distance(
+    p0x: np.ndarray, p0y: np.ndarray, p1x: np.ndarray, p1y: np.ndarray,
+    q0x: np.ndarray, q0y: np.ndarray, q1x: np.ndarray, q1y: np.ndarray,
+) -> np.ndarray:
+    """Minimum distance between segments ``p0-p1`` and ``q0-q1``, elementwise.
+
+    Degenerate (zero-length) segments are points. Follows the clamped
+    closest-point construction from Ericson, *Real-Time Collision Detection*.
+    """
+    d1x, d1y = p1x - p0x, p1y - p0y
+    d2x, d2y = q1x - q0x, q1y - q0y
+    rx, ry = p0x - q0x, p0y - q0y
+    a = d1x * d1x + d1y * d1y
+    e = d2x * d2x + d2y * d2y
+    f = d2x * rx + d2y * ry
+    c = d1x * rx + d1y * ry
+    b = d1x * d2x + d1y * d2y
+    eps = 1e-18
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = a * e - b * b
+        s = np.where(denom > eps, np.clip((b * f - c * e) / denom, 0.0, 1.0), 0.0)
+        # Against a point, the closest spot on p follows from c alone.
+        s = np.where(e > eps, s, np.clip(-c / a, 0.0, 1.0))
+        s = np.where(a > eps, s, 0.0)
+        t = np.where(e > eps, (b * s + f) / e, 0.0)
+        # Re-clamp s whenever t had to be clamped.
+        t_lo, t_hi = t < 0.0, t > 1.0
+        s = np.where(t_lo & (a > eps), np.clip(-c / a, 0.0, 1.0), s)
+        s = np.where(t_hi & (a > eps), np.clip((b - c) / a, 0.0, 1.0), s)
+        t = np.clip(t, 0.0, 1.0)
+    cx = p0x + d1x * s - (q0x + d2x * t)
+    cy = p0y + d1y * s - (q0y + d2y * t)
+    return np.hypot(cx, cy)
+
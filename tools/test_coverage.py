@@ -7,36 +7,51 @@ import json
 from pathlib import Path
 from typing import Dict, List
 
+from fab_cache import FabCache
+from net_graph import NetGraph, load_graph
+from netlist_index import NetlistIndex
+from netlist_store import load_netlist
 
-def load_json(path: Path) -> Dict:
-    return json.loads(path.read_text())
 
-
-def extract_test_points(netlist: Dict) -> Dict[str, str]:
+def extract_test_points(index: NetlistIndex) -> Dict[str, str]:
     tps = {}
-    for comp, pins in netlist.get("comp_to_pins", {}).items():
-        if comp.startswith("TP"):
-            for _pin, net in pins.items():
-                tps[comp] = net
+    for comp in index.components_with_prefix("TP"):
+        for _pin, net in index.netlist.comp_pins(comp).items():
+            tps[comp] = net
     return tps
 
 
+def reachable_nets(graph: NetGraph, tps: Dict[str, str]) -> Dict[str, List[str]]:
+    """Nets each test point reaches through ferrites, inductors and 0-ohm links."""
+    reach = {}
+    for tp, net in tps.items():
+        extended = graph.extended_net(net)
+        if len(extended) > 1:
+            reach[tp] = extended
+    return reach
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON")
+    ap.add_argument("--netlist", type=Path, required=True, help="Netlist JSON, .npz or IPC-D-356A file")
+    ap.add_argument("--values", type=Path, help="Component values JSON (0-ohm resistors join extended nets)")
     ap.add_argument("-o", "--out", type=Path, required=True, help="Output JSON path")
+    ap.add_argument("--cache-dir", type=Path, help="Parse cache directory (default: $OPEN_MMWAVE_CACHE_DIR)")
     ap.add_argument("--dry-run", action="store_true", help="Validate inputs only")
     args = ap.parse_args()
 
     if args.dry_run:
-        load_json(args.netlist)
+        load_netlist(args.netlist)
         return 0
 
-    netlist = load_json(args.netlist)
-    tps = extract_test_points(netlist)
+    netlist = load_netlist(args.netlist, FabCache.open(args.cache_dir))
+    index = NetlistIndex(netlist)
+    tps = extract_test_points(index)
+    reach = reachable_nets(load_graph(netlist, args.values), tps)
 
     report = {
         "test_points": tps,
+        "reachable_nets": reach,
         "coverage": {
             "power_rails": [tp for tp, net in tps.items() if net.startswith("PMIC_") or net.endswith("3V3") or net == "5V_IN_B"],
             "digital_io": [tp for tp, net in tps.items() if net.startswith("AR_") or net.startswith("HD_")],
@@ -48,9 +63,11 @@ def main() -> int:
                 "can": [],
             },
             "rf": [],
+            "extended_nets": sorted({net for nets in reach.values() for net in nets}),
         },
         "notes": [
             "Coverage is derived from TP* nets only; connector access not included.",
+            "Reachable nets follow ferrites, inductors and 0-ohm resistors (from --values) from each TP net.",
         ],
     }
     args.out.write_text(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Engineering-value parser for passive component values.
+
+One combined regular expression tokenizes a value or description string
+into the main value, voltage rating, tolerance and dielectric:
+
+    "4k7"               -> 4700 ohm      (RKM code, letter is the decimal point)
+    "0R1"               -> 0.1 ohm
+    "10uF/16V X7R 10%"  -> 1e-5 F, 16 V, 10 %, X7R
+    "2.2 µH", "100 Ω"   -> 2.2e-6 H, 100 ohm
+
+Values are floats in SI base units with ``unit`` one of ``"F"``, ``"H"``,
+``"ohm"`` (or ``""`` when the unit cannot be told). `parse_value`
+is memoized and `parse_column` parses every distinct string of a BOM
+column once, then broadcasts the results back with NumPy indexing.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+# Bump when parsing changes so cached results built on it (bom_store) are rebuilt.
+PARSER_VERSION = 1
+# Reference designator class: the leading letters of ``C12``, ``FL3``, ``RN1``.
+CLASS_RE = re.compile(r"[A-Za-z]+")
+PREFIX = {
+    "p": 1e-12, "P": 1e-12, "n": 1e-9, "N": 1e-9, "u": 1e-6, "U": 1e-6, "m": 1e-3,
+    "": 1.0, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9,
+}
+UNIT_HINTS = {"R": "ohm", "RN": "ohm", "FB": "ohm", "FL": "ohm", "C": "F", "L": "H"}
+# Imperial chip sizes read like bare numbers ("RES SMD 0402 1%") and are never values.
+PACKAGE_CODES = frozenset(("01005", "0201", "0402", "0603", "0805", "1008", "1206", "1210", "1812", "2010", "2512"))
+ENG_PREFIXES = ((1e6, "M"), (1e3, "k"), (1.0, ""), (1e-3, "m"), (1e-6, "u"), (1e-9, "n"), (1e-12, "p"))
+
+_NUM = r"(?:\d+(?:\.\d*)?|\.\d+)"
+TOKEN_RE = re.compile(
+    rf"""
+    (?P<dielectric>\b(?:C0G|NP0|X[5-8][PRSTUV]|Y5V|Z5U)\b)
+  | (?P<tolerance>[±+]?(?P<tol>{_NUM})\s*%)
+  | (?P<voltage>(?P<volt>{_NUM})\s*(?P<vprefix>[mk]?)V(?:DC|AC)?\b)
+  | (?P<rkm>\b(?P<whole>\d+)(?P<letter>[RpnumkKMG])(?P<frac>\d+)(?P<rkm_unit>F|H)?\b)
+  | (?P<plain>(?<![\w.])(?P<num>{_NUM})\s*(?P<prefix>MEG|[pPnNuUmkKMG])?\s*(?P<unit>F|H|R|(?i:ohms?))?(?![\w.]))
+    """,
+    re.VERBOSE,
+)
+
+
+@dataclass(frozen=True)
+class PartValue:
+    value: float = math.nan
+    unit: str = ""
+    voltage: float = math.nan
+    tolerance_pct: float = math.nan
+    dielectric: str = ""
+
+
+def unit_hint(ref: str) -> str:
+    """Unit implied by a reference designator class (``R*`` ohm, ``C*`` F, ``L*`` H)."""
+    m = CLASS_RE.match(ref)
+    return UNIT_HINTS.get(m.group(0).upper(), "") if m else ""
+
+
+def _normalize(text: str) -> str:
+    return text.replace("\u00b5", "u").replace("\u03bc", "u").replace("\u2126", "R").replace("\u03a9", "R")
+
+
+def _unit(suffix: Optional[str]) -> str:
+    if not suffix:
+        return ""
+    return {"F": "F", "H": "H"}.get(suffix, "ohm")
+
+
+@lru_cache(maxsize=65536)
+def parse_value(text: str, hint: str = "", bare_numbers: bool = True) -> PartValue:
+    """Parse ``text``; ``hint`` (see `unit_hint`) resolves bare numbers and RKM codes.
+
+    The first token carrying a prefix or unit is the value; a bare number
+    counts only as resistance (``hint == "ohm"``) when nothing better is found,
+    and only with ``bare_numbers`` set. Pass False for free text such as
+    descriptions, where bare numbers are usually part or package numbers.
+    """
+    best = bare = None
+    voltage = tolerance = math.nan
+    dielectric = ""
+    for m in TOKEN_RE.finditer(_normalize(text)):
+        if m.group("dielectric"):
+            dielectric = dielectric or m.group("dielectric")
+        elif m.group("tolerance"):
+            tolerance = tolerance if not math.isnan(tolerance) else float(m.group("tol"))
+        elif m.group("voltage"):
+            if math.isnan(voltage):
+                voltage = float(m.group("volt")) * PREFIX[m.group("vprefix")]
+        elif best is None and m.group("rkm"):
+            letter = m.group("letter")
+            number = float(f"{m.group('whole')}.{m.group('frac')}")
+            unit = _unit(m.group("rkm_unit")) or ("ohm" if letter in "RkKMG" else hint)
+            best = (number * PREFIX.get(letter, 1.0), unit)
+        elif best is None and m.group("plain"):
+            prefix, suffix = m.group("prefix") or "", m.group("unit")
+            scale = 1e6 if prefix == "MEG" else PREFIX[prefix]
+            if prefix == "M" and suffix in ("F", "H"):
+                scale = 1e-3  # "MF"/"MH" in upper-case descriptions means milli
+            number = float(m.group("num")) * scale
+            if suffix:
+                best = (number, _unit(suffix))
+            elif prefix:
+                best = (number, hint or ("ohm" if prefix in ("k", "K", "M", "G", "MEG") else ""))
+            elif bare is None and bare_numbers and hint == "ohm" and m.group("num") not in PACKAGE_CODES:
+                bare = (number, hint)
+    value, unit = best or bare or (math.nan, "")
+    return PartValue(value, unit, voltage, tolerance, dielectric)
+
+
+@dataclass
+class ValueColumns:
+    value: np.ndarray
+    unit: np.ndarray
+    voltage: np.ndarray
+    tolerance_pct: np.ndarray
+    dielectric: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+
+def parse_column(texts: Sequence[str], hints: Optional[Sequence[str]] = None, bare_numbers: bool = True) -> ValueColumns:
+    """Parse a column of strings at once; each distinct (text, hint) pair is parsed once.
+
+    ``bare_numbers`` is passed to `parse_value`; leave it set only for value columns.
+    """
+    texts = np.asarray(texts, dtype=str).reshape(-1)
+    hints = np.full(len(texts), "", dtype="<U1") if hints is None else np.asarray(hints, dtype=str).reshape(-1)
+    if not len(texts):
+        empty = np.empty(0, dtype=np.float64)
+        return ValueColumns(empty, np.empty(0, dtype="<U1"), empty, empty, np.empty(0, dtype="<U1"))
+    keys, inverse = np.unique(np.char.add(np.char.add(hints, "\x1f"), texts), return_inverse=True)
+    parsed = [parse_value(text, hint, bare_numbers) for hint, text in (key.split("\x1f", 1) for key in keys.tolist())]
+    return ValueColumns(
+        value=np.array([p.value for p in parsed], dtype=np.float64)[inverse],
+        unit=np.array([p.unit for p in parsed], dtype=str)[inverse],
+        voltage=np.array([p.voltage for p in parsed], dtype=np.float64)[inverse],
+        tolerance_pct=np.array([p.tolerance_pct for p in parsed], dtype=np.float64)[inverse],
+        dielectric=np.array([p.dielectric for p in parsed], dtype=str)[inverse],
+    )
+
+
+def format_value(value: float, unit: str) -> str:
+    """Compact engineering notation: ``4.7k``, ``0R``, ``100nF``, ``2.2uH``."""
+    if math.isnan(value):
+        return ""
+    prefixes = ENG_PREFIXES[:3] if unit == "ohm" else ENG_PREFIXES
+    scale, prefix = 1.0, ""
+    if value:
+        scale, prefix = next(((s, p) for s, p in prefixes if abs(value) >= s), prefixes[-1])
+    mantissa = f"{round(value / scale, 6):g}"
+    if unit == "ohm":
+        return f"{mantissa}{prefix or 'R'}"
+    return f"{mantissa}{prefix}{unit}"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("values", nargs="+", help="Value strings to parse")
+    ap.add_argument("--ref", default="", help="Reference designator used as unit hint (R1, C3, L2)")
+    args = ap.parse_args()
+
+    hint = unit_hint(args.ref)
+    report: Dict[str, Dict] = {}
+    for text in args.values:
+        p = parse_value(text, hint)
+        report[text] = {
+            "value": None if math.isnan(p.value) else p.value,
+            "unit": p.unit,
+            "formatted": format_value(p.value, p.unit),
+            "voltage": None if math.isnan(p.voltage) else p.voltage,
+            "tolerance_pct": None if math.isnan(p.tolerance_pct) else p.tolerance_pct,
+            "dielectric": p.dielectric,
+        }
+    print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())